@@ -5,9 +5,19 @@ room can contain a set of properties detailing how the room should be
 implemented in the final product.
 """
 
-from typing import Tuple, Optional, Callable, List, Iterator, Any
-from random import shuffle, randrange as rand, random
+from typing import Tuple, Optional, Callable, List, Iterator, Any, Dict, \
+    Sequence, Set, Union
+from random import shuffle, randrange as rand, random, getstate, setstate, \
+    getrandbits
+from random import seed as set_seed
 from abc import ABCMeta, abstractmethod
+from hashlib import blake2b
+from bisect import bisect_right
+from itertools import accumulate
+from copy import copy
+from array import array
+from time import perf_counter
+from threading import Lock
 
 
 class GeneratorError(Exception):
@@ -17,6 +27,23 @@ class GeneratorError(Exception):
     """
 
 
+class DungeonRejected(GeneratorError):
+    """
+    Raised by a filter layer when a dungeon does not meet the conditions
+    of the filter. gen_map can retry with another seed when this is
+    raised.
+
+    Attributes
+    ----------
+    name: str
+        The name of the filter which rejected the dungeon.
+    """
+
+    def __init__(self, name: str) -> None:
+        super().__init__('Dungeon rejected by filter ' + repr(name))
+        self.name = name
+
+
 class RoomType:
     """
     A room type is a set of properties which define a specific type of
@@ -61,6 +88,14 @@ class RoomType:
         order for it to be placed.
     """
 
+    __slots__ = ('name', 'optional', 'maxDoors', 'isEntrance', 'isExit',
+                 'difficulty', 'priority', 'requiresEnemy')
+
+    # Room types are compared by identity, so two room types with the
+    # same properties are still different room types.
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
     def __init__(self) -> None:
         self.name = 'Unnamed Room'
         self.optional = False
@@ -110,6 +145,14 @@ class EnemyType:
         defined by name.
     """
 
+    __slots__ = ('name', 'priority', 'difficulty', 'maxCount', 'endOfRegion',
+                 'requiresEnemy', 'requiresRoom')
+
+    # Enemy types are compared by identity, so two enemy types with the
+    # same properties are still different enemy types.
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
     def __init__(self) -> None:
         self.name = 'Unnamed Enemy'
         self.priority = 1
@@ -145,6 +188,234 @@ class GeneratorConfig:
         self.enemyTypes: List[EnemyType] = []
         self.layers: List[DungeonGENLayer] = []
 
+    def add_filter(self, predicate: Callable[['Dungeon'], bool], name: str,
+                   after: Any = None) -> None:
+        """
+        Adds a filter layer, which rejects dungeons which do not match a
+        condition. Filters should be placed directly after the layer
+        which creates the information they check, so rejected dungeons
+        skip the remaining layers.
+
+        Parameters
+        ----------
+        predicate: Callable[[Dungeon], bool]
+            The condition to check. Dungeons for which this returns
+            False are rejected.
+
+        name: str
+            The name of the filter, used when reporting rejections.
+
+        after: Any
+            A layer, or a layer class, to place the filter after. The
+            filter is placed after the last matching layer. If None, the
+            filter is added to the end of the layer list.
+
+        Raises
+        ------
+        GeneratorError
+            If no layer matches the given layer or layer class.
+        """
+
+        layer = FilterLayer(predicate, name)
+
+        if after is None:
+            self.layers.append(layer)
+            return
+
+        for i in range(len(self.layers) - 1, -1, -1):
+            current = self.layers[i]
+
+            if current is after or (isinstance(after, type)
+                                    and isinstance(current, after)):
+                self.layers.insert(i + 1, layer)
+                return
+
+        raise GeneratorError('No layer found to add filter '
+                             + repr(name) + ' after')
+
+    def compile(self) -> 'CompiledConfig':
+        """
+        Validates this config and compiles it into an immutable plan,
+        which can be used in place of this config to generate any number
+        of dungeons. Later changes to this config, or to it's layers and
+        types, do not affect the plan.
+
+        Returns
+        -------
+        The compiled plan.
+
+        Raises
+        ------
+        GeneratorError
+            If any room type, enemy type or layer is not setup correctly.
+        """
+
+        return CompiledConfig(self)
+
+
+class CompiledConfig:
+    """
+    A compiled config is an immutable, validated plan for generating
+    dungeons, created by GeneratorConfig.compile. Room and enemy types
+    are validated, including the names of the types they require, and
+    each layer precomputes anything which does not depend on the dungeon
+    being generated. A plan can be passed to gen_map in place of the
+    config it was compiled from, and produces identical dungeons.
+
+    The plan holds copies of the room types, enemy types and layers of
+    the config, so later changes to the config do not affect it. Rooms
+    of the dungeons generated by a plan use the types of the plan, so
+    the types of the plan must be used when serializing them.
+
+    Attributes
+    ----------
+    roomTypes: Tuple[RoomType, ...]
+        The room types which can exist within the dungeon.
+
+    enemyTypes: Tuple[EnemyType, ...]
+        The enemy types which can exist within the dungeon.
+
+    layers: Tuple[DungeonGENLayer, ...]
+        The compiled generation layers, in the order they are run.
+
+    copies: Dict[Any, Any]
+        The copy of each room and enemy type within the plan, by the
+        original type.
+    """
+
+    roomTypes: Tuple[RoomType, ...]
+    enemyTypes: Tuple[EnemyType, ...]
+    layers: Tuple['DungeonGENLayer', ...]
+    copies: Dict[Any, Any]
+
+    def __init__(self, config: GeneratorConfig) -> None:
+        """
+        Parameters
+        ----------
+        config: GeneratorConfig
+            The config to compile.
+
+        Raises
+        ------
+        GeneratorError
+            If any room type, enemy type or layer is not setup correctly.
+        """
+
+        object.__setattr__(self, 'copies', {})
+
+        roomTypes = self.snapshot(config.roomTypes)
+        enemyTypes = self.snapshot(config.enemyTypes)
+
+        roomNames = set()
+        for roomType in roomTypes:
+            if roomType.priority < 0:
+                raise GeneratorError('Room type ' + repr(roomType.name)
+                                     + ' has a negative priority')
+
+            if not 0 <= roomType.maxDoors <= 4:
+                raise GeneratorError('Room type ' + repr(roomType.name)
+                                     + ' must allow 0 to 4 doors')
+
+            roomNames.add(roomType.name)
+
+        enemyNames = set()
+        for enemy in enemyTypes:
+            if enemy.priority < 0:
+                raise GeneratorError('Enemy type ' + repr(enemy.name)
+                                     + ' has a negative priority')
+
+            if enemy.maxCount < 0:
+                raise GeneratorError('Enemy type ' + repr(enemy.name)
+                                     + ' has a negative max count')
+
+            enemyNames.add(enemy.name)
+
+        for enemy in enemyTypes:
+            check_names(enemy.requiresEnemy, enemyNames, 'enemy', enemy.name)
+            check_names(enemy.requiresRoom, roomNames, 'room', enemy.name)
+
+        object.__setattr__(self, 'roomTypes', roomTypes)
+        object.__setattr__(self, 'enemyTypes', enemyTypes)
+
+        # Layers are compiled last, so they can make use of the validated
+        # types of this plan.
+        object.__setattr__(self, 'layers', tuple(layer.compile(self)
+                                                 for layer in config.layers))
+
+    def snapshot(self, types: Sequence[Any]) -> Tuple[Any, ...]:
+        """
+        Copies a list of room types or enemy types into this plan. Each
+        type is only copied once, so every layer which uses a type gets
+        the same copy, which is also the copy within the type lists of
+        this plan.
+
+        Parameters
+        ----------
+        types: Sequence[Any]
+            The room types or enemy types to copy.
+
+        Returns
+        -------
+        The copies of the types, in the same order.
+        """
+
+        copies = []
+        for t in types:
+            snapshot = self.copies.get(t)
+
+            if snapshot is None:
+                snapshot = copy(t)
+
+                if isinstance(t, EnemyType):
+                    snapshot.requiresEnemy = list(t.requiresEnemy)
+                    snapshot.requiresRoom = list(t.requiresRoom)
+
+                self.copies[t] = snapshot
+
+            copies.append(snapshot)
+
+        return tuple(copies)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Compiled configs cannot be modified')
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError('Compiled configs cannot be modified')
+
+
+def check_names(names: List[str], known: Set[str], kind: str,
+                owner: str) -> None:
+    """
+    Internal function for checking that every type name required by an
+    enemy type is the name of a known type.
+
+    Parameters
+    ----------
+    names: List[str]
+        The names to check.
+
+    known: Set[str]
+        The names of all known types.
+
+    kind: str
+        The kind of type being named, for error messages.
+
+    owner: str
+        The name of the type which the names belong to, for error
+        messages.
+
+    Raises
+    ------
+    GeneratorError
+        If a name is not known.
+    """
+
+    for name in names:
+        if name not in known:
+            raise GeneratorError('Enemy type ' + repr(owner) + ' requires '
+                                 + 'unknown ' + kind + ' type '
+                                 + repr(name))
+
 
 class DungeonRoom:
     """
@@ -201,9 +472,24 @@ class DungeonRoom:
 
     enemies: List[EnemyType]
         A list of all enemies which are located within this room.
+
+    listeners: List[Callable[[DungeonRoom], None]]
+        A list of functions which are called whenever an attribute of
+        this room is changed. This can be used by editors and renderers
+        to track which rooms need to be updated. Listeners must be added
+        with add_listener, and are not copied when a room is pickled.
     """
 
+    __slots__ = ('listeners', 'x', 'y', 'index', 'doors', 'depth', 'type',
+                 'difficulty', 'region', 'enemies')
+
+    # Rooms are compared by identity. This keeps room lookups, such as
+    # for sets of rooms, as cheap as possible.
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
     def __init__(self) -> None:
+        self.listeners: List[Callable[[DungeonRoom], None]] = []
         self.x = 0
         self.y = 0
         self.index = 0
@@ -214,6 +500,81 @@ class DungeonRoom:
         self.region = 0
         self.enemies: List[EnemyType] = []
 
+    def __getstate__(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in DungeonRoom.__slots__
+                if name != 'listeners'}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        object.__setattr__(self, '__class__', DungeonRoom)
+        object.__setattr__(self, 'listeners', [])
+
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def add_listener(self, listener: Callable[['DungeonRoom'], None]) \
+            -> None:
+        """
+        Adds a function to call whenever an attribute of this room is
+        assigned. Only rooms with listeners check for changes, so
+        assigning attributes of other rooms costs nothing extra.
+
+        Parameters
+        ----------
+        listener: Callable[[DungeonRoom], None]
+            The function to call with this room.
+        """
+
+        self.listeners.append(listener)
+        object.__setattr__(self, '__class__', WatchedDungeonRoom)
+
+    def remove_listener(self, listener: Callable[['DungeonRoom'], None]) \
+            -> None:
+        """
+        Removes a function added with add_listener.
+
+        Parameters
+        ----------
+        listener: Callable[[DungeonRoom], None]
+            The function to remove.
+
+        Raises
+        ------
+        ValueError
+            If the function is not a listener of this room.
+        """
+
+        self.listeners.remove(listener)
+
+        if not self.listeners:
+            object.__setattr__(self, '__class__', DungeonRoom)
+
+    def mark_changed(self) -> None:
+        """
+        Notifies all listeners of this room that the room has changed.
+        This is called automatically when an attribute is assigned, but
+        must be called manually after modifying a mutable attribute,
+        such as the enemies list, in place.
+        """
+
+        for listener in self.listeners:
+            listener(self)
+
+    def add_enemy(self, enemy: EnemyType) -> None:
+        """
+        Adds a new enemy to this room and notifies all listeners of the
+        change.
+
+        Parameters
+        ----------
+        enemy: EnemyType
+            The enemy to add.
+        """
+
+        self.enemies.append(enemy)
+
+        if self.listeners:
+            self.mark_changed()
+
     def direction_to(self, room: 'DungeonRoom') -> int:
         """
         Returns the directional value, 0 - 3, when moving from this room
@@ -296,6 +657,22 @@ class DungeonRoom:
         return count < enemy.maxCount
 
 
+class WatchedDungeonRoom(DungeonRoom):
+    """
+    The class of a dungeon room while it has listeners. Rooms switch to
+    and from this class in add_listener and remove_listener, so only
+    watched rooms pay for notifying listeners on every assignment.
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+
+        if self.listeners:
+            self.mark_changed()
+
+
 class DungeonKey:
     """
     A dungeon key is a pointer for referencing a locked door-key
@@ -410,12 +787,31 @@ class Dungeon:
     mainPath: DungeonPath
         The main path players must travel to get from the start of the
         dungeon to the end.
+
+    seed: Optional[int]
+        The seed which was used to generate this dungeon, if known.
     """
 
     def __init__(self) -> None:
         self.rooms: List[DungeonRoom] = []
         self.keys: List[DungeonKey] = []
         self.mainPath: DungeonPath = DungeonPath(False)
+        self.seed: Optional[int] = None
+
+        self.grids: Optional[DungeonGrids] = None
+        self.gridsKey: Any = None
+        self.graph: Optional[DungeonGraph] = None
+        self.graphKey: Any = None
+        self.watched = 0
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['grids'] = None
+        state['gridsKey'] = None
+        state['graph'] = None
+        state['graphKey'] = None
+        state['watched'] = 0
+        return state
 
     def add_room(self, room: DungeonRoom) -> None:
         """
@@ -453,6 +849,186 @@ class Dungeon:
 
         return (minX, minY, maxX, maxY)
 
+    def as_grids(self, roomTypes: Optional[Sequence[RoomType]] = None,
+                 shape: Optional[Tuple[int, int]] = None,
+                 out: Any = None) -> 'DungeonGrids':
+        """
+        Converts the rooms of this dungeon into a set of 2D NumPy grids,
+        with one cell per room position, aligned so that the top left
+        cell is at the minimum bounds of the dungeon. See DungeonGrids
+        for the grids which are created. NumPy must be installed to use
+        this function.
+
+        All grids are views into a single buffer. Unless an output
+        buffer is given, the grids are cached, and reused until a room
+        of the dungeon changes or a room is added, so they must not be
+        modified.
+
+        Parameters
+        ----------
+        roomTypes: Optional[Sequence[RoomType]]
+            The room types of the config used to generate the dungeon.
+            The type grid contains the index of each room's type within
+            this list. If None, the type grid is -1 for every room.
+
+        shape: Optional[Tuple[int, int]]
+            The height and width of the grids. If None, the grids are
+            the size of the dungeon bounds. A larger shape pads the grids
+            on the bottom and right, so dungeons of different sizes can
+            be stacked.
+
+        out: Any
+            A writable buffer of at least DungeonGrids.nbytes(shape)
+            bytes to write the grids into, such as one row of a larger
+            NumPy array holding a batch of dungeons. If None, a new
+            buffer is created.
+
+        Returns
+        -------
+        The grids of this dungeon.
+
+        Raises
+        ------
+        GeneratorError
+            If the given shape is smaller than the dungeon bounds, or
+            the output buffer is too small.
+        """
+
+        import numpy as np
+
+        rooms = self.rooms
+        count = len(rooms)
+
+        if count > 0:
+            minX, minY, maxX, maxY = self.bounds()
+            size = (maxY - minY + 1, maxX - minX + 1)
+        else:
+            minX = minY = 0
+            size = (0, 0)
+
+        if shape is None:
+            shape = size
+        elif shape[0] < size[0] or shape[1] < size[1]:
+            raise GeneratorError('Grid shape ' + str(shape)
+                                 + ' is smaller than the dungeon bounds '
+                                 + str(size))
+
+        typeList = None if roomTypes is None else tuple(roomTypes)
+        key = (count, shape, typeList)
+
+        if out is None and self.grids is not None and self.gridsKey == key:
+            return self.grids
+
+        if out is None:
+            # Only cached grids need to be dropped when a room changes.
+            self.watch_rooms()
+            buffer = np.zeros(DungeonGrids.nbytes(shape), dtype=np.uint8)
+        else:
+            buffer = np.frombuffer(out, dtype=np.uint8)
+            if buffer.size < DungeonGrids.nbytes(shape):
+                raise GeneratorError('Grid output buffer is too small')
+            buffer = buffer[:DungeonGrids.nbytes(shape)]
+
+        grids = DungeonGrids(buffer, shape)
+        grids.origin = (minX, minY)
+        grids.clear()
+
+        typeIds: Dict[int, int] = {}
+        if typeList is not None:
+            for i, t in enumerate(typeList):
+                typeIds.setdefault(id(t), i)
+
+        x = np.fromiter((room.x for room in rooms), dtype=np.int64,
+                        count=count)
+        y = np.fromiter((room.y for room in rooms), dtype=np.int64,
+                        count=count)
+        cells = (y - minY) * shape[1] + (x - minX)
+
+        grids.occupied.reshape(-1)[cells] = True
+        grids.index.reshape(-1)[cells] = np.arange(count, dtype=np.int32)
+        grids.region.reshape(-1)[cells] = np.fromiter(
+            (room.region for room in rooms), dtype=np.int32, count=count)
+        grids.difficulty.reshape(-1)[cells] = np.fromiter(
+            (room.difficulty for room in rooms), dtype=np.float64,
+            count=count)
+        grids.doors.reshape(-1)[cells] = np.fromiter(
+            (room.doors[0] | room.doors[1] << 1 | room.doors[2] << 2
+             | room.doors[3] << 3 for room in rooms),
+            dtype=np.uint8, count=count)
+        grids.type.reshape(-1)[cells] = np.fromiter(
+            (-1 if room.type is None else typeIds.get(id(room.type), -1)
+             for room in rooms), dtype=np.int32, count=count)
+
+        if out is None:
+            self.grids = grids
+            self.gridsKey = key
+
+        return grids
+
+    def adjacency(self, cache: bool = True) -> 'DungeonGraph':
+        """
+        Builds the room graph of this dungeon, connecting each room to
+        the neighbouring rooms it shares a doorway with. The graph is
+        cached, and reused until a room of the dungeon changes, or a
+        room or key is added.
+
+        Parameters
+        ----------
+        cache: bool
+            If false, and no graph is cached yet, a new graph is built
+            without caching it, and without listening to the rooms of
+            this dungeon. This is cheaper for dungeons which are only
+            checked once.
+
+        Returns
+        -------
+        The room graph of this dungeon.
+        """
+
+        key = (len(self.rooms), len(self.keys))
+
+        if self.graph is not None and self.graphKey == key:
+            return self.graph
+
+        if not cache:
+            return DungeonGraph(self)
+
+        self.watch_rooms()
+
+        self.graph = DungeonGraph(self)
+        self.graphKey = key
+
+        return self.graph
+
+    def watch_rooms(self) -> None:
+        """
+        Internal function for listening to changes of every room in this
+        dungeon, so cached grids and graphs can be dropped when a room
+        changes. Rooms which are already watched are skipped.
+        """
+
+        for room in self.rooms[self.watched:]:
+            room.add_listener(self.clear_caches)
+
+        self.watched = len(self.rooms)
+
+    def clear_caches(self, room: Optional[DungeonRoom] = None) -> None:
+        """
+        Drops the cached grids and room graph of this dungeon. This is
+        called automatically when a room changes, but must be called
+        manually after changing a key in place.
+
+        Parameters
+        ----------
+        room: Optional[DungeonRoom]
+            The room which changed, if any.
+        """
+
+        self.grids = None
+        self.gridsKey = None
+        self.graph = None
+        self.graphKey = None
+
     def get_room_at(self, x: int, y: int) -> Optional[DungeonRoom]:
         """
         Gets the room at the given coordinates.
@@ -547,438 +1123,2535 @@ class Dungeon:
 
         return True
 
-    def is_end_of_region(self, room: DungeonRoom) -> bool:
+    def fingerprint(self) -> str:
         """
-        This method checks if a given room is the last room within a
-        region or not.
-
-        Parameters
-        ----------
-        room: DungeonRoom
-            The room to check.
+        Creates a stable hash of the current state of this dungeon. Two
+        dungeons with the same rooms, keys and paths will always share
+        the same fingerprint, even across different processes. Room and
+        enemy types are identified by name.
 
         Returns
         -------
-        True if this room has a key in it, or is the exit room.
+        A hex string which uniquely identifies the state of this dungeon.
         """
 
-        for key in self.keys:
-            if key.lockLocation == room:
-                return True
+        h = blake2b(digest_size=20)
 
-        return room == self.mainPath.rooms[-1]
+        for room in self.rooms:
+            typeName = '' if room.type is None else room.type.name
+            enemies = ','.join(enemy.name for enemy in room.enemies)
+            h.update(repr((room.x, room.y, room.doors, room.depth, typeName,
+                           float(room.difficulty), room.region,
+                           enemies)).encode())
 
+        for key in self.keys:
+            h.update(repr((key.keyLocation.index, key.lockLocation.index,
+                           key.lockedDoor)).encode())
 
-class DungeonGENLayer(metaclass=ABCMeta):
-    """
-    A DungenGENLayer is a processing step which is used when generating
-    a dungeon to handle what information should be added to the dungeon
-    and how it should be layed out. During generation, a series of
-    layers are added to the config, which are executed in the order they
-    were added.
-    """
+        h.update(self.__path_fingerprint(self.mainPath).encode())
+        return h.hexdigest()
 
-    @abstractmethod
-    def process_dungeon(self, dungeon: Dungeon) -> None:
+    def __path_fingerprint(self, path: 'DungeonPath') -> str:
         """
-        This method is called by the dungeon generator in the sequence
-        which the generation layers are defined by the config. This call
-        is used to preform the processing.
+        An internal, recursive function for converting a path and all of
+        it's side paths into a stable string representation.
 
         Parameters
         ----------
-        dungeon: Dungeon
-            The dungeon to process.
+        path: DungeonPath
+            The path to convert.
+
+        Returns
+        -------
+        A string containing the room indices of the path and its nested
+        side paths.
         """
 
+        rooms = ','.join(str(room.index) for room in path)
+        sides = ''.join(self.__path_fingerprint(side)
+                        for side in path.sidePaths)
 
-def gen_map(config: GeneratorConfig) -> Dungeon:
-    """
-    Creates a new, randomized dungeon as specified by the config object.
+        return '(' + str(path.optional) + ':' + rooms + sides + ')'
 
-    Parameters
-    ----------
-    config: GeneratorConfig
-        The config for how the dungeon should be generated.
 
-    Returns
-    -------
-    The generated dungeon.
+class DungeonGrids:
     """
+    Dungeon grids hold the rooms of a dungeon as 2D NumPy arrays, with
+    one cell per room position. All grids are views into a single
+    buffer, in the order listed below, so the grids of many dungeons
+    can be stored as the rows of one array and read as a batch.
 
-    dungeon = Dungeon()
+    Cells without a room have an index, region and type of -1, a
+    difficulty of NaN, and no doors.
 
-    for layer in config.layers:
-        layer.process_dungeon(dungeon)
+    Attributes
+    ----------
+    buffer: numpy.ndarray
+        The bytes holding every grid. The last axis holds the grids of a
+        single dungeon. Any leading axes are batch axes.
 
-    return dungeon
+    shape: Tuple[int, int]
+        The height and width of each grid.
 
+    origin: Tuple[int, int]
+        The room coordinates of the top left cell. This is not known
+        when reading a batch of dungeons.
 
-class BranchingPathLayer(DungeonGENLayer):
-    """
-    The branching path layer is used to create a series of rooms which
-    fill the dungeon through the process of creating a path which relies
-    on a series of side paths to continue along the main path.
-    """
+    difficulty: numpy.ndarray
+        The difficulty of each room, as 64-bit floats.
 
-    def __init__(self, mainPathLength: Tuple[int, int],
-                 sidePathLength: Tuple[int, int], sidePathChance: int,
-                 optionalRoomChance: int) -> None:
+    region: numpy.ndarray
+        The region of each room, as 32-bit integers.
 
-        self.mainPathLength = mainPathLength
-        self.sidePathLength = sidePathLength
-        self.sidePathChance = sidePathChance
-        self.optionalRoomChance = optionalRoomChance
+    type: numpy.ndarray
+        The room type id of each room, as 32-bit integers.
 
-    def process_dungeon(self, dungeon: Dungeon) -> None:
-        """See DungenGENLayer for docs."""
+    index: numpy.ndarray
+        The index of each room, as 32-bit integers.
 
-        while True:
-            room = DungeonRoom()
-            dungeon.add_room(room)
-            room.depth = 0
+    doors: numpy.ndarray
+        The door bitmask of each room, where bit n is set if door n is
+        open, as bytes.
 
-            pathLength = rand(self.mainPathLength[0], self.mainPathLength[1])
-            lastRoom = self.create_path(dungeon, pathLength, room,
-                                        dungeon.mainPath)
-            if lastRoom is not None:
-                break
+    occupied: numpy.ndarray
+        Whether each cell contains a room, as booleans.
+    """
 
-            dungeon.rooms = []
-            dungeon.keys = []
-            dungeon.mainPath = DungeonPath(False)
+    FIELDS = (('difficulty', '<f8'), ('region', '<i4'), ('type', '<i4'),
+              ('index', '<i4'), ('doors', 'u1'), ('occupied', '?'))
 
-    def shuffle_directions(self, x: int, y: int) -> List[Tuple[int, int, int]]:
+    def __init__(self, buffer: Any, shape: Tuple[int, int]) -> None:
         """
-        Creates a list of room positions which touch the given room
-        coordates. The list is returned in a randomized order.
-
         Parameters
         ----------
-        x: int
-            The x position of the room.
+        buffer: numpy.ndarray
+            An array of bytes, whose last axis is DungeonGrids.nbytes
+            long, to view the grids of. The grids are not cleared.
 
-        y: int
-            The y position of the room.
+        shape: Tuple[int, int]
+            The height and width of each grid.
+        """
+
+        import numpy as np
+
+        self.buffer = buffer
+        self.shape = shape
+        self.origin = (0, 0)
+
+        batch = buffer.shape[:-1]
+        cells = shape[0] * shape[1]
+        pos = 0
+
+        grids: Dict[str, Any] = {}
+        for name, typecode in DungeonGrids.FIELDS:
+            dtype = np.dtype(typecode)
+            end = pos + cells * dtype.itemsize
+            grid = buffer[..., pos:end].view(dtype)
+            grids[name] = grid.reshape(batch + shape)
+            pos = end
+
+        self.difficulty: Any = grids['difficulty']
+        self.region: Any = grids['region']
+        self.type: Any = grids['type']
+        self.index: Any = grids['index']
+        self.doors: Any = grids['doors']
+        self.occupied: Any = grids['occupied']
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in dict(DungeonGrids.FIELDS):
+            raise KeyError(name)
+
+        return getattr(self, name)
+
+    def clear(self) -> None:
+        """
+        Resets every cell to the values of an empty cell.
+        """
+
+        self.difficulty.fill(float('nan'))
+        self.region.fill(-1)
+        self.type.fill(-1)
+        self.index.fill(-1)
+        self.doors.fill(0)
+        self.occupied.fill(False)
+
+    @staticmethod
+    def nbytes(shape: Tuple[int, int]) -> int:
+        """
+        Calculates the size of the buffer needed for the grids of a
+        single dungeon.
+
+        Parameters
+        ----------
+        shape: Tuple[int, int]
+            The height and width of each grid.
+
+        Returns
+        -------
+        The buffer size, in bytes.
+        """
+
+        return shape[0] * shape[1] * (8 + 4 + 4 + 4 + 1 + 1)
+
+
+class DungeonGraph:
+    """
+    A dungeon graph holds the doorways between the rooms of a dungeon
+    in compressed sparse row form. The edges leaving room i are stored
+    from offsets[i] up to offsets[i + 1] in the edge arrays. Every
+    doorway is stored as an edge in both directions.
+
+    Distance fields are computed with a breadth first search, and
+    cached per source room. The distance from every room to the exit is
+    computed when the graph is built.
+
+    Attributes
+    ----------
+    offsets: array
+        The start of the edges of each room. Contains one more value
+        than there are rooms.
+
+    targets: array
+        The room index each edge leads to.
+
+    directions: array
+        The door direction of each edge, within the room it leaves.
+
+    locks: array
+        The index of the key which unlocks each edge, or -1 if the
+        doorway is not locked.
+
+    keyRooms: array
+        The index of the room containing each key.
+
+    exit: int
+        The index of the exit room, or -1 if the dungeon has no main
+        path.
+
+    exitDistances: array
+        The number of doorways between each room and the exit, ignoring
+        locked doors, or -1 if the exit can not be reached.
+    """
+
+    def __init__(self, dungeon: Dungeon) -> None:
+        """
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to build the graph of.
+        """
+
+        rooms = dungeon.rooms
+        positions = {(room.x, room.y): room.index for room in rooms}
+
+        # West, north, east, south, as used by room doors.
+        steps = ((-1, 0), (0, -1), (1, 0), (0, 1))
+
+        offsets = [0]
+        targets: List[int] = []
+        directions: List[int] = []
+        oneSided: List[Tuple[int, int, int]] = []
+
+        for room in rooms:
+            doors = room.doors
+            x = room.x
+            y = room.y
+
+            for door in range(4):
+                if not doors[door]:
+                    continue
+
+                dx, dy = steps[door]
+                other = positions.get((x + dx, y + dy))
+                if other is None:
+                    continue
+
+                directions.append(door)
+                targets.append(other)
+
+                opposite = (door + 2) % 4
+                if not rooms[other].doors[opposite]:
+                    oneSided.append((other, opposite, room.index))
+
+            offsets.append(len(targets))
+
+        # A doorway which is only open on one side is still connected
+        # from both rooms, so the edges are merged and stored again.
+        if len(oneSided) > 0:
+            edges: List[List[Tuple[int, int]]] = [
+                [(directions[e], targets[e])
+                 for e in range(offsets[i], offsets[i + 1])]
+                for i in range(len(rooms))]
+
+            for other, opposite, index in oneSided:
+                edges[other].append((opposite, index))
+
+            offsets = [0]
+            targets = []
+            directions = []
+
+            for roomEdges in edges:
+                for door, other in sorted(roomEdges):
+                    directions.append(door)
+                    targets.append(other)
+
+                offsets.append(len(targets))
+
+        # Locked doors are marked from both sides of the doorway.
+        locks = [-1] * len(targets)
+        self.keyRooms = array('i')
+
+        for i, key in enumerate(dungeon.keys):
+            self.keyRooms.append(key.keyLocation.index)
+
+            lock = key.lockLocation.index
+            door = key.lockedDoor
+
+            for edge in range(offsets[lock], offsets[lock + 1]):
+                if directions[edge] != door:
+                    continue
+
+                locks[edge] = i
+                other = targets[edge]
+                opposite = (door + 2) % 4
+
+                for back in range(offsets[other], offsets[other + 1]):
+                    if directions[back] == opposite:
+                        locks[back] = i
+
+        self.offsets = array('i', offsets)
+        self.targets = array('i', targets)
+        self.directions = array('B', directions)
+        self.locks = array('i', locks)
+
+        self.sources: Dict[Tuple[int, bool], array] = {}
+
+        self.exit = -1
+        if len(dungeon.mainPath.rooms) > 0:
+            self.exit = dungeon.mainPath.rooms[-1].index
+
+        self.exitDistances = self.distances(self.exit) if self.exit >= 0 \
+            else array('i', [-1] * len(rooms))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def neighbours(self, index: int) -> array:
+        """
+        Gets the rooms which share a doorway with a room.
+
+        Parameters
+        ----------
+        index: int
+            The index of the room.
+
+        Returns
+        -------
+        The indices of the neighbouring rooms.
+        """
+
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def distances(self, source: int, locked: bool = False) -> array:
+        """
+        Finds the number of doorways between a room and every other
+        room. The result is cached, and must not be modified.
+
+        Parameters
+        ----------
+        source: int
+            The index of the room to measure from.
+
+        locked: bool
+            If true, locked doorways can not be passed. Otherwise, all
+            doorways are treated as open.
+
+        Returns
+        -------
+        The distance to each room, by room index, or -1 for rooms which
+        can not be reached.
+        """
+
+        cached = self.sources.get((source, locked))
+        if cached is not None:
+            return cached
+
+        offsets = self.offsets
+        targets = self.targets
+        locks = self.locks
+
+        dist = array('i', [-1]) * len(self)
+        dist[source] = 0
+        queue = [source]
+
+        for current in queue:
+            d = dist[current] + 1
+
+            for edge in range(offsets[current], offsets[current + 1]):
+                target = targets[edge]
+                if dist[target] >= 0 or (locked and locks[edge] >= 0):
+                    continue
+
+                dist[target] = d
+                queue.append(target)
+
+        self.sources[(source, locked)] = dist
+        return dist
+
+    def entrance_distances(self, locked: bool = False) -> array:
+        """
+        Finds the number of doorways between the starting room and every
+        other room. See distances for more information.
+
+        Parameters
+        ----------
+        locked: bool
+            If true, locked doorways can not be passed.
+
+        Returns
+        -------
+        The distance to each room, by room index.
+        """
+
+        return self.distances(0, locked)
+
+    def key_distances(self, key: int, locked: bool = False) -> array:
+        """
+        Finds the number of doorways between the room containing a key
+        and every other room. See distances for more information.
+
+        Parameters
+        ----------
+        key: int
+            The index of the key within the key list of the dungeon.
+
+        locked: bool
+            If true, locked doorways can not be passed.
+
+        Returns
+        -------
+        The distance to each room, by room index.
+        """
+
+        return self.distances(self.keyRooms[key], locked)
+
+
+class SolvabilityReport:
+    """
+    A solvability report describes whether a dungeon can be completed,
+    when locked doors can only be passed after their key is collected.
+    Keys are not used up when a door is unlocked.
+
+    Attributes
+    ----------
+    solvable: bool
+        True if the exit and every key can be reached from the starting
+        room.
+
+    unreachableKeys: List[int]
+        The indices of keys whose room can not be reached, such as keys
+        which are only reachable through their own locked door.
+
+    softLocks: List[int]
+        The indices of keys whose locked door can be reached, but whose
+        key can not. Players can walk up to these doors, but never open
+        them.
+
+    reachableRooms: int
+        The number of rooms which can be reached.
+
+    minVisits: int
+        The smallest number of room visits needed to walk from the
+        starting room to the exit, collecting whichever keys are needed
+        along the way. The starting room counts as the first visit, and
+        rooms which are passed through more than once count once for
+        each visit. This is -1 if the exit can not be reached, or if the
+        search was skipped.
+    """
+
+    def __init__(self) -> None:
+        self.solvable = False
+        self.unreachableKeys: List[int] = []
+        self.softLocks: List[int] = []
+        self.reachableRooms = 0
+        self.minVisits = -1
+
+
+def verify_dungeon(dungeon: Dungeon, visits: bool = True) \
+        -> SolvabilityReport:
+    """
+    Checks that a dungeon can be completed. A breadth first search is
+    run over the room graph of the dungeon, starting from the first
+    room. Locked doorways which are found before their key are put
+    aside, and opened as soon as their key is collected, so every room
+    is searched at most once. The minimum number of room visits is then
+    found with a second search over each room and set of held keys.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to check.
+
+    visits: bool
+        If false, the search for the minimum number of room visits is
+        skipped, which roughly halves the cost of the check.
+
+    Returns
+    -------
+    A report of the results.
+    """
+
+    report = SolvabilityReport()
+
+    if len(dungeon.rooms) == 0:
+        return report
+
+    graph = dungeon.adjacency(cache=False)
+    offsets = graph.offsets
+    targets = graph.targets
+    locks = graph.locks
+
+    keysAt: Dict[int, List[int]] = {}
+    for key, room in enumerate(graph.keyRooms):
+        keysAt.setdefault(room, []).append(key)
+
+    reached = bytearray(len(graph))
+    held = bytearray(len(graph.keyRooms))
+    waiting: Dict[int, List[int]] = {}
+
+    reached[0] = 1
+    queue = [0]
+
+    for current in queue:
+        for key in keysAt.get(current, ()):
+            held[key] = 1
+
+            for target in waiting.pop(key, ()):
+                if not reached[target]:
+                    reached[target] = 1
+                    queue.append(target)
+
+        for edge in range(offsets[current], offsets[current + 1]):
+            target = targets[edge]
+            if reached[target]:
+                continue
+
+            lock = locks[edge]
+            if lock >= 0 and not held[lock]:
+                waiting.setdefault(lock, []).append(target)
+                continue
+
+            reached[target] = 1
+            queue.append(target)
+
+    report.reachableRooms = len(queue)
+    report.unreachableKeys = [key for key, room in enumerate(graph.keyRooms)
+                              if not reached[room]]
+    report.softLocks = sorted(waiting)
+
+    if graph.exit < 0 or not reached[graph.exit]:
+        return report
+
+    report.solvable = len(report.unreachableKeys) == 0
+
+    if visits:
+        report.minVisits = min_visits(graph, keysAt)
+
+    return report
+
+
+def min_visits(graph: DungeonGraph, keysAt: Dict[int, List[int]]) -> int:
+    """
+    Internal function for finding the smallest number of room visits
+    needed to reach the exit of a dungeon, by searching over each pair
+    of room and set of held keys.
+
+    Parameters
+    ----------
+    graph: DungeonGraph
+        The room graph of the dungeon.
+
+    keysAt: Dict[int, List[int]]
+        The indices of the keys within each room.
+
+    Returns
+    -------
+    The number of room visits, or -1 if the exit can not be reached.
+    """
+
+    offsets = graph.offsets
+    targets = graph.targets
+    locks = graph.locks
+    rooms = len(graph)
+
+    keyMasks = [0] * rooms
+    for room, keys in keysAt.items():
+        for key in keys:
+            keyMasks[room] |= 1 << key
+
+    # Each state is stored as a single integer of held keys and room.
+    start = keyMasks[0] * rooms
+    seen = {start}
+    frontier = [start]
+    visits = 1
+
+    while frontier:
+        following = []
+
+        for state in frontier:
+            mask, current = divmod(state, rooms)
+            if current == graph.exit:
+                return visits
+
+            for edge in range(offsets[current], offsets[current + 1]):
+                lock = locks[edge]
+                if lock >= 0 and not mask >> lock & 1:
+                    continue
+
+                target = targets[edge]
+                nextState = (mask | keyMasks[target]) * rooms + target
+
+                if nextState not in seen:
+                    seen.add(nextState)
+                    following.append(nextState)
+
+        frontier = following
+        visits += 1
+
+    return -1
+
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def mix64(z: int) -> int:
+    """
+    The output function of the splitmix64 generator, which scrambles a
+    64 bit integer.
+
+    Parameters
+    ----------
+    z: int
+        The value to scramble, between 0 and 2^64 - 1.
+
+    Returns
+    -------
+    The scrambled value.
+    """
+
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+class CounterRNG:
+    """
+    A counter based random generator, which computes each random number
+    directly from a key and a counter, rather than from the previous
+    number. Layers use it to make the random draws of each room depend
+    only on the dungeon seed, the layer's stream and the room index, so
+    rooms can be processed in any order, or all at once with NumPy.
+
+    The value for draw d of room r is the (r * 2^32 + d + 1)th output of
+    a splitmix64 generator seeded with the key. The scalar and NumPy
+    functions return identical values.
+
+    Attributes
+    ----------
+    key: int
+        The 64 bit key derived from the seed and stream.
+    """
+
+    __slots__ = ('key',)
+
+    def __init__(self, seed: int, stream: int) -> None:
+        """
+        Parameters
+        ----------
+        seed: int
+            The seed of the dungeon.
+
+        stream: int
+            The stream of the layer. Each layer within a config should
+            use a different stream, so their draws are independent.
+        """
+
+        key = mix64((seed + GOLDEN_GAMMA) & MASK64)
+        self.key = mix64((key + (stream + 1) * GOLDEN_GAMMA) & MASK64)
+
+    @classmethod
+    def for_dungeon(cls, dungeon: Dungeon, stream: int) -> 'CounterRNG':
+        """
+        Creates the counter generator of a layer for a dungeon. If the
+        dungeon has no seed, a key is drawn from the random module.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon being generated.
+
+        stream: int
+            The stream of the layer.
+
+        Returns
+        -------
+        The counter generator.
+        """
+
+        seed = dungeon.seed
+        if seed is None:
+            seed = getrandbits(64)
+
+        return cls(seed, stream)
+
+    def bits(self, room: int, draw: int = 0) -> int:
+        """
+        Computes 64 random bits.
+
+        Parameters
+        ----------
+        room: int
+            The index of the room, between 0 and 2^32 - 1.
+
+        draw: int
+            The number of earlier draws for the same room.
+
+        Returns
+        -------
+        A random integer between 0 and 2^64 - 1.
+        """
+
+        counter = (room << 32) + draw + 1
+        return mix64((self.key + counter * GOLDEN_GAMMA) & MASK64)
+
+    def random(self, room: int, draw: int = 0) -> float:
+        """
+        Computes a random float.
+
+        Parameters
+        ----------
+        room: int
+            The index of the room.
+
+        draw: int
+            The number of earlier draws for the same room.
+
+        Returns
+        -------
+        A random float within the range [0, 1), with 53 random bits.
+        """
+
+        return (self.bits(room, draw) >> 11) * (1.0 / (1 << 53))
+
+    def randrange(self, n: int, room: int, draw: int = 0) -> int:
+        """
+        Computes a random integer.
+
+        Parameters
+        ----------
+        n: int
+            The number of values to pick from. Must be at least 1, and at
+            most 2^53 for the values to be evenly distributed.
+
+        room: int
+            The index of the room.
+
+        draw: int
+            The number of earlier draws for the same room.
+
+        Returns
+        -------
+        A random integer within the range [0, n).
+        """
+
+        return int(self.random(room, draw) * n)
+
+    def random_array(self, rooms: Any, draw: int = 0) -> Any:
+        """
+        Computes a random float for many rooms at once using NumPy.
+
+        Parameters
+        ----------
+        rooms: numpy.ndarray
+            The indices of the rooms, or a count, to use rooms 0 to
+            count - 1.
+
+        draw: int
+            The number of earlier draws for each room.
+
+        Returns
+        -------
+        A float64 array with the same values as calling random for each
+        room.
+        """
+
+        import numpy as np
+
+        if isinstance(rooms, int):
+            rooms = np.arange(rooms, dtype=np.uint64)
+        else:
+            rooms = np.asarray(rooms, dtype=np.uint64)
+
+        with np.errstate(over='ignore'):
+            z = (rooms << np.uint64(32)) + np.uint64(draw + 1)
+            z = z * np.uint64(GOLDEN_GAMMA) + np.uint64(self.key)
+            z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            z = z ^ (z >> np.uint64(31))
+
+        return (z >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+    def randrange_array(self, n: Any, rooms: Any, draw: int = 0) -> Any:
+        """
+        Computes a random integer for many rooms at once using NumPy.
+
+        Parameters
+        ----------
+        n: Union[int, numpy.ndarray]
+            The number of values to pick from, for all rooms or for each
+            room.
+
+        rooms: numpy.ndarray
+            The indices of the rooms, or a count, to use rooms 0 to
+            count - 1.
+
+        draw: int
+            The number of earlier draws for each room.
+
+        Returns
+        -------
+        An int64 array with the same values as calling randrange for
+        each room.
+        """
+
+        import numpy as np
+
+        return (self.random_array(rooms, draw) * n).astype(np.int64)
+
+
+class DungeonGENLayer(metaclass=ABCMeta):
+    """
+    A DungenGENLayer is a processing step which is used when generating
+    a dungeon to handle what information should be added to the dungeon
+    and how it should be layed out. During generation, a series of
+    layers are added to the config, which are executed in the order they
+    were added.
+    """
+
+    @abstractmethod
+    def process_dungeon(self, dungeon: Dungeon) -> None:
+        """
+        This method is called by the dungeon generator in the sequence
+        which the generation layers are defined by the config. This call
+        is used to preform the processing.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to process.
+        """
+
+    def compile(self, config: CompiledConfig) -> 'DungeonGENLayer':
+        """
+        This method is called once when a config is compiled. Layers can
+        use this to validate their parameters, and to precompute anything
+        which does not depend on the dungeon being processed. This layer
+        should not be modified; a compiled copy is returned instead, so
+        later changes to this layer do not affect the plan. By default,
+        a shallow copy of the layer is returned.
+
+        Parameters
+        ----------
+        config: CompiledConfig
+            The plan being compiled. All fields other than the layers
+            are available. Layers which hold room or enemy types should
+            use the copies returned by CompiledConfig.snapshot.
+
+        Returns
+        -------
+        The layer to use within the compiled plan.
+
+        Raises
+        ------
+        GeneratorError
+            If the parameters of this layer are not valid.
+        """
+
+        return copy(self)
+
+
+def gen_map(config: Union[GeneratorConfig, CompiledConfig],
+            seed: Optional[int] = None, retries: int = 0,
+            stats: Optional['FilterStats'] = None,
+            seedStep: int = 1) -> Dungeon:
+    """
+    Creates a new, randomized dungeon as specified by the config object.
+
+    If a filter layer rejects the dungeon, generation stops at that
+    layer, and is retried with the next seed, up to the given number of
+    times. The seed of the returned dungeon is the seed it was accepted
+    with.
+
+    Parameters
+    ----------
+    config: Union[GeneratorConfig, CompiledConfig]
+        The config for how the dungeon should be generated. A compiled
+        config generates the same dungeons as the config it was compiled
+        from, but skips any per dungeon setup.
+
+    seed: Optional[int]
+        If set, the random generator is seeded with this value before
+        generating, so the same seed always creates the same dungeon.
+
+    retries: int
+        The number of times to retry after a dungeon is rejected by a
+        filter.
+
+    stats: Optional[FilterStats]
+        If set, the number of accepted and rejected dungeons, and the
+        time spent within each layer, are added to these stats.
+
+    seedStep: int
+        The amount to increase the seed by for each retry. When
+        generating a range of seeds, setting this to the length of the
+        range keeps retries from reusing seeds within the range.
+
+    Returns
+    -------
+    The generated dungeon.
+
+    Raises
+    ------
+    DungeonRejected
+        If the dungeon was rejected by a filter, and there are no
+        retries left.
+    """
+
+    attempt = 0
+
+    while True:
+        if seed is not None:
+            set_seed(seed)
+
+        dungeon = Dungeon()
+        dungeon.seed = seed
+
+        try:
+            if stats is None:
+                for layer in config.layers:
+                    layer.process_dungeon(dungeon)
+            else:
+                stats.run_layers(config.layers, dungeon)
+
+            return dungeon
+
+        except DungeonRejected:
+            if attempt >= retries:
+                raise
+
+            attempt += 1
+            if seed is not None:
+                seed += seedStep
+
+
+class FilterStats:
+    """
+    Filter stats count how many dungeons were accepted and rejected by
+    the filter layers of a config, and how much time was saved by
+    rejecting dungeons early, compared to rejecting them after all
+    layers had run. Stats from several processes can be merged.
+
+    Attributes
+    ----------
+    accepted: int
+        The number of dungeons which passed every filter.
+
+    rejected: Dict[str, int]
+        The number of dungeons rejected by each filter, by filter name.
+
+    rejectedAt: Dict[int, int]
+        The number of dungeons rejected at each layer, by layer index.
+
+    rejectedTime: float
+        The time spent generating dungeons which were rejected, in
+        seconds.
+
+    layerTime: List[float]
+        The total time spent within each layer, in seconds.
+
+    layerRuns: List[int]
+        The number of times each layer has run.
+    """
+
+    def __init__(self) -> None:
+        self.accepted = 0
+        self.rejected: Dict[str, int] = {}
+        self.rejectedAt: Dict[int, int] = {}
+        self.rejectedTime = 0.0
+        self.layerTime: List[float] = []
+        self.layerRuns: List[int] = []
+
+    def run_layers(self, layers: Sequence['DungeonGENLayer'],
+                   dungeon: Dungeon) -> None:
+        """
+        Internal function for running each layer on a dungeon, while
+        recording the time spent within each layer.
+
+        Parameters
+        ----------
+        layers: Sequence[DungeonGENLayer]
+            The layers to run.
+
+        dungeon: Dungeon
+            The dungeon to process.
+
+        Raises
+        ------
+        DungeonRejected
+            If a filter layer rejects the dungeon.
+        """
+
+        while len(self.layerTime) < len(layers):
+            self.layerTime.append(0.0)
+            self.layerRuns.append(0)
+
+        start = perf_counter()
+        last = start
+
+        for i, layer in enumerate(layers):
+            try:
+                layer.process_dungeon(dungeon)
+            except DungeonRejected as e:
+                now = perf_counter()
+                self.layerTime[i] += now - last
+                self.layerRuns[i] += 1
+                self.rejected[e.name] = self.rejected.get(e.name, 0) + 1
+                self.rejectedAt[i] = self.rejectedAt.get(i, 0) + 1
+                self.rejectedTime += now - start
+                raise
+
+            now = perf_counter()
+            self.layerTime[i] += now - last
+            self.layerRuns[i] += 1
+            last = now
+
+        self.accepted += 1
+
+    def attempts(self) -> int:
+        """
+        Counts the number of dungeons which were generated, including
+        rejected dungeons.
+
+        Returns
+        -------
+        The number of attempts.
+        """
+
+        return self.accepted + sum(self.rejected.values())
+
+    def acceptance_rate(self) -> float:
+        """
+        Calculates the fraction of generated dungeons which passed every
+        filter.
+
+        Returns
+        -------
+        The acceptance rate, between 0 and 1, or 1 if no dungeons have
+        been generated.
+        """
+
+        attempts = self.attempts()
+        if attempts == 0:
+            return 1.0
+
+        return self.accepted / attempts
+
+    def time_saved(self) -> float:
+        """
+        Estimates the time saved by rejecting dungeons early. For each
+        rejected dungeon, this is the average time of every layer after
+        the layer which rejected it.
+
+        Returns
+        -------
+        The estimated time saved, in seconds.
+        """
+
+        average = [t / n if n > 0 else 0.0
+                   for t, n in zip(self.layerTime, self.layerRuns)]
+
+        saved = 0.0
+        for index, count in self.rejectedAt.items():
+            saved += count * sum(average[index + 1:])
+
+        return saved
+
+    def merge(self, other: 'FilterStats') -> None:
+        """
+        Adds the counts and times of another set of stats to these
+        stats. The stats must come from configs with the same layers.
+
+        Parameters
+        ----------
+        other: FilterStats
+            The stats to add.
+        """
+
+        self.accepted += other.accepted
+        self.rejectedTime += other.rejectedTime
+
+        for name, count in other.rejected.items():
+            self.rejected[name] = self.rejected.get(name, 0) + count
+
+        for index, count in other.rejectedAt.items():
+            self.rejectedAt[index] = self.rejectedAt.get(index, 0) + count
+
+        while len(self.layerTime) < len(other.layerTime):
+            self.layerTime.append(0.0)
+            self.layerRuns.append(0)
+
+        for i, (t, n) in enumerate(zip(other.layerTime, other.layerRuns)):
+            self.layerTime[i] += t
+            self.layerRuns[i] += n
+
+
+class DungeonSnapshot:
+    """
+    A dungeon snapshot is a frozen copy of the state of a dungeon, along
+    with the state of the random generator, at a single point during
+    generation. The state of each room is stored as a tuple, which is
+    shared with the previous snapshot if the room did not change, so a
+    series of snapshots only stores the rooms each layer modified.
+
+    Attributes
+    ----------
+    rooms: Tuple[Tuple[Any, ...], ...]
+        The state of each room, in room index order.
+
+    keys: Tuple[Tuple[int, int, int], ...]
+        The key room index, lock room index, and locked door of each
+        key in the dungeon.
+
+    mainPath: Tuple[Any, ...]
+        The main path of the dungeon, stored as a nested tuple of the
+        optional flag, room indices, and side paths of each path.
+
+    randomState: Any
+        The state of the random generator when the snapshot was taken.
+
+    seed: Optional[int]
+        The seed of the dungeon, which layers using a counter generator
+        draw from.
+    """
+
+    rooms: Tuple[Tuple[Any, ...], ...]
+    keys: Tuple[Tuple[int, int, int], ...]
+    mainPath: Tuple[Any, ...]
+    randomState: Any
+    seed: Optional[int]
+
+    def __init__(self, dungeon: Dungeon,
+                 previous: Optional['DungeonSnapshot'] = None) -> None:
+        """
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to take a snapshot of.
+
+        previous: Optional[DungeonSnapshot]
+            An earlier snapshot of the same dungeon. Any unchanged state
+            is shared with this snapshot rather than copied.
+        """
+
+        oldRooms: Tuple[Tuple[Any, ...], ...] = ()
+        if previous is not None:
+            oldRooms = previous.rooms
+
+        rooms = []
+        for room in dungeon.rooms:
+            state = (room.x, room.y, room.doors, room.depth, room.type,
+                     room.difficulty, room.region, tuple(room.enemies))
+
+            if room.index < len(oldRooms) and oldRooms[room.index] == state:
+                state = oldRooms[room.index]
+
+            rooms.append(state)
+
+        keys = tuple((key.keyLocation.index, key.lockLocation.index,
+                      key.lockedDoor) for key in dungeon.keys)
+
+        mainPath = self.__freeze_path(dungeon.mainPath)
+
+        if previous is not None:
+            if previous.keys == keys:
+                keys = previous.keys
+
+            if previous.mainPath == mainPath:
+                mainPath = previous.mainPath
+
+        self.rooms = tuple(rooms)
+        self.keys = keys
+        self.mainPath = mainPath
+        self.randomState = getstate()
+        self.seed = dungeon.seed
+
+    def __freeze_path(self, path: DungeonPath) -> Tuple[Any, ...]:
+        """
+        An internal, recursive function for converting a path and all of
+        it's side paths into nested tuples.
+
+        Parameters
+        ----------
+        path: DungeonPath
+            The path to convert.
+
+        Returns
+        -------
+        A tuple containing the optional flag, the room indices, and the
+        converted side paths of the path.
+        """
+
+        return (path.optional, tuple(room.index for room in path),
+                tuple(self.__freeze_path(side) for side in path.sidePaths))
+
+    def __thaw_path(self, dungeon: Dungeon,
+                    frozen: Tuple[Any, ...]) -> DungeonPath:
+        """
+        An internal, recursive function for rebuilding a path from the
+        nested tuples created by __freeze_path.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon containing the rooms of the path.
+
+        frozen: Tuple[Any, ...]
+            The frozen path.
+
+        Returns
+        -------
+        The rebuilt path.
+        """
+
+        optional, rooms, sidePaths = frozen
+
+        path = DungeonPath(optional)
+        for index in rooms:
+            path.add_room(dungeon.rooms[index])
+
+        for side in sidePaths:
+            path.add_sidepath(self.__thaw_path(dungeon, side))
+
+        return path
+
+    def restore(self) -> Dungeon:
+        """
+        Creates a new dungeon from this snapshot and restores the random
+        generator to the state it was in when the snapshot was taken.
+        The returned dungeon does not share any rooms with the snapshot,
+        so it may be freely modified.
+
+        Returns
+        -------
+        The restored dungeon.
+        """
+
+        dungeon = Dungeon()
+
+        for state in self.rooms:
+            room = DungeonRoom()
+            room.x, room.y, room.doors, room.depth, room.type, \
+                room.difficulty, room.region, enemies = state
+            room.enemies = list(enemies)
+            dungeon.add_room(room)
+
+        for keyRoom, lockRoom, lockedDoor in self.keys:
+            dungeon.keys.append(DungeonKey(dungeon.rooms[keyRoom],
+                                           dungeon.rooms[lockRoom],
+                                           lockedDoor))
+
+        dungeon.mainPath = self.__thaw_path(dungeon, self.mainPath)
+        dungeon.seed = self.seed
+
+        setstate(self.randomState)
+        return dungeon
+
+
+class GenerationPipeline:
+    """
+    A generation pipeline runs the layers of a generator config while
+    taking a snapshot of the dungeon after each layer. Generation can
+    then be resumed from any layer, which allows the parameters of later
+    layers to be tweaked and rerun without generating the earlier layers
+    again, and without losing the dungeon layout.
+
+    Attributes
+    ----------
+    config: GeneratorConfig
+        The config for how the dungeon should be generated.
+
+    snapshots: List[DungeonSnapshot]
+        The snapshots taken during the last run. The snapshot at index i
+        contains the state of the dungeon before layer i was run, and
+        the last snapshot contains the finished dungeon.
+    """
+
+    def __init__(self, config: GeneratorConfig) -> None:
+        """
+        Parameters
+        ----------
+        config: GeneratorConfig
+            The config for how the dungeon should be generated.
+        """
+
+        self.config = config
+        self.snapshots: List[DungeonSnapshot] = []
+
+    def run(self, start: int = 0, seed: Optional[int] = None) -> Dungeon:
+        """
+        Generates a dungeon, starting at the given layer. All layers
+        before the starting layer are skipped, and the dungeon is instead
+        restored from the snapshot taken during the previous run. The
+        random generator is also restored, so rerunning a layer with
+        unchanged parameters reproduces the same dungeon.
+
+        Parameters
+        ----------
+        start: int
+            The index of the first layer to run.
+
+        seed: Optional[int]
+            If set, the random generator is seeded with this value, and
+            the dungeon is given this seed, before running the first
+            layer, instead of both being restored from the snapshot.
+
+        Returns
+        -------
+        The generated dungeon.
+
+        Raises
+        ------
+        GeneratorError
+            If no snapshot exists for the starting layer.
+        """
+
+        layers = self.config.layers
+
+        if start < 0 or start > len(layers):
+            raise GeneratorError('Layer index out of range: ' + str(start))
+
+        if len(self.snapshots) == 0:
+            self.snapshots = [DungeonSnapshot(Dungeon())]
+
+        if start >= len(self.snapshots):
+            raise GeneratorError('No snapshot exists for layer ' +
+                                 str(start))
+
+        del self.snapshots[start + 1:]
+        dungeon = self.snapshots[start].restore()
+
+        if seed is not None:
+            set_seed(seed)
+            dungeon.seed = seed
+            self.snapshots[start] = DungeonSnapshot(dungeon,
+                                                    self.snapshots[start])
+
+        for layer in layers[start:]:
+            layer.process_dungeon(dungeon)
+            self.snapshots.append(DungeonSnapshot(dungeon,
+                                                  self.snapshots[-1]))
+
+        return dungeon
+
+
+class BranchingPathLayer(DungeonGENLayer):
+    """
+    The branching path layer is used to create a series of rooms which
+    fill the dungeon through the process of creating a path which relies
+    on a series of side paths to continue along the main path.
+    """
+
+    def __init__(self, mainPathLength: Tuple[int, int],
+                 sidePathLength: Tuple[int, int], sidePathChance: int,
+                 optionalRoomChance: int) -> None:
+
+        self.mainPathLength = mainPathLength
+        self.sidePathLength = sidePathLength
+        self.sidePathChance = sidePathChance
+        self.optionalRoomChance = optionalRoomChance
+
+    def compile(self, config: CompiledConfig) -> DungeonGENLayer:
+        """See DungenGENLayer for docs."""
+
+        for name, (low, high) in (('Main', self.mainPathLength),
+                                  ('Side', self.sidePathLength)):
+            if not 1 <= low < high:
+                raise GeneratorError(name + ' path length must be a range '
+                                     + 'of at least 1 room')
+
+        if self.sidePathChance < 0 or self.optionalRoomChance < 0:
+            raise GeneratorError('Room chances cannot be negative')
+
+        return copy(self)
+
+    def process_dungeon(self, dungeon: Dungeon) -> None:
+        """See DungenGENLayer for docs."""
+
+        while True:
+            room = DungeonRoom()
+            dungeon.add_room(room)
+            room.depth = 0
+
+            pathLength = rand(self.mainPathLength[0], self.mainPathLength[1])
+            lastRoom = self.create_path(dungeon, pathLength, room,
+                                        dungeon.mainPath)
+            if lastRoom is not None:
+                break
+
+            dungeon.rooms = []
+            dungeon.keys = []
+            dungeon.mainPath = DungeonPath(False)
+
+    def shuffle_directions(self, x: int, y: int) -> List[Tuple[int, int, int]]:
+        """
+        Creates a list of room positions which touch the given room
+        coordates. The list is returned in a randomized order.
+
+        Parameters
+        ----------
+        x: int
+            The x position of the room.
+
+        y: int
+            The y position of the room.
+
+        Returns
+        -------
+        The list of new possible room positions in random order. The first
+        two values of the room position tuple refer to the x and y
+        coordinates, while the third value is the direction to that room
+        from the given room coords.
+        """
+
+        directions = [(x - 1, y, 0), (x, y - 1, 1),
+                      (x + 1, y, 2), (x, y + 1, 3)]
+        shuffle(directions)
+        return directions
+
+    def create_path(self, dungeon: Dungeon, length: int,
+                    room: DungeonRoom, path: DungeonPath,
+                    depth: int = 0) -> Optional[DungeonRoom]:
+        """
+        An internal function which generates a random path starting at, but
+        not including, the given room. New rooms are added to the dungeon,
+        and cannot be placed over existing rooms. This function may call
+        itself recursively to add additional branching paths.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to add the rooms to.
+
+        length: int
+            The length of the path to generate.
+
+        room: DungeonRoom
+            The starting room. This is not part of the path, but determines
+            where the path should start from.
+
+        path: DungeonPath
+            The path which is being created.
+
+        depth: int
+            How deep the path should be. This is used internally for
+            counting depth while running recursively. This is the depth
+            value assigned to all rooms which are generated by this path.
+            Nested paths use a depth of + 1 for each recursive layer.
+
+        Returns
+        -------
+        The last room which was generated by this path. If the path could
+        not be successfully generated, the last room will return None.
+        """
+
+        path.add_room(room)
+
+        prepareLocked = False
+        keyLocation = None
+        while length > 0:
+            nextPos = None
+            for direction in self.shuffle_directions(room.x, room.y):
+                if dungeon.get_room_at(direction[0], direction[1]) == None:
+                    nextPos = direction
+
+            if nextPos is None:
+                return None
+
+            newRoom = DungeonRoom()
+            dungeon.add_room(newRoom)
+            path.add_room(newRoom)
+            newRoom.depth = depth
+
+            room.set_door(nextPos[2], True)
+            newRoom.set_door((nextPos[2] + 2) % 4, True)
+
+            if prepareLocked:
+                prepareLocked = False
+
+                if keyLocation is not None:
+                    dungeon.keys.append(DungeonKey(
+                        keyLocation, room, nextPos[2]))
+
+            newRoom.x = nextPos[0]
+            newRoom.y = nextPos[1]
+            room = newRoom
+
+            length -= 1
+
+            if length > 0:
+                if self.optionalRoomChance > 0 \
+                        and rand(self.optionalRoomChance) == 0:
+                    sidePath = DungeonPath(True)
+                    path.add_sidepath(sidePath)
+
+                    branchRoom = self.create_path(dungeon, 1, room,
+                                                  sidePath, depth=depth + 1)
+
+                    if branchRoom is None:
+                        return None
+
+                if depth == 0 and self.sidePathChance > 0\
+                        and rand(self.sidePathChance) == 0:
+                    sidePath = DungeonPath(False)
+                    path.add_sidepath(sidePath)
+
+                    l = rand(self.sidePathLength[0],
+                             self.sidePathLength[1])
+                    branchRoom = self.create_path(dungeon, l, room,
+                                                  sidePath, depth=depth + 1)
+
+                    if branchRoom is None:
+                        return None
+
+                    prepareLocked = True
+                    keyLocation = branchRoom
+
+        return room
+
+
+class AssignRegionsLayer(DungeonGENLayer):
+    """
+    The assign regions layer can be used to break down a dungeon into a
+    series of regions based on where locked doors are located. A room's
+    region number is the total number of locked doors a player must pass
+    through to reach the room from the start.
+    """
+
+    def __init__(self) -> None:
+        pass
+
+    def process_dungeon(self, dungeon: Dungeon) -> None:
+        """See DungenGENLayer for docs."""
+
+        for room in dungeon.rooms:
+            room.region = -1
+
+        dungeon.mainPath.rooms[0].region = 0
+
+        changed = True
+        while changed:
+            changed = False
+
+            for room in dungeon.rooms:
+                if room.region > -1:
+                    continue
+
+                for near in [(room.x - 1, room.y, 0),
+                             (room.x, room.y - 1, 1),
+                             (room.x + 1, room.y, 2),
+                             (room.x, room.y + 1, 3)]:
+
+                    x = near[0]
+                    y = near[1]
+                    d = near[2]
+
+                    if not room.doors[d]:
+                        continue
+
+                    n = dungeon.get_room_at(x, y)
+                    if n is None:
+                        continue
+
+                    if n.region == -1:
+                        continue
+
+                    for key in dungeon.keys:
+                        if key.lockLocation == n:
+                            if key.lockedDoor == (d + 2) % 4:
+                                room.region = n.region + 1
+                                changed = True
+                                break
+
+                    if room.region == -1:
+                        room.region = n.region
+                        changed = True
+
+
+class AssignDifficultiesLayer(DungeonGENLayer):
+    """
+    This layer is used to generate the difficulty values for each room
+    in the dungeon. This can be used to ensure a steady difficulty
+    progression is made throughout the dungeon.
+    """
+
+    def __init__(self, dropoff: float, noise: float,
+                 startingPoints: float, vectorized: bool = False,
+                 stream: Optional[int] = None) -> None:
+        """
+        Parameters
+        ----------
+        dropoff: float
+            The percentage of difficulty of a room after entering a new
+            region.
+
+        noise: float
+            How much noise to add to the difficulty after calculating
+            the value, to encourage more diversity in rooms.
+
+        startingPoints: float
+            The starting difficulty percentage for room 0, to ensure
+            early rooms aren't completely empty.
+
+        vectorized: bool
+            If true, difficulties are calculated for all rooms at once
+            using NumPy, which is much faster for large dungeons. The
+            results are identical to the default implementation. NumPy
+            must be installed to use this option.
+
+        stream: Optional[int]
+            If set, the noise of each room is drawn from a CounterRNG
+            with this stream, keyed by the room index, instead of from
+            the random module.
+        """
+
+        self.dropoff = dropoff
+        self.noise = noise
+        self.startingPoints = startingPoints
+        self.vectorized = vectorized
+        self.stream = stream
+
+    def compile(self, config: CompiledConfig) -> DungeonGENLayer:
+        """See DungenGENLayer for docs."""
+
+        if self.noise < 0:
+            raise GeneratorError('Difficulty noise cannot be negative')
+
+        if not 0 <= self.startingPoints <= 1:
+            raise GeneratorError('Starting points must be between 0 and 1')
+
+        if self.vectorized:
+            try:
+                import numpy  # noqa: F401
+            except ImportError:
+                raise GeneratorError('NumPy is required for vectorized '
+                                     + 'difficulties')
+
+        return copy(self)
+
+    def process_dungeon(self, dungeon: Dungeon) -> None:
+        """See DungenGENLayer for docs."""
+
+        if self.vectorized:
+            self.process_dungeon_vectorized(dungeon)
+            return
+
+        rng = None
+        if self.stream is not None:
+            rng = CounterRNG.for_dungeon(dungeon, self.stream)
+
+        diff = 0
+        currentRegion = 0
+        regionValues = [0] * (dungeon.region_count() + 1)
+        for room in dungeon.rooms:
+            if room.region != currentRegion:
+                currentRegion = room.region
+                regionValues[currentRegion] = diff
+
+            room.difficulty = diff
+            diff += 1
+
+        diff -= 1
+        regionValues[-1] = diff
+
+        for room in dungeon.rooms:
+            x1 = regionValues[room.region]
+            x2 = regionValues[room.region + 1]
+            n = room.difficulty
+
+            d = (((n - x1) / (x2 - x1)) ** 2) * \
+                (x2 - self.dropoff * x1) + self.dropoff * x1
+            d = (d / diff) * (1 - self.startingPoints) \
+                + self.startingPoints
+
+            r = random() if rng is None else rng.random(room.index)
+            d += r * 2 * self.noise - self.noise
+            d = max(0, min(1, d))
+
+            room.difficulty = d
+
+    def process_dungeon_vectorized(self, dungeon: Dungeon) -> None:
+        """
+        Calculates the difficulty of every room using whole array
+        operations. The same values are computed, in the same order, as
+        the default implementation, and random numbers are drawn from
+        the same random generator, so both produce identical dungeons.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to process.
+
+        Raises
+        ------
+        ZeroDivisionError
+            If a region contains only the final room of the dungeon, as
+            with the default implementation.
+        """
+
+        import numpy as np
+
+        count = len(dungeon.rooms)
+        if count == 0:
+            return
+
+        regions = np.fromiter((room.region for room in dungeon.rooms),
+                              dtype=np.int64, count=count)
+
+        if self.stream is None:
+            noise = np.fromiter((random() for _ in range(count)),
+                                dtype=np.float64, count=count)
+        else:
+            noise = CounterRNG.for_dungeon(dungeon, self.stream) \
+                .random_array(count)
+
+        previous = np.empty_like(regions)
+        previous[0] = 0
+        previous[1:] = regions[:-1]
+        starts = np.flatnonzero(regions != previous)
+
+        regionValues = np.zeros(dungeon.region_count() + 1, dtype=np.int64)
+        regionValues[regions[starts]] = starts
+
+        diff = count - 1
+        regionValues[-1] = diff
+
+        n = np.arange(count, dtype=np.int64)
+        x1 = regionValues[regions]
+        x2 = regionValues[regions + 1]
+
+        span = x2 - x1
+        if np.any(span == 0):
+            raise ZeroDivisionError('division by zero')
+
+        d = (((n - x1) / span) ** 2) * \
+            (x2 - self.dropoff * x1) + self.dropoff * x1
+        d = (d / diff) * (1 - self.startingPoints) \
+            + self.startingPoints
+
+        d += noise * 2 * self.noise - self.noise
+        d = np.clip(d, 0, 1)
+
+        for room, value in zip(dungeon.rooms, d.tolist()):
+            room.difficulty = value
+
+
+class AssignRoomTypes(DungeonGENLayer):
+    """
+    This layer is used to set the room types for each room in the
+    dungeon based on their location.
+    """
+
+    def __init__(self, roomTypes: List[RoomType],
+                 stream: Optional[int] = None) -> None:
+        """
+        Parameters
+        ----------
+        roomTypes: List[RoomType]
+            A list of room types which can be assigned.
+
+        stream: Optional[int]
+            If set, the room type of each room is picked with a
+            CounterRNG with this stream, keyed by the room index,
+            instead of with the random module.
+        """
+        self.roomTypes = roomTypes
+        self.table: Optional[RoomTypeTable] = None
+        self.stream = stream
+
+    def compile(self, config: CompiledConfig) -> DungeonGENLayer:
+        """
+        See DungenGENLayer for docs. The room type table is built once,
+        rather than for each dungeon.
+        """
+
+        layer = copy(self)
+        layer.roomTypes = list(config.snapshot(self.roomTypes))
+        layer.table = RoomTypeTable(layer.roomTypes)
+
+        if len(layer.table.entrances) == 0:
+            raise GeneratorError('No room types can be used as an entrance')
+
+        if len(layer.table.exits) == 0:
+            raise GeneratorError('No room types can be used as an exit')
+
+        if len(layer.table.available) == 0:
+            raise GeneratorError('No room types can be used between the '
+                                 + 'entrance and exit')
+
+        return layer
+
+    def process_dungeon(self, dungeon: Dungeon) -> None:
+        """See DungenGENLayer for docs."""
+
+        table = self.table
+        if table is None:
+            table = RoomTypeTable(self.roomTypes)
+
+        rng = None
+        if self.stream is not None:
+            rng = CounterRNG.for_dungeon(dungeon, self.stream)
+
+        entrance = dungeon.mainPath.rooms[0]
+        last = dungeon.mainPath.rooms[-1]
+        entrance.type = table.pick(table.entrances, rng, entrance.index)
+        last.type = table.pick(table.exits, rng, last.index)
+
+        available = table.available
+        difficulties = table.difficulties
+        weights = table.weights
+
+        for room in dungeon.rooms:
+            if room.type is not None:
+                continue
+
+            if len(available) == 0:
+                raise GeneratorError
+
+            # Room types are sorted by difficulty, so the types which
+            # fit within the room's difficulty are always a prefix.
+            count = bisect_right(difficulties, room.difficulty)
+
+            if count == 0 or weights[count - 1] == 0:
+                room.type = available[0]
+                continue
+
+            if rng is None:
+                value = rand(weights[count - 1])
+            else:
+                value = rng.randrange(weights[count - 1], room.index)
+
+            room.type = available[bisect_right(weights, value)]
+
+    def random_room(self, search: Callable[[RoomType], bool]) \
+            -> RoomType:
+        """
+        Returns a random room type from this config which matches the
+        given search criteria.
+
+        Parameters
+        ----------
+        search: Callable[[RoomType], bool]
+            The search filter to use when deciding what room types can
+            be returned. All room types for which this functions returns
+            true are considered.
+
+        Returns
+        -------
+        A random room type within the given search range.
+
+        Raises
+        ------
+        GeneratorError
+            If no room types match the search function.
+        """
+
+        table = self.table
+        if table is None:
+            table = RoomTypeTable(self.roomTypes)
+
+        return table.pick([x for x in table.roomTypes if search(x)
+                           for _ in range(x.priority)])
+
+
+class RoomTypeTable:
+    """
+    A room type table is a precompiled index over a list of room types,
+    used by the room type layer to quickly pick a room type for each
+    room.
+
+    Attributes
+    ----------
+    roomTypes: List[RoomType]
+        The room types, in their original order.
+
+    entrances: List[RoomType]
+        The room types which can be used as an entrance, with each room
+        type repeated as many times as it's priority.
+
+    exits: List[RoomType]
+        The room types which can be used as an exit, with each room type
+        repeated as many times as it's priority.
+
+    available: List[RoomType]
+        All other room types, sorted by difficulty.
+
+    difficulties: List[float]
+        The difficulty of each room type in available.
+
+    weights: List[int]
+        The cumulative priority of the room types in available.
+    """
+
+    def __init__(self, roomTypes: List[RoomType]) -> None:
+        """
+        Parameters
+        ----------
+        roomTypes: List[RoomType]
+            The room types to index.
+        """
+
+        self.roomTypes = list(roomTypes)
+        self.entrances = [x for x in roomTypes if x.isEntrance
+                          for _ in range(x.priority)]
+        self.exits = [x for x in roomTypes if x.isExit
+                      for _ in range(x.priority)]
+
+        self.available = sorted(filter(lambda x: not x.isEntrance
+                                       and not x.isExit, roomTypes),
+                                key=lambda x: x.difficulty)
+
+        self.difficulties = [x.difficulty for x in self.available]
+        self.weights = list(accumulate(x.priority for x in self.available))
+
+    def pick(self, weighted: List[RoomType],
+             rng: Optional[CounterRNG] = None, room: int = 0) -> RoomType:
+        """
+        Picks a random room type from a weighted list.
+
+        Parameters
+        ----------
+        weighted: List[RoomType]
+            The room types to pick from, with each room type repeated as
+            many times as it's priority.
+
+        rng: Optional[CounterRNG]
+            If set, the room type is picked with this generator, rather
+            than with the random module.
+
+        room: int
+            The index of the room, when picking with a counter generator.
+
+        Returns
+        -------
+        The picked room type.
+
+        Raises
+        ------
+        GeneratorError
+            If the list is empty.
+        """
+
+        count = len(weighted)
+        if count > 0:
+            if rng is not None:
+                return weighted[rng.randrange(count, room)]
+
+            return weighted[rand(count)]
+
+        raise GeneratorError
+
+
+class WeightTree:
+    """
+    A weight tree is a Fenwick tree over a list of integer weights. It
+    can be used to pick a weighted random index, or to change the weight
+    of a single index, in O(log n) time. Picking an index with a random
+    value in the range [0, total) gives the same result as indexing a
+    list in which each index is repeated as many times as it's weight.
+
+    Attributes
+    ----------
+    weights: List[int]
+        The current weight of each index.
+    """
+
+    def __init__(self, weights: List[int]) -> None:
+        """
+        Parameters
+        ----------
+        weights: List[int]
+            The initial weight of each index. Weights may not be
+            negative.
+        """
+
+        self.weights = list(weights)
+        self.tree = [0] + self.weights
+
+        size = len(self.tree)
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                self.tree[parent] += self.tree[i]
+
+        self.step = 1
+        while self.step * 2 < size:
+            self.step *= 2
+
+    def set(self, index: int, weight: int) -> None:
+        """
+        Changes the weight of a single index.
+
+        Parameters
+        ----------
+        index: int
+            The index to update.
+
+        weight: int
+            The new weight of the index.
+        """
+
+        delta = weight - self.weights[index]
+        if delta == 0:
+            return
+
+        self.weights[index] = weight
+
+        i = index + 1
+        size = len(self.tree)
+        while i < size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def total(self) -> int:
+        """
+        Gets the sum of all weights.
 
         Returns
         -------
-        The list of new possible room positions in random order. The first
-        two values of the room position tuple refer to the x and y
-        coordinates, while the third value is the direction to that room
-        from the given room coords.
+        The total weight.
         """
 
-        directions = [(x - 1, y, 0), (x, y - 1, 1),
-                      (x + 1, y, 2), (x, y + 1, 3)]
-        shuffle(directions)
-        return directions
+        total = 0
 
-    def create_path(self, dungeon: Dungeon, length: int,
-                    room: DungeonRoom, path: DungeonPath,
-                    depth: int = 0) -> Optional[DungeonRoom]:
+        i = len(self.tree) - 1
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+
+        return total
+
+    def find(self, value: int) -> int:
         """
-        An internal function which generates a random path starting at, but
-        not including, the given room. New rooms are added to the dungeon,
-        and cannot be placed over existing rooms. This function may call
-        itself recursively to add additional branching paths.
+        Finds the index which covers the given value, when each index
+        covers a range of values as wide as it's weight, in order.
 
         Parameters
         ----------
-        dungeon: Dungeon
-            The dungeon to add the rooms to.
+        value: int
+            A value in the range [0, total).
 
-        length: int
-            The length of the path to generate.
+        Returns
+        -------
+        The first index for which the sum of weights up to and including
+        that index is greater than the given value.
+        """
 
-        room: DungeonRoom
-            The starting room. This is not part of the path, but determines
-            where the path should start from.
+        index = 0
+        step = self.step
+        size = len(self.tree)
 
-        path: DungeonPath
-            The path which is being created.
+        while step > 0:
+            next = index + step
+            if next < size and self.tree[next] <= value:
+                index = next
+                value -= self.tree[next]
+            step //= 2
 
-        depth: int
-            How deep the path should be. This is used internally for
-            counting depth while running recursively. This is the depth
-            value assigned to all rooms which are generated by this path.
-            Nested paths use a depth of + 1 for each recursive layer.
+        return index
 
-        Returns
-        -------
-        The last room which was generated by this path. If the path could
-        not be successfully generated, the last room will return None.
-        """
 
-        path.add_room(room)
+class EnemyTable:
+    """
+    An enemy table is a precompiled index over a list of enemy types,
+    used to quickly find which enemy types can be placed in a room.
+    Enemy and room names are interned into integer ids, and requirements
+    are resolved into bitsets of those ids once, rather than being
+    checked by name for each placement.
 
-        prepareLocked = False
-        keyLocation = None
-        while length > 0:
-            nextPos = None
-            for direction in self.shuffle_directions(room.x, room.y):
-                if dungeon.get_room_at(direction[0], direction[1]) == None:
-                    nextPos = direction
+    Attributes
+    ----------
+    enemyTypes: List[EnemyType]
+        The enemy types, in their original order.
 
-            if nextPos is None:
-                return None
+    byDifficulty: List[int]
+        The indices of all enemy types, sorted by difficulty.
 
-            newRoom = DungeonRoom()
-            dungeon.add_room(newRoom)
-            path.add_room(newRoom)
-            newRoom.depth = depth
+    ranks: List[int]
+        The position of each enemy type within byDifficulty.
 
-            room.set_door(nextPos[2], True)
-            newRoom.set_door((nextPos[2] + 2) % 4, True)
+    difficulties: List[float]
+        The difficulty of each enemy type, in byDifficulty order.
 
-            if prepareLocked:
-                prepareLocked = False
+    enemyIds: Dict[str, int]
+        The id of each enemy name, including the names of required
+        enemies which are not within the table.
 
-                if keyLocation is not None:
-                    dungeon.keys.append(DungeonKey(
-                        keyLocation, room, nextPos[2]))
+    roomIds: Dict[str, int]
+        The id of each room type name required by an enemy type.
 
-                    keyLocation.pathNext = newRoom
-                    newRoom.pathLast = room
+    requiredEnemies: List[int]
+        A bitset of the enemy ids which each enemy type depends on, or 0
+        if it has no enemy requirements.
 
-            newRoom.x = nextPos[0]
-            newRoom.y = nextPos[1]
-            room = newRoom
+    requiredRooms: List[int]
+        A bitset of the room ids which each enemy type may be placed in,
+        or 0 if it has no room requirements.
 
-            length -= 1
+    dependents: List[List[int]]
+        The indices of all enemy types which depend on an enemy with the
+        given enemy id.
+    """
 
-            if length > 0:
-                if self.optionalRoomChance > 0 \
-                        and rand(self.optionalRoomChance) == 0:
-                    sidePath = DungeonPath(True)
-                    path.add_sidepath(sidePath)
+    def __init__(self, enemyTypes: List[EnemyType]) -> None:
+        """
+        Parameters
+        ----------
+        enemyTypes: List[EnemyType]
+            The enemy types to index.
+        """
 
-                    branchRoom = self.create_path(dungeon, 1, room,
-                                                  sidePath, depth=depth + 1)
+        self.enemyTypes = list(enemyTypes)
 
-                    if branchRoom is None:
-                        return None
+        count = len(self.enemyTypes)
+        self.byDifficulty = sorted(range(count),
+                                   key=lambda i: self.enemyTypes[i].difficulty)
+        self.difficulties = [self.enemyTypes[i].difficulty
+                             for i in self.byDifficulty]
 
-                if depth == 0 and self.sidePathChance > 0\
-                        and rand(self.sidePathChance) == 0:
-                    sidePath = DungeonPath(False)
-                    path.add_sidepath(sidePath)
+        self.ranks = [0] * count
+        for rank, i in enumerate(self.byDifficulty):
+            self.ranks[i] = rank
 
-                    l = rand(self.sidePathLength[0],
-                             self.sidePathLength[1])
-                    branchRoom = self.create_path(dungeon, l, room,
-                                                  sidePath, depth=depth + 1)
+        self.indices: Dict[EnemyType, int] = {}
+        self.enemyIds: Dict[str, int] = {}
+        self.roomIds: Dict[str, int] = {}
+        self.requiredEnemies: List[int] = []
+        self.requiredRooms: List[int] = []
 
-                    if branchRoom is None:
-                        return None
+        for i, enemy in enumerate(self.enemyTypes):
+            self.indices.setdefault(enemy, i)
+            self.enemyIds.setdefault(enemy.name, len(self.enemyIds))
 
-                    prepareLocked = True
-                    keyLocation = branchRoom
+        for enemy in self.enemyTypes:
+            requiredEnemies = 0
+            for name in enemy.requiresEnemy:
+                requiredEnemies |= 1 << self.enemyIds.setdefault(
+                    name, len(self.enemyIds))
 
-        return room
+            requiredRooms = 0
+            for name in enemy.requiresRoom:
+                requiredRooms |= 1 << self.roomIds.setdefault(
+                    name, len(self.roomIds))
 
+            self.requiredEnemies.append(requiredEnemies)
+            self.requiredRooms.append(requiredRooms)
 
-class AssignRegionsLayer(DungeonGENLayer):
+        self.dependents: List[List[int]] = [[] for _ in self.enemyIds]
+        for i, requiredEnemies in enumerate(self.requiredEnemies):
+            for enemyId in range(requiredEnemies.bit_length()):
+                if requiredEnemies >> enemyId & 1:
+                    self.dependents[enemyId].append(i)
+
+
+class EnemyPlacement:
     """
-    The assign regions layer can be used to break down a dungeon into a
-    series of regions based on where locked doors are located. A room's
-    region number is the total number of locked doors a player must pass
-    through to reach the room from the start.
+    An enemy placement tracks which enemy types from an enemy table can
+    still be added to a single room, as enemies are added to it. Enemy
+    counts and present enemy names are kept up to date after each
+    placement, so finding the next enemy to place costs O(log types).
+
+    Attributes
+    ----------
+    table: EnemyTable
+        The table of enemy types to place.
+
+    room: DungeonRoom
+        The room enemies are being placed in.
+
+    endOfRegion: bool
+        Whether or not the room is the last room within a region.
+
+    counts: List[int]
+        The number of enemies of each type within the room.
+
+    present: int
+        A bitset of the enemy ids of all enemies within the room.
+
+    roomBit: int
+        The bit of the room's type within the room id bitsets of the
+        table, or 0 if no enemy type requires it.
+
+    allowed: List[bool]
+        Whether each enemy type currently meets all requirements other
+        than difficulty.
+
+    weights: WeightTree
+        The priority of each enemy type which may currently be placed,
+        or 0 for enemy types which may not.
+
+    limit: int
+        The number of enemy types, in byDifficulty order, which fit
+        within the last difficulty passed to pick.
+
+    rng: Optional[CounterRNG]
+        If set, enemies are picked with this generator, keyed by the
+        room index and the number of picks so far, rather than with the
+        random module.
+
+    draws: int
+        The number of picks made with the counter generator.
     """
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, table: EnemyTable, room: DungeonRoom,
+                 endOfRegion: bool) -> None:
+        """
+        Parameters
+        ----------
+        table: EnemyTable
+            The table of enemy types to place.
 
-    def process_dungeon(self, dungeon: Dungeon) -> None:
-        """See DungenGENLayer for docs."""
+        room: DungeonRoom
+            The room to add enemies to.
 
-        for room in dungeon.rooms:
-            room.region = -1
+        endOfRegion: bool
+            Whether or not the room is the last room within a region.
+        """
 
-        dungeon.mainPath.rooms[0].region = 0
+        self.table = table
+        self.room = room
+        self.endOfRegion = endOfRegion
+        self.rng: Optional[CounterRNG] = None
+        self.draws = 0
 
-        changed = True
-        while changed:
-            changed = False
+        count = len(table.enemyTypes)
+        self.counts = [0] * count
+        self.present = 0
 
-            for room in dungeon.rooms:
-                if room.region > -1:
-                    continue
+        self.roomBit = 0
+        if room.type is not None and room.type.name in table.roomIds:
+            self.roomBit = 1 << table.roomIds[room.type.name]
 
-                for near in [(room.x - 1, room.y, 0),
-                             (room.x, room.y - 1, 1),
-                             (room.x + 1, room.y, 2),
-                             (room.x, room.y + 1, 3)]:
+        for enemy in room.enemies:
+            enemyId = table.enemyIds.get(enemy.name)
+            if enemyId is not None:
+                self.present |= 1 << enemyId
 
-                    x = near[0]
-                    y = near[1]
-                    d = near[2]
+            index = table.indices.get(enemy)
+            if index is not None:
+                self.counts[index] += 1
 
-                    if not room.doors[d]:
-                        continue
+        self.allowed = [self.meets_requirements(i) for i in range(count)]
 
-                    n = dungeon.get_room_at(x, y)
-                    if n is None:
-                        continue
+        self.limit = count
+        self.weights = WeightTree([self.weight(i) if self.allowed[i] else 0
+                                   for i in range(count)])
 
-                    if n.region == -1:
-                        continue
+    def pick(self, difficulty: float) -> Optional[EnemyType]:
+        """
+        Picks a random enemy type which may be added to the room. Enemy
+        types are weighted by priority.
 
-                    for key in dungeon.keys:
-                        if key.lockLocation == n:
-                            if key.lockedDoor == (d + 2) % 4:
-                                room.region = n.region + 1
-                                changed = True
-                                break
+        Parameters
+        ----------
+        difficulty: float
+            The remaining difficulty of the room. Only enemy types with
+            a difficulty of at most this value are considered.
 
-                    if room.region == -1:
-                        room.region = n.region
-                        changed = True
+        Returns
+        -------
+        The picked enemy type, or None if no enemy type can be placed.
+        """
 
+        self.set_limit(bisect_right(self.table.difficulties, difficulty))
 
-class AssignDifficultiesLayer(DungeonGENLayer):
-    """
-    This layer is used to generate the difficulty values for each room
-    in the dungeon. This can be used to ensure a steady difficulty
-    progression is made throughout the dungeon.
-    """
+        total = self.weights.total()
+        if total == 0:
+            return None
 
-    def __init__(self, dropoff: float, noise: float,
-                 startingPoints: float) -> None:
+        if self.rng is None:
+            value = rand(total)
+        else:
+            value = self.rng.randrange(total, self.room.index, self.draws)
+            self.draws += 1
+
+        return self.table.enemyTypes[self.weights.find(value)]
+
+    def add(self, enemy: EnemyType) -> None:
         """
+        Updates the placement state after an enemy has been added to the
+        room.
+
         Parameters
         ----------
-        dropoff: float
-            The percentage of difficulty of a room after entering a new
-            region.
+        enemy: EnemyType
+            The enemy which was added.
+        """
 
-        noise: float
-            How much noise to add to the difficulty after calculating
-            the value, to encourage more diversity in rooms.
+        table = self.table
+        index = table.indices.get(enemy)
 
-        startingPoints: float
-            The starting difficulty percentage for room 0, to ensure
-            early rooms aren't completely empty.
+        if index is not None:
+            self.counts[index] += 1
+
+            if self.allowed[index] and self.counts[index] >= enemy.maxCount:
+                self.allowed[index] = False
+                self.update_weight(index)
+
+        enemyId = table.enemyIds.get(enemy.name)
+        if enemyId is None or self.present >> enemyId & 1:
+            return
+
+        self.present |= 1 << enemyId
+        for dependent in table.dependents[enemyId]:
+            if not self.allowed[dependent]:
+                self.allowed[dependent] = self.meets_requirements(dependent)
+                self.update_weight(dependent)
+
+    def meets_requirements(self, index: int) -> bool:
         """
+        Checks if an enemy type meets all placement requirements for the
+        room, other than difficulty.
 
-        self.dropoff = dropoff
-        self.noise = noise
-        self.startingPoints = startingPoints
+        Parameters
+        ----------
+        index: int
+            The index of the enemy type.
 
-    def process_dungeon(self, dungeon: Dungeon) -> None:
-        """See DungenGENLayer for docs."""
+        Returns
+        -------
+        True if the room has space for another enemy of this type, and
+        all region, enemy and room type requirements are met.
+        """
 
-        diff = 0
-        currentRegion = 0
-        regionValues = [0] * (dungeon.region_count() + 1)
-        for room in dungeon.rooms:
-            if room.region != currentRegion:
-                currentRegion = room.region
-                regionValues[currentRegion] = diff
+        enemy = self.table.enemyTypes[index]
+        requiredEnemies = self.table.requiredEnemies[index]
+        requiredRooms = self.table.requiredRooms[index]
 
-            room.difficulty = diff
-            diff += 1
+        if self.counts[index] >= enemy.maxCount:
+            return False
 
-        diff -= 1
-        regionValues[-1] = diff
+        if enemy.endOfRegion and not self.endOfRegion:
+            return False
 
-        for room in dungeon.rooms:
-            x1 = regionValues[room.region]
-            x2 = regionValues[room.region + 1]
-            n = room.difficulty
+        if requiredEnemies != 0 and requiredEnemies & self.present == 0:
+            return False
+
+        if requiredRooms != 0:
+            return requiredRooms & self.roomBit != 0
+
+        return True
+
+    def set_limit(self, limit: int) -> None:
+        """
+        Internal function for changing how many enemy types, in order of
+        difficulty, fit within the remaining difficulty of the room.
+
+        Parameters
+        ----------
+        limit: int
+            The number of enemy types which fit.
+        """
+
+        order = self.table.byDifficulty
+
+        while self.limit > limit:
+            self.limit -= 1
+            self.weights.set(order[self.limit], 0)
+
+        while self.limit < limit:
+            self.limit += 1
+            self.update_weight(order[self.limit - 1])
+
+    def update_weight(self, index: int) -> None:
+        """
+        Internal function for updating the weight of an enemy type, based
+        on whether it can currently be placed.
+
+        Parameters
+        ----------
+        index: int
+            The index of the enemy type.
+        """
+
+        if self.allowed[index] and self.table.ranks[index] < self.limit:
+            self.weights.set(index, self.weight(index))
+        else:
+            self.weights.set(index, 0)
+
+    def weight(self, index: int) -> int:
+        """
+        Gets the randomization weight of an enemy type, for when it can
+        be placed.
+
+        Parameters
+        ----------
+        index: int
+            The index of the enemy type.
+
+        Returns
+        -------
+        The priority of the enemy type.
+        """
+
+        return self.table.enemyTypes[index].priority
+
+
+# Guards the placement totals of enemies layers, which are shared by
+# every compiled copy of a layer.
+STATS_LOCK = Lock()
+
+
+class PlacementStats:
+    """
+    Placement stats are metrics collected by the enemies layer while
+    placing enemies, which can be used to tune enemy tables. A room's
+    placement fails when there is difficulty budget left over, but no
+    enemy type can be placed with it.
+
+    Attributes
+    ----------
+    rooms: int
+        The total number of rooms which enemies were placed in.
 
-            d = (((n - x1) / (x2 - x1)) ** 2) * \
-                (x2 - self.dropoff * x1) + self.dropoff * x1
-            d = (d / diff) * (1 - self.startingPoints) \
-                + self.startingPoints
+    enemies: int
+        The total number of enemies which were placed.
 
-            d += random() * 2 * self.noise - self.noise
-            d = max(0, min(1, d))
+    failures: int
+        The total number of rooms where placement failed.
 
-            room.difficulty = d
+    leftover: float
+        The total difficulty budget which was left unspent.
 
+    roomFailures: List[int]
+        The number of failed placements in each room of a single
+        dungeon, indexed by room index. Only kept by the stats of one
+        dungeon, as returned by EnemiesLayer.place_enemies.
 
-class AssignRoomTypes(DungeonGENLayer):
-    """
-    This layer is used to set the room types for each room in the
-    dungeon based on their location.
+    roomLeftover: List[float]
+        The unspent difficulty budget of each room of a single dungeon,
+        indexed by room index.
     """
 
-    def __init__(self, roomTypes: List[RoomType]) -> None:
+    def __init__(self) -> None:
+        self.rooms = 0
+        self.enemies = 0
+        self.failures = 0
+        self.leftover = 0.0
+        self.roomFailures: List[int] = []
+        self.roomLeftover: List[float] = []
+
+    def start_dungeon(self, dungeon: Dungeon) -> None:
         """
+        Clears the per room metrics, to start recording a new dungeon.
+
         Parameters
         ----------
-        roomTypes: List[RoomType]
-            A list of room types which can be assigned.
+        dungeon: Dungeon
+            The dungeon which is about to be processed.
         """
-        self.roomTypes = roomTypes
 
-    def process_dungeon(self, dungeon: Dungeon) -> None:
-        """See DungenGENLayer for docs."""
+        self.roomFailures = [0] * len(dungeon.rooms)
+        self.roomLeftover = [0.0] * len(dungeon.rooms)
 
-        dungeon.mainPath.rooms[0].type = self.random_room(
-            lambda x: x.isEntrance)
+    def record(self, room: DungeonRoom, placed: int, failed: bool,
+               leftover: float) -> None:
+        """
+        Records the result of placing enemies within a single room.
 
-        dungeon.mainPath.rooms[-1].type = self.random_room(
-            lambda x: x.isExit)
+        Parameters
+        ----------
+        room: DungeonRoom
+            The room enemies were placed in.
 
-        for room in dungeon.rooms:
-            if room.type is not None:
-                continue
+        placed: int
+            The number of enemies which were placed.
 
-            try:
-                room.type = self.random_room(
-                    lambda x: not x.isEntrance
-                    and not x.isExit
-                    and x.difficulty <= room.difficulty)
+        failed: bool
+            Whether placement stopped because no enemy type could be
+            placed with the remaining budget.
+
+        leftover: float
+            The remaining difficulty budget of the room.
+        """
 
-            except GeneratorError:
-                available = list(filter(lambda x: not x.isEntrance
-                                        and not x.isExit, self.roomTypes))
+        leftover = max(0.0, leftover)
 
-                if len(available) == 0:
-                    raise GeneratorError
+        self.rooms += 1
+        self.enemies += placed
+        self.leftover += leftover
 
-                room.type = available[0]
-                for roomType in available:
-                    if roomType.difficulty < room.type.difficulty:
-                        room.type = roomType
+        if failed:
+            self.failures += 1
+            self.roomFailures[room.index] += 1
 
-    def random_room(self, search: Callable[[RoomType], bool]) \
-            -> RoomType:
+        self.roomLeftover[room.index] = leftover
+
+    def merge(self, other: 'PlacementStats') -> None:
         """
-        Returns a random room type from this config which matches the
-        given search criteria.
+        Adds the totals of another set of placement stats to this one,
+        such as stats collected by another worker process. Per room
+        metrics are not merged.
 
         Parameters
         ----------
-        search: Callable[[RoomType], bool]
-            The search filter to use when deciding what room types can
-            be returned. All room types for which this functions returns
-            true are considered.
+        other: PlacementStats
+            The stats to add.
+        """
+
+        self.rooms += other.rooms
+        self.enemies += other.enemies
+        self.failures += other.failures
+        self.leftover += other.leftover
+
+    def failure_rate(self) -> float:
+        """
+        Gets the fraction of rooms where placement failed.
 
         Returns
         -------
-        A random room type within the given search range.
-
-        Rasis
-        -----
-        GeneratorError
-            If no room types match the search function.
+        The failure rate, or 0 if no rooms have been recorded.
         """
 
-        remaining = list(filter(search, self.roomTypes))
+        if self.rooms == 0:
+            return 0.0
 
-        weighted: List[RoomType] = []
-        for room in remaining:
-            for c in range(room.priority):
-                weighted.append(room)
+        return self.failures / self.rooms
 
-        count = len(weighted)
-        if count > 0:
-            return weighted[rand(count)]
+    def mean_leftover(self) -> float:
+        """
+        Gets the average unspent difficulty budget per room.
 
-        raise GeneratorError
+        Returns
+        -------
+        The average leftover budget, or 0 if no rooms have been
+        recorded.
+        """
+
+        if self.rooms == 0:
+            return 0.0
+
+        return self.leftover / self.rooms
 
 
 class EnemiesLayer(DungeonGENLayer):
@@ -986,20 +3659,101 @@ class EnemiesLayer(DungeonGENLayer):
     This layer is used to add enemies to a dungeon based on the
     remaining difficulty score of a room after the room type is taken
     into consideration.
+
+    Attributes
+    ----------
+    enemyTypes: List[EnemyType]
+        A list of enemy types which can be placed.
+
+    stats: PlacementStats
+        The totals of all enemy placements made by this layer. Replace
+        with a new instance to reset them. The metrics of each room are
+        only returned by place_enemies.
+
+    table: Optional[EnemyTable]
+        The enemy table built when this layer was compiled, or None if
+        a new table is built for each dungeon.
+
+    stream: Optional[int]
+        If set, enemies are picked with a CounterRNG with this stream,
+        so the enemies of each room do not depend on other rooms.
     """
 
-    def __init__(self, enemyTypes: List[EnemyType]) -> None:
+    def __init__(self, enemyTypes: List[EnemyType],
+                 stream: Optional[int] = None) -> None:
         """
         Parameters
         ----------
         enemyTypes: List[EnemyType]
             A list of enemy types which can be placed.
+
+        stream: Optional[int]
+            If set, enemies are picked with a CounterRNG with this
+            stream, keyed by the room index, instead of with the random
+            module.
         """
 
         self.enemyTypes = enemyTypes
+        self.stats = PlacementStats()
+        self.table: Optional[EnemyTable] = None
+        self.stream = stream
+
+    def compile(self, config: CompiledConfig) -> DungeonGENLayer:
+        """
+        See DungenGENLayer for docs. The enemy table is built once,
+        rather than for each dungeon. The compiled layer shares it's
+        placement stats with this layer.
+        """
+
+        layer = copy(self)
+        layer.enemyTypes = list(config.snapshot(self.enemyTypes))
+        layer.table = layer.build_table()
+
+        return layer
 
     def process_dungeon(self, dungeon: Dungeon) -> None:
-        """See DungenGENLayer for docs."""
+        """
+        See DungenGENLayer for docs. The placement stats of the dungeon
+        are added to the totals of this layer.
+        """
+
+        stats = self.place_enemies(dungeon)
+
+        # Compiled copies of this layer share it's totals, and may be
+        # run on several threads at once.
+        with STATS_LOCK:
+            self.stats.merge(stats)
+
+    def place_enemies(self, dungeon: Dungeon) -> PlacementStats:
+        """
+        Adds enemies to every room of a dungeon, without adding to the
+        placement totals of this layer.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to add enemies to.
+
+        Returns
+        -------
+        The placement stats of the dungeon, including the metrics of
+        each room.
+        """
+
+        table = self.table
+        if table is None:
+            table = self.build_table()
+
+        stats = PlacementStats()
+        stats.start_dungeon(dungeon)
+
+        rng = None
+        if self.stream is not None:
+            rng = CounterRNG.for_dungeon(dungeon, self.stream)
+
+        endRooms = set(key.lockLocation for key in dungeon.keys)
+        if len(dungeon.mainPath.rooms) > 0:
+            endRooms.add(dungeon.mainPath.rooms[-1])
 
         for room in dungeon.rooms:
             if room.type is None:
@@ -1009,27 +3763,80 @@ class EnemiesLayer(DungeonGENLayer):
                 continue
 
             diff = room.difficulty - room.type.difficulty
+            placement = self.placement(table, room, room in endRooms)
+            placement.rng = rng
+
+            placed = 0
+            failed = False
 
             while diff > 0:
-                try:
-                    enemy = self.random_enemy(lambda x:
-                                              x.difficulty <= diff
-                                              and room.has_room_for(x)
-                                              and (not x.endOfRegion or dungeon.is_end_of_region(room))
-                                              and self.meets_enemy_requirements(x, room)
-                                              and self.meets_room_type_requirements(x, room))
-
-                    room.enemies.append(enemy)
-                    diff -= enemy.difficulty
-
-                except:
+                enemy = placement.pick(diff)
+                if enemy is None:
+                    failed = True
                     break
 
-            print("Room", room.index, "Enemies:")
-            for enemy in room.enemies:
-                print("  " + enemy.name)
+                room.add_enemy(enemy)
+                placement.add(enemy)
+                diff -= enemy.difficulty
+                placed += 1
+
+            stats.record(room, placed, failed, diff)
+
+        return stats
+
+    def build_table(self) -> EnemyTable:
+        """
+        Builds the enemy table used for placing enemies. This is called
+        once each time a dungeon is processed, or only once, when the
+        layer is compiled.
+
+        Returns
+        -------
+        The enemy table for the enemy types of this layer.
+        """
+
+        return EnemyTable(self.enemyTypes)
+
+    def placement(self, table: EnemyTable, room: DungeonRoom,
+                  endOfRegion: bool) -> EnemyPlacement:
+        """
+        Creates the placement state used for adding enemies to a room.
+
+        Parameters
+        ----------
+        table: EnemyTable
+            The enemy table built for the dungeon being processed.
+
+        room: DungeonRoom
+            The room to add enemies to.
+
+        endOfRegion: bool
+            Whether or not the room is the last room within a region.
+
+        Returns
+        -------
+        The placement state for the room.
+        """
 
-    def meets_enemy_requirements(self, enemy: EnemyType, room: DungeonRoom) -> bool:
+        return EnemyPlacement(table, room, endOfRegion)
+
+    def lookup_table(self) -> EnemyTable:
+        """
+        Gets the enemy table of this layer, building a new one if the
+        layer has not been compiled.
+
+        Returns
+        -------
+        The enemy table for the enemy types of this layer.
+        """
+
+        if self.table is not None:
+            return self.table
+
+        return self.build_table()
+
+    def meets_enemy_requirements(self, enemy: EnemyType,
+                                 room: DungeonRoom) -> bool:
         """
         Checks if the given enemy depends on another enemy being present
         or not. If so, checks if that enemy is within the room.
@@ -1048,16 +3855,29 @@ class EnemiesLayer(DungeonGENLayer):
         a dependency, makes sure that enemy is within the room.
         """
 
-        if len(enemy.requiresEnemy) == 0:
+        table = self.lookup_table()
+        index = table.indices.get(enemy)
+
+        if index is None:
+            # Enemy types outside of the table have no interned ids.
+            if len(enemy.requiresEnemy) == 0:
+                return True
+
+            return any(en.name in enemy.requiresEnemy for en in room.enemies)
+
+        requiredEnemies = table.requiredEnemies[index]
+        if requiredEnemies == 0:
             return True
 
         for en in room.enemies:
-            if en.name in enemy.requiresEnemy:
+            enemyId = table.enemyIds.get(en.name)
+            if enemyId is not None and requiredEnemies >> enemyId & 1:
                 return True
 
         return False
 
-    def meets_room_type_requirements(self, enemy: EnemyType, room: DungeonRoom) -> bool:
+    def meets_room_type_requirements(self, enemy: EnemyType,
+                                     room: DungeonRoom) -> bool:
         """
         Checks if the given enemy depends on a certain room type being
         used. If so, checks if the room matches that type.
@@ -1076,19 +3896,30 @@ class EnemiesLayer(DungeonGENLayer):
         a dependency, makes sure that the room matches that type.
         """
 
-        if len(enemy.requiresRoom) == 0:
+        table = self.lookup_table()
+        index = table.indices.get(enemy)
+
+        if index is None:
+            if len(enemy.requiresRoom) == 0:
+                return True
+
+            return room.type is not None \
+                and room.type.name in enemy.requiresRoom
+
+        requiredRooms = table.requiredRooms[index]
+        if requiredRooms == 0:
             return True
 
-        if room.type is None:
+        if room.type is None or room.type.name not in table.roomIds:
             return False
 
-        return room.type.name in enemy.requiresRoom
+        return requiredRooms >> table.roomIds[room.type.name] & 1 != 0
 
     def random_enemy(self, search: Callable[[EnemyType], bool]) \
             -> EnemyType:
         """
         Returns a random enemy type from this config which matches the
-        given search criteria.
+        given search criteria. Enemy types are weighted by priority.
 
         Parameters
         ----------
@@ -1101,21 +3932,315 @@ class EnemiesLayer(DungeonGENLayer):
         -------
         A random enemy type within the given search range.
 
-        Rasis
-        -----
+        Raises
+        ------
         GeneratorError
             If no enemy types match the search function.
         """
 
-        remaining = list(filter(search, self.enemyTypes))
+        table = self.lookup_table()
+        weights = WeightTree([x.priority if search(x) else 0
+                              for x in table.enemyTypes])
 
-        weighted: List[EnemyType] = []
-        for enemy in remaining:
-            for c in range(enemy.priority):
-                weighted.append(enemy)
-
-        count = len(weighted)
-        if count > 0:
-            return weighted[rand(count)]
+        total = weights.total()
+        if total > 0:
+            return table.enemyTypes[weights.find(rand(total))]
 
         raise GeneratorError
+
+
+class TeamEnemyPlacement(EnemyPlacement):
+    """
+    A team enemy placement is an enemy placement which favors enemy
+    types that work well together with the enemies already within the
+    room. Each enemy type has a bonus, equal to the sum of it's synergy
+    with every enemy in the room, and is weighted by it's priority
+    multiplied by 100 plus that bonus.
+
+    Attributes
+    ----------
+    synergy: List[List[int]]
+        The synergy between each pair of enemy types, indexed by enemy
+        type index.
+
+    partners: List[List[int]]
+        The indices of the enemy types which have a non-zero synergy
+        with each enemy type.
+
+    bonus: List[int]
+        The current synergy bonus of each enemy type.
+    """
+
+    def __init__(self, table: EnemyTable, room: DungeonRoom,
+                 endOfRegion: bool, synergy: List[List[int]],
+                 partners: List[List[int]]) -> None:
+        """
+        Parameters
+        ----------
+        table: EnemyTable
+            The table of enemy types to place.
+
+        room: DungeonRoom
+            The room to add enemies to.
+
+        endOfRegion: bool
+            Whether or not the room is the last room within a region.
+
+        synergy: List[List[int]]
+            The synergy between each pair of enemy types.
+
+        partners: List[List[int]]
+            The indices of the enemy types which have a non-zero
+            synergy with each enemy type.
+        """
+
+        self.synergy = synergy
+        self.partners = partners
+        self.bonus = [0] * len(table.enemyTypes)
+
+        super().__init__(table, room, endOfRegion)
+
+        for index, count in enumerate(self.counts):
+            if count > 0:
+                self.add_synergy(index, count)
+
+    def add(self, enemy: EnemyType) -> None:
+        """See EnemyPlacement for docs."""
+
+        super().add(enemy)
+
+        index = self.table.indices.get(enemy)
+        if index is not None:
+            self.add_synergy(index, 1)
+
+    def add_synergy(self, index: int, count: int) -> None:
+        """
+        Internal function for adding the synergy of a number of enemies
+        of a single type to the bonus of all partner enemy types.
+
+        Parameters
+        ----------
+        index: int
+            The index of the enemy type which was added.
+
+        count: int
+            The number of enemies of that type which were added.
+        """
+
+        row = self.synergy[index]
+        for partner in self.partners[index]:
+            self.bonus[partner] += row[partner] * count
+            self.update_weight(partner)
+
+    def weight(self, index: int) -> int:
+        """
+        See EnemyPlacement for docs. The priority of the enemy type is
+        scaled by it's synergy bonus.
+        """
+
+        priority = self.table.enemyTypes[index].priority
+        return priority * max(0, 100 + self.bonus[index])
+
+
+class TeamEnemiesLayer(EnemiesLayer):
+    """
+    This layer adds enemies to a dungeon in the same way as the enemies
+    layer, but biases each pick towards enemy types which form a team
+    with the enemies already placed in the room.
+
+    Attributes
+    ----------
+    teams: List[Tuple[List[str], int]]
+        The enemy teams, and the synergy weight of each team.
+
+    synergy: List[List[int]]
+        The synergy between each pair of enemy types, indexed by enemy
+        type index.
+
+    partners: List[List[int]]
+        The indices of the enemy types which have a non-zero synergy
+        with each enemy type.
+
+    synergyKey: Any
+        The enemy types and teams the synergy matrix was built for. The
+        matrix is only rebuilt once either of them changes.
+    """
+
+    def __init__(self, enemyTypes: List[EnemyType],
+                 teams: List[Tuple[List[str], int]],
+                 stream: Optional[int] = None) -> None:
+        """
+        Parameters
+        ----------
+        enemyTypes: List[EnemyType]
+            A list of enemy types which can be placed.
+
+        teams: List[Tuple[List[str], int]]
+            A list of enemy teams. Each team is a list of enemy names,
+            along with a synergy weight. Each enemy within a room adds
+            the synergy weight, as a percentage, to the priority of all
+            other enemy types within the same team.
+
+        stream: Optional[int]
+            See EnemiesLayer for docs.
+        """
+
+        super().__init__(enemyTypes, stream)
+        self.teams = teams
+
+        self.synergy: List[List[int]] = []
+        self.partners: List[List[int]] = []
+        self.synergyKey: Any = None
+
+    def compile(self, config: CompiledConfig) -> DungeonGENLayer:
+        """See EnemiesLayer for docs. The team list is copied as well."""
+
+        layer = copy(self)
+        layer.teams = [(list(names), weight) for names, weight in self.teams]
+
+        return EnemiesLayer.compile(layer, config)
+
+    def build_table(self) -> EnemyTable:
+        """
+        See EnemiesLayer for docs. The team list is also compiled into a
+        dense synergy matrix over the enemy types of the table, unless
+        the matrix was already built for the same enemy types and teams.
+        """
+
+        table = super().build_table()
+
+        key = (tuple(id(enemy) for enemy in table.enemyTypes),
+               tuple((tuple(names), weight) for names, weight in self.teams))
+
+        if key != self.synergyKey:
+            self.build_synergy(table)
+            self.synergyKey = key
+
+        return table
+
+    def build_synergy(self, table: EnemyTable) -> None:
+        """
+        Internal function for compiling the team list into the synergy
+        matrix and partner lists of this layer.
+
+        Parameters
+        ----------
+        table: EnemyTable
+            The enemy table the matrix is indexed by.
+        """
+
+        count = len(table.enemyTypes)
+
+        byName: Dict[str, List[int]] = {}
+        for i, enemy in enumerate(table.enemyTypes):
+            byName.setdefault(enemy.name, []).append(i)
+
+        synergy = [[0] * count for _ in range(count)]
+        for names, weight in self.teams:
+            members = [i for name in names for i in byName.get(name, [])]
+
+            for a in members:
+                for b in members:
+                    if a != b:
+                        synergy[a][b] += weight
+
+        self.partners = [[b for b in range(count) if row[b] != 0]
+                         for row in synergy]
+        self.synergy = synergy
+
+    def placement(self, table: EnemyTable, room: DungeonRoom,
+                  endOfRegion: bool) -> EnemyPlacement:
+        """See EnemiesLayer for docs."""
+
+        return TeamEnemyPlacement(table, room, endOfRegion,
+                                  self.synergy, self.partners)
+
+
+class VerifySolvableLayer(DungeonGENLayer):
+    """
+    A layer which checks that the dungeon can be completed, as checked
+    by verify_dungeon, and rejects it otherwise. This layer should be
+    added after all keys have been placed. It does not draw from the
+    random generator, so it does not change the dungeons which are
+    generated. Rejected dungeons are retried by gen_map like those of a
+    filter named 'solvable'. Use verify_dungeon directly to get the full
+    report of a dungeon.
+
+    Attributes
+    ----------
+    visits: bool
+        Whether to find the minimum number of room visits of each
+        dungeon. This is skipped by default, as it is not needed to
+        decide whether a dungeon can be completed.
+    """
+
+    def __init__(self, visits: bool = False) -> None:
+        """
+        Parameters
+        ----------
+        visits: bool
+            Whether to find the minimum number of room visits of each
+            dungeon.
+        """
+
+        self.visits = visits
+
+    def process_dungeon(self, dungeon: Dungeon) -> None:
+        """
+        See DungeonGENLayer for docs.
+
+        Raises
+        ------
+        DungeonRejected
+            If the dungeon can not be completed.
+        """
+
+        if not verify_dungeon(dungeon, self.visits).solvable:
+            raise DungeonRejected('solvable')
+
+
+class FilterLayer(DungeonGENLayer):
+    """
+    A filter layer checks a condition on the dungeon generated so far,
+    and rejects the dungeon if it is not met. Filters are usually added
+    with GeneratorConfig.add_filter. Filters must not draw from the
+    random generator, so they do not change the dungeons which are
+    accepted.
+
+    Attributes
+    ----------
+    predicate: Callable[[Dungeon], bool]
+        The condition to check.
+
+    name: str
+        The name of the filter, used when reporting rejections.
+    """
+
+    def __init__(self, predicate: Callable[[Dungeon], bool],
+                 name: str) -> None:
+        """
+        Parameters
+        ----------
+        predicate: Callable[[Dungeon], bool]
+            The condition to check. Dungeons for which this returns
+            False are rejected.
+
+        name: str
+            The name of the filter.
+        """
+
+        self.predicate = predicate
+        self.name = name
+
+    def process_dungeon(self, dungeon: Dungeon) -> None:
+        """
+        See DungeonGENLayer for docs.
+
+        Raises
+        ------
+        DungeonRejected
+            If the dungeon does not meet the condition.
+        """
+
+        if not self.predicate(dungeon):
+            raise DungeonRejected(self.name)
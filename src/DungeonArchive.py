@@ -0,0 +1,517 @@
+"""
+DungeonArchive is a module for storing large numbers of packed dungeons
+in a single, append only archive, which can be read without loading the
+whole archive into memory.
+
+An archive is made of two files. The data file holds the packed
+dungeons, one after another, as written by DungeonIO.pack. The index
+file, which has the same name with '.idx' added, holds one fixed size
+entry per dungeon, with it's seed, the position of it's record within
+the data file, and a few summary values which can be used to find
+dungeons without unpacking them.
+
+Both files are read through memory maps, so looking up a dungeon by
+seed, or scanning the index for dungeons matching some condition, only
+touches the parts of the files which are used. Records are returned as
+PackedDungeon views into the memory map, without copying.
+
+An entry is only added to the index after it's record has been written,
+so if writing is interrupted, the archive stays readable, and at most
+the last record is lost.
+"""
+
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, \
+    Sequence
+import mmap
+import os
+import struct
+
+from DunGEN import Dungeon, RoomType, EnemyType, GeneratorError
+from DungeonIO import Buffer, PackedDungeon, pack
+
+
+INDEX_HEADER = struct.Struct('<4sI')
+INDEX_MAGIC = b'DGX1'
+
+# seed, offset, length, rooms, keys, enemies, regions, max depth
+ENTRY = struct.Struct('<qQIIIIIi')
+
+
+class ArchiveEntry:
+    """
+    An archive entry is the index record of a single dungeon within an
+    archive.
+
+    Attributes
+    ----------
+    seed: Optional[int]
+        The seed the dungeon was generated with, if known.
+
+    offset: int
+        The position of the packed dungeon within the data file.
+
+    length: int
+        The size of the packed dungeon, in bytes.
+
+    roomCount: int
+        The number of rooms in the dungeon.
+
+    keyCount: int
+        The number of keys in the dungeon.
+
+    enemyCount: int
+        The total number of enemies in the dungeon.
+
+    regionCount: int
+        The number of regions in the dungeon.
+
+    maxDepth: int
+        The largest depth of any room in the dungeon.
+    """
+
+    __slots__ = ('seed', 'offset', 'length', 'roomCount', 'keyCount',
+                 'enemyCount', 'regionCount', 'maxDepth')
+
+    def __init__(self, seed: int, offset: int, length: int, roomCount: int,
+                 keyCount: int, enemyCount: int, regionCount: int,
+                 maxDepth: int) -> None:
+        """
+        Parameters
+        ----------
+        seed: int
+            The seed of the dungeon, or -1 if it is not known.
+
+        See the class attributes for the remaining parameters.
+        """
+
+        self.seed: Optional[int] = None if seed < 0 else seed
+        self.offset = offset
+        self.length = length
+        self.roomCount = roomCount
+        self.keyCount = keyCount
+        self.enemyCount = enemyCount
+        self.regionCount = regionCount
+        self.maxDepth = maxDepth
+
+
+class DungeonArchive:
+    """
+    An append only archive of packed dungeons. See the module docs for
+    the file layout.
+
+    Archives can be used as context managers, which closes them on exit.
+
+    Attributes
+    ----------
+    path: str
+        The path of the data file.
+
+    writable: bool
+        Whether dungeons can be appended to this archive.
+    """
+
+    def __init__(self, path: str, mode: str = 'r') -> None:
+        """
+        Parameters
+        ----------
+        path: str
+            The path of the data file. The index file is stored next to
+            it, with '.idx' added to the name.
+
+        mode: str
+            Either 'r' to open an existing archive for reading, or 'a'
+            to open an archive for reading and appending, creating it if
+            it does not exist.
+
+        Raises
+        ------
+        GeneratorError
+            If the mode is unknown, or the index file is not a dungeon
+            archive index.
+
+        FileNotFoundError
+            If the archive is opened for reading and does not exist.
+        """
+
+        if mode not in ('r', 'a'):
+            raise GeneratorError('Unknown archive mode: ' + mode)
+
+        if mode == 'r' and not os.path.exists(path + '.idx'):
+            raise FileNotFoundError('Archive index not found: '
+                                    + path + '.idx')
+
+        self.path = path
+        self.writable = mode == 'a'
+
+        self.dataFile: Optional[BinaryIO] = None
+        self.indexFile: Optional[BinaryIO] = None
+
+        if self.writable:
+            self.dataFile = open(path, 'ab')
+            self.indexFile = open(path + '.idx', 'ab')
+
+            size = self.indexFile.tell()
+
+            if size == 0:
+                self.indexFile.write(INDEX_HEADER.pack(INDEX_MAGIC,
+                                                       ENTRY.size))
+                self.indexFile.flush()
+            elif size > INDEX_HEADER.size:
+                # Drop a partially written entry, so new entries line up.
+                entries = (size - INDEX_HEADER.size) // ENTRY.size
+                self.indexFile.truncate(INDEX_HEADER.size
+                                        + entries * ENTRY.size)
+
+        self.dataMap: Optional[mmap.mmap] = None
+        self.indexMap: Optional[mmap.mmap] = None
+        self.count = 0
+        self.seeds: Optional[Dict[int, int]] = None
+        self.seeded = 0
+
+        self.remap()
+
+    def __enter__(self) -> 'DungeonArchive':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> PackedDungeon:
+        return self.read(self.entry(index))
+
+    def __iter__(self) -> Iterator[PackedDungeon]:
+        for i in range(self.count):
+            yield self[i]
+
+    def remap(self) -> None:
+        """
+        Internal function for mapping the data and index files into
+        memory, after they have been opened or appended to. Views into
+        the previous maps stay valid.
+
+        Raises
+        ------
+        GeneratorError
+            If the index file is not a dungeon archive index.
+        """
+
+        self.dataMap = map_file(self.path)
+        self.indexMap = map_file(self.path + '.idx')
+
+        if self.indexMap is None:
+            self.count = 0
+            return
+
+        if len(self.indexMap) < INDEX_HEADER.size:
+            raise GeneratorError('Archive index is truncated')
+
+        magic, entrySize = INDEX_HEADER.unpack_from(self.indexMap)
+
+        if magic != INDEX_MAGIC or entrySize != ENTRY.size:
+            raise GeneratorError('File is not a dungeon archive index')
+
+        # A partially written entry at the end is ignored.
+        self.count = (len(self.indexMap) - INDEX_HEADER.size) // ENTRY.size
+
+    def append(self, dungeon: Dungeon, roomTypes: Sequence[RoomType],
+               enemyTypes: Sequence[EnemyType]) -> int:
+        """
+        Packs a dungeon and adds it to the end of this archive.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to add.
+
+        roomTypes: Sequence[RoomType]
+            The room types of the config used to generate the dungeon.
+
+        enemyTypes: Sequence[EnemyType]
+            The enemy types of the config used to generate the dungeon.
+
+        Returns
+        -------
+        The index of the new entry.
+        """
+
+        return self.append_packed(pack(dungeon, roomTypes, enemyTypes))
+
+    def append_packed(self, data: Buffer) -> int:
+        """
+        Adds an already packed dungeon to the end of this archive. The
+        summary values of the index entry are read from the packed
+        dungeon.
+
+        Parameters
+        ----------
+        data: Buffer
+            The packed dungeon.
+
+        Returns
+        -------
+        The index of the new entry.
+
+        Raises
+        ------
+        GeneratorError
+            If the archive is not writable, or the data does not contain
+            a packed dungeon.
+        """
+
+        if self.dataFile is None or self.indexFile is None:
+            raise GeneratorError('Archive is not open for appending')
+
+        packed = PackedDungeon(data)
+        maxDepth = max(packed.depth) if packed.roomCount > 0 else 0
+        seed = -1 if packed.seed is None else packed.seed
+
+        offset = self.dataFile.seek(0, os.SEEK_END)
+        self.dataFile.write(data[:packed.size])
+        self.dataFile.flush()
+
+        self.indexFile.write(ENTRY.pack(seed, offset, packed.size,
+                                        packed.roomCount, packed.keyCount,
+                                        packed.enemyCount, packed.regionCount,
+                                        maxDepth))
+        self.indexFile.flush()
+
+        # The maps are refreshed the next time an entry is read.
+        self.dataMap = None
+        self.indexMap = None
+        self.count += 1
+
+        return self.count - 1
+
+    def entry(self, index: int) -> ArchiveEntry:
+        """
+        Reads a single index entry.
+
+        Parameters
+        ----------
+        index: int
+            The index of the entry, in the order the dungeons were
+            added. Negative indices count from the end.
+
+        Returns
+        -------
+        The index entry.
+
+        Raises
+        ------
+        IndexError
+            If there is no entry with the given index.
+        """
+
+        if self.indexMap is None:
+            self.remap()
+
+        if index < 0:
+            index += self.count
+
+        if self.indexMap is None or not 0 <= index < self.count:
+            raise IndexError('Archive entry out of range')
+
+        return ArchiveEntry(*ENTRY.unpack_from(
+            self.indexMap, INDEX_HEADER.size + index * ENTRY.size))
+
+    def entries(self) -> Iterator[ArchiveEntry]:
+        """
+        Iterates over all index entries, in the order the dungeons were
+        added. Only the index file is read.
+
+        Returns
+        -------
+        An iterator over the index entries.
+        """
+
+        if self.indexMap is None:
+            self.remap()
+
+        if self.indexMap is None or self.count == 0:
+            return
+
+        view = memoryview(self.indexMap)[
+            INDEX_HEADER.size:INDEX_HEADER.size + self.count * ENTRY.size]
+
+        try:
+            for values in ENTRY.iter_unpack(view):
+                yield ArchiveEntry(*values)
+        finally:
+            view.release()
+
+    def read(self, entry: ArchiveEntry) -> PackedDungeon:
+        """
+        Reads the packed dungeon of an index entry, without copying it.
+
+        Parameters
+        ----------
+        entry: ArchiveEntry
+            The index entry.
+
+        Returns
+        -------
+        A packed dungeon which views the memory map of the data file.
+        """
+
+        if self.dataMap is None:
+            self.remap()
+
+        if self.dataMap is None \
+                or entry.offset + entry.length > len(self.dataMap):
+            raise GeneratorError('Archive data file is truncated')
+
+        view = memoryview(self.dataMap)[entry.offset:
+                                        entry.offset + entry.length]
+        return PackedDungeon(view)
+
+    def find(self, seed: int) -> Optional[ArchiveEntry]:
+        """
+        Finds the index entry of the dungeon with the given seed. A
+        lookup table of all seeds is built from the index the first
+        time this is called. If several dungeons have the same seed, the
+        last one added is found.
+
+        Parameters
+        ----------
+        seed: int
+            The seed of the dungeon.
+
+        Returns
+        -------
+        The index entry, or None if there is no dungeon with that seed.
+        """
+
+        if self.seeds is None:
+            self.seeds = {}
+            self.seeded = 0
+
+        # Entries added since the last lookup are added to the table.
+        if self.seeded < self.count:
+            for i in range(self.seeded, self.count):
+                entry = self.entry(i)
+                if entry.seed is not None:
+                    self.seeds[entry.seed] = i
+            self.seeded = self.count
+
+        index = self.seeds.get(seed)
+        if index is None:
+            return None
+
+        return self.entry(index)
+
+    def get(self, seed: int) -> Optional[PackedDungeon]:
+        """
+        Reads the packed dungeon with the given seed, without copying
+        it.
+
+        Parameters
+        ----------
+        seed: int
+            The seed of the dungeon.
+
+        Returns
+        -------
+        The packed dungeon, or None if there is no dungeon with that
+        seed.
+        """
+
+        entry = self.find(seed)
+        if entry is None:
+            return None
+
+        return self.read(entry)
+
+    def select(self, predicate: Callable[[ArchiveEntry], bool]) \
+            -> Iterator[PackedDungeon]:
+        """
+        Scans the index and reads every packed dungeon whose index
+        entry matches a condition. Records of dungeons which do not
+        match are never read.
+
+        Parameters
+        ----------
+        predicate: Callable[[ArchiveEntry], bool]
+            The condition to test each index entry with.
+
+        Returns
+        -------
+        An iterator over the matching packed dungeons, in the order they
+        were added.
+        """
+
+        for entry in self.entries():
+            if predicate(entry):
+                yield self.read(entry)
+
+    def index_array(self) -> Any:
+        """
+        Creates a NumPy view of the index, with one record per entry.
+        The fields are named after the attributes of ArchiveEntry, with
+        a seed of -1 where the seed is not known. The view shares memory
+        with the memory map, so it must not be used after the archive is
+        closed. NumPy must be installed to use this function.
+
+        Returns
+        -------
+        A structured NumPy array of the index entries.
+        """
+
+        import numpy as np
+
+        dtype = np.dtype([('seed', '<i8'), ('offset', '<u8'),
+                          ('length', '<u4'), ('roomCount', '<u4'),
+                          ('keyCount', '<u4'), ('enemyCount', '<u4'),
+                          ('regionCount', '<u4'), ('maxDepth', '<i4')])
+
+        if self.indexMap is None:
+            self.remap()
+
+        if self.indexMap is None or self.count == 0:
+            return np.zeros(0, dtype=dtype)
+
+        return np.frombuffer(self.indexMap, dtype=dtype, count=self.count,
+                             offset=INDEX_HEADER.size)
+
+    def close(self) -> None:
+        """
+        Closes the files of this archive. Packed dungeons which were
+        read from the archive keep their memory map open until they are
+        no longer used.
+        """
+
+        for file in (self.dataFile, self.indexFile):
+            if file is not None:
+                file.close()
+
+        self.dataFile = None
+        self.indexFile = None
+        self.dataMap = None
+        self.indexMap = None
+
+
+def map_file(path: str) -> Optional[mmap.mmap]:
+    """
+    Maps a whole file into memory for reading.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file.
+
+    Returns
+    -------
+    The memory map, or None if the file is empty or does not exist.
+    """
+
+    try:
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return None
+
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
@@ -0,0 +1,298 @@
+"""
+DungeonAsync is a module for generating and rendering dungeons from
+within an asyncio event loop, without blocking it.
+
+Generation runs one layer at a time on an executor, and rendering runs
+one render layer at a time on a thread pool. The event loop only waits
+between these steps, so cancelling a task, such as with a timeout, stops
+the work after the step which is currently running instead of after the
+whole dungeon is done.
+"""
+
+from typing import Any, Dict, Optional, Sequence, Tuple, Union, \
+    TYPE_CHECKING
+from concurrent.futures import Executor
+from random import Random, getrandbits, getstate, setstate
+from threading import Lock
+import asyncio
+from DunGEN import Dungeon, DungeonGENLayer, GeneratorConfig, CompiledConfig
+
+if TYPE_CHECKING:
+    from DungeonPainter import PainterConfig, PaintableRooms, RenderLayer
+
+
+# Layers draw from the shared random module, so only one layer may run
+# at a time within a process, each with the state of it's own dungeon.
+RANDOM_LOCK = Lock()
+
+
+# The room types and enemy types of a config.
+Types = Tuple[Sequence[Any], Sequence[Any]]
+
+
+def run_layer(layer: DungeonGENLayer, dungeon: Dungeon, randomState: Any,
+              types: Types) -> Tuple[Dungeon, Any, Types]:
+    """
+    Runs a single generator layer with the given random generator state.
+    The state of the shared random generator is restored afterwards, so
+    other code using the random module within the same process is not
+    affected.
+
+    The types of the config are passed through unchanged. When running
+    in another process, they are copied along with the dungeon, so the
+    copies within the dungeon can be matched to the original types by
+    their position within the config.
+
+    Parameters
+    ----------
+    layer: DungeonGENLayer
+        The layer to run.
+
+    dungeon: Dungeon
+        The dungeon to process.
+
+    randomState: Any
+        The random generator state to run the layer with.
+
+    types: Types
+        The room types and enemy types of the config.
+
+    Returns
+    -------
+    The processed dungeon, the random generator state after the layer
+    has run, and the types of the config. When running in another
+    process, the dungeon and types are copies of the ones that were
+    passed in.
+    """
+
+    with RANDOM_LOCK:
+        saved = getstate()
+        setstate(randomState)
+
+        try:
+            layer.process_dungeon(dungeon)
+            return dungeon, getstate(), types
+        finally:
+            setstate(saved)
+
+
+def restore_types(dungeon: Dungeon, copies: Types, types: Types) -> None:
+    """
+    Internal function for replacing the copied room types and enemy
+    types of a dungeon which was returned from another process with the
+    original types of the config, so types can still be compared by
+    identity. Types which are not part of the config are left as is.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon which was returned.
+
+    copies: Types
+        The copies of the config types which were returned along with
+        the dungeon.
+
+    types: Types
+        The original types of the config.
+    """
+
+    originals: Dict[int, Any] = {}
+    for copied, original in zip(copies, types):
+        for a, b in zip(copied, original):
+            originals[id(a)] = b
+
+    for room in dungeon.rooms:
+        if room.type is not None:
+            room.type = originals.get(id(room.type), room.type)
+
+        if len(room.enemies) > 0:
+            room.enemies = [originals.get(id(enemy), enemy)
+                            for enemy in room.enemies]
+
+
+async def gen_map_async(config: Union[GeneratorConfig, CompiledConfig],
+                        seed: Optional[int] = None,
+                        executor: Optional[Executor] = None) -> Dungeon:
+    """
+    Creates a new, randomized dungeon as specified by the config object,
+    without blocking the event loop. Each layer is run as a separate
+    step on the executor, with the random generator state carried from
+    one step to the next, so the dungeon is identical to the one made by
+    gen_map with the same seed.
+
+    If the task is cancelled, the layer which is currently running is
+    allowed to finish, but no further layers are started.
+
+    Parameters
+    ----------
+    config: Union[GeneratorConfig, CompiledConfig]
+        The config for how the dungeon should be generated.
+
+    seed: Optional[int]
+        The seed to generate the dungeon with. If None, a random seed is
+        chosen, and stored on the dungeon so it can be reproduced.
+
+    executor: Optional[Executor]
+        The executor to run the layers on. If None, the default executor
+        of the event loop is used. When using a process pool, the layers
+        and the dungeon must be picklable, and the dungeon is copied
+        between processes once per layer. The room types and enemy types
+        of the returned dungeon are always those of the config.
+
+    Returns
+    -------
+    The generated dungeon.
+    """
+
+    loop = asyncio.get_running_loop()
+
+    if seed is None:
+        seed = getrandbits(63)
+
+    dungeon = Dungeon()
+    dungeon.seed = seed
+    randomState = Random(seed).getstate()
+    types = (tuple(config.roomTypes), tuple(config.enemyTypes))
+
+    for layer in config.layers:
+        result, randomState, copies = await loop.run_in_executor(
+            executor, run_layer, layer, dungeon, randomState, types)
+
+        # Dungeons returned from another process hold copies of the
+        # types, which must not leak into the next layer or the caller.
+        if result is not dungeon:
+            restore_types(result, copies, types)
+
+        dungeon = result
+
+    return dungeon
+
+
+async def create_image_async(dungeon: Dungeon, config: 'PainterConfig',
+                             executor: Optional[Executor] = None) \
+        -> Optional[bytes]:
+    """
+    Creates and saves an image of the given dungeon, as create_image
+    does, without blocking the event loop. Each render layer is drawn as
+    a separate step on the executor, followed by encoding and saving
+    the image. Pillow releases the GIL while drawing and encoding, so a
+    thread pool is recommended.
+
+    If the task is cancelled, the step which is currently running is
+    allowed to finish, but no further steps are started.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to create an image of. The dungeon must not be
+        modified until the image is complete.
+
+    config: PainterConfig
+        A config specifying how the image should be rendered.
+
+    executor: Optional[Executor]
+        The thread pool to render on. If None, the default executor of
+        the event loop is used.
+
+    Returns
+    -------
+    The encoded TIFF image, or None if the config has no layers.
+    """
+
+    import DungeonPainter
+
+    if len(config.layers) == 0:
+        return None
+
+    loop = asyncio.get_running_loop()
+
+    key = None
+    data = None
+
+    if config.cache is not None:
+        key = DungeonPainter.render_cache_key(dungeon, config)
+
+    if config.cache is not None and key is not None:
+        data = await loop.run_in_executor(executor, config.cache.get, key)
+
+    if data is None:
+        paintableRooms, size = DungeonPainter.plot_rooms(dungeon, config)
+
+        images = []
+        for layer in config.layers:
+            images.append(await loop.run_in_executor(
+                executor, paint_layer, dungeon, paintableRooms, layer,
+                size, config.paletteLayers))
+
+        data = await loop.run_in_executor(
+            executor, DungeonPainter.encode_image, images, config)
+
+        if config.cache is not None and key is not None:
+            await loop.run_in_executor(executor, config.cache.put, key, data)
+
+    if config.imageName != '':
+        await loop.run_in_executor(executor, write_file, config.imageName,
+                                   data)
+
+    return data
+
+
+def paint_layer(dungeon: Dungeon,
+                paintableRooms: 'PaintableRooms',
+                layer: 'RenderLayer', size: Tuple[int, int],
+                palette: bool = False) -> Any:
+    """
+    Internal function for rendering a single layer on a worker thread.
+    Layers which use the random module are rendered while holding the
+    random generator lock, so they do not disturb dungeons which are
+    being generated on other threads.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to render.
+
+    paintableRooms: PaintableRooms
+        The plotted rooms of the dungeon.
+
+    layer: RenderLayer
+        The layer to render.
+
+    size: Tuple[int, int]
+        The width and height of the image, in pixels.
+
+    palette: bool
+        If true, and the layer declares a palette, the layer is rendered
+        into a palette image.
+
+    Returns
+    -------
+    The rendered layer image.
+    """
+
+    import DungeonPainter
+
+    if not layer.usesRandom:
+        return DungeonPainter.paint_layer(dungeon, paintableRooms, layer,
+                                          size, palette)
+
+    with RANDOM_LOCK:
+        return DungeonPainter.paint_layer(dungeon, paintableRooms, layer,
+                                          size, palette)
+
+
+def write_file(path: str, data: bytes) -> None:
+    """
+    Internal function for writing an image file on a worker thread.
+
+    Parameters
+    ----------
+    path: str
+        The file path to write to.
+
+    data: bytes
+        The file contents.
+    """
+
+    with open(path, 'wb') as file:
+        file.write(data)
@@ -0,0 +1,539 @@
+"""
+DungeonIO is a module for serializing dungeons. Dungeons can be
+converted to plain dictionaries, for JSON output, or packed into a
+compact binary format which stores each room attribute as a separate
+column. Room types and enemy types are stored as integer ids, which are
+their index within the type lists of the generator config, so the same
+type lists must be provided when reading a dungeon back.
+"""
+
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, \
+    Union
+from array import array
+import struct
+import sys
+
+from DunGEN import Dungeon, DungeonRoom, DungeonKey, DungeonPath, \
+    RoomType, EnemyType, GeneratorError
+
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# The array typecodes packed dungeon columns are stored as.
+ColumnType = Literal['B', 'i', 'd']
+
+HEADER = struct.Struct('<4sIIIIIq')
+MAGIC = b'DGN1'
+
+
+def type_ids(types: Sequence[Any]) -> Dict[int, int]:
+    """
+    Creates a lookup table from type objects to their integer ids.
+
+    Parameters
+    ----------
+    types: Sequence[Any]
+        The room types or enemy types, in config order.
+
+    Returns
+    -------
+    A dictionary mapping the object id of each type to it's index.
+    """
+
+    ids: Dict[int, int] = {}
+    for i, t in enumerate(types):
+        ids.setdefault(id(t), i)
+
+    return ids
+
+
+def path_to_list(path: DungeonPath, out: List[int]) -> None:
+    """
+    Flattens a path and all of it's side paths into a list of integers.
+    Each path is written as the optional flag, the number of rooms, the
+    room indices, the number of side paths, and then each side path.
+
+    Parameters
+    ----------
+    path: DungeonPath
+        The path to flatten.
+
+    out: List[int]
+        The list to append to.
+    """
+
+    out.append(1 if path.optional else 0)
+    out.append(len(path.rooms))
+    out.extend(room.index for room in path)
+    out.append(len(path.sidePaths))
+
+    for side in path.sidePaths:
+        path_to_list(side, out)
+
+
+def path_from_list(dungeon: Dungeon, values: Sequence[int],
+                   pos: int = 0) -> Tuple[DungeonPath, int]:
+    """
+    Rebuilds a path which was flattened with path_to_list.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon containing the rooms of the path.
+
+    values: Sequence[int]
+        The flattened path.
+
+    pos: int
+        The position of the path within the values.
+
+    Returns
+    -------
+    A tuple containing the rebuilt path and the position after it.
+    """
+
+    path = DungeonPath(values[pos] != 0)
+    count = values[pos + 1]
+    pos += 2
+
+    for i in range(pos, pos + count):
+        path.add_room(dungeon.rooms[values[i]])
+    pos += count
+
+    sideCount = values[pos]
+    pos += 1
+
+    for _ in range(sideCount):
+        side, pos = path_from_list(dungeon, values, pos)
+        path.add_sidepath(side)
+
+    return path, pos
+
+
+def to_dict(dungeon: Dungeon, roomTypes: Sequence[RoomType],
+            enemyTypes: Sequence[EnemyType]) -> Dict[str, Any]:
+    """
+    Converts a dungeon into a dictionary of plain values, which can be
+    written as JSON.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to convert.
+
+    roomTypes: Sequence[RoomType]
+        The room types of the config used to generate the dungeon.
+
+    enemyTypes: Sequence[EnemyType]
+        The enemy types of the config used to generate the dungeon.
+
+    Returns
+    -------
+    The dictionary representation of the dungeon.
+    """
+
+    roomIds = type_ids(roomTypes)
+    enemyIds = type_ids(enemyTypes)
+
+    rooms = []
+    for room in dungeon.rooms:
+        rooms.append({
+            'x': room.x,
+            'y': room.y,
+            'doors': door_mask(room),
+            'depth': room.depth,
+            'type': None if room.type is None else roomIds[id(room.type)],
+            'difficulty': room.difficulty,
+            'region': room.region,
+            'enemies': [enemyIds[id(enemy)] for enemy in room.enemies],
+        })
+
+    keys = [[key.keyLocation.index, key.lockLocation.index,
+             key.lockedDoor] for key in dungeon.keys]
+
+    path: List[int] = []
+    path_to_list(dungeon.mainPath, path)
+
+    return {
+        'seed': dungeon.seed,
+        'rooms': rooms,
+        'keys': keys,
+        'mainPath': path,
+    }
+
+
+def from_dict(data: Dict[str, Any], roomTypes: Sequence[RoomType],
+              enemyTypes: Sequence[EnemyType]) -> Dungeon:
+    """
+    Rebuilds a dungeon from a dictionary created by to_dict.
+
+    Parameters
+    ----------
+    data: Dict[str, Any]
+        The dictionary representation of the dungeon.
+
+    roomTypes: Sequence[RoomType]
+        The room types of the config used to generate the dungeon.
+
+    enemyTypes: Sequence[EnemyType]
+        The enemy types of the config used to generate the dungeon.
+
+    Returns
+    -------
+    The rebuilt dungeon.
+    """
+
+    dungeon = Dungeon()
+    dungeon.seed = data.get('seed')
+
+    for values in data['rooms']:
+        room = DungeonRoom()
+        room.x = values['x']
+        room.y = values['y']
+        room.doors = mask_doors(values['doors'])
+        room.depth = values['depth']
+        room.difficulty = values['difficulty']
+        room.region = values['region']
+        room.enemies = [enemyTypes[i] for i in values['enemies']]
+
+        if values['type'] is not None:
+            room.type = roomTypes[values['type']]
+
+        dungeon.add_room(room)
+
+    for keyRoom, lockRoom, lockedDoor in data['keys']:
+        dungeon.keys.append(DungeonKey(dungeon.rooms[keyRoom],
+                                       dungeon.rooms[lockRoom], lockedDoor))
+
+    dungeon.mainPath, _ = path_from_list(dungeon, data['mainPath'])
+    return dungeon
+
+
+def door_mask(room: DungeonRoom) -> int:
+    """
+    Converts the doors of a room into a bitmask, where bit n is set if
+    door n is open.
+
+    Parameters
+    ----------
+    room: DungeonRoom
+        The room to read the doors from.
+
+    Returns
+    -------
+    The door bitmask.
+    """
+
+    d = room.doors
+    return (d[0] << 0) | (d[1] << 1) | (d[2] << 2) | (d[3] << 3)
+
+
+def mask_doors(mask: int) -> Tuple[bool, bool, bool, bool]:
+    """
+    Converts a door bitmask created by door_mask back into a door tuple.
+
+    Parameters
+    ----------
+    mask: int
+        The door bitmask.
+
+    Returns
+    -------
+    The door tuple.
+    """
+
+    return (bool(mask & 1), bool(mask & 2), bool(mask & 4), bool(mask & 8))
+
+
+def column_bytes(typecode: str, values: Any) -> bytes:
+    """
+    Packs a list of values into little endian bytes.
+
+    Parameters
+    ----------
+    typecode: str
+        The array typecode of the values.
+
+    values: Any
+        The values to pack.
+
+    Returns
+    -------
+    The packed bytes.
+    """
+
+    column = array(typecode, values)
+
+    if sys.byteorder == 'big':
+        column.byteswap()
+
+    return column.tobytes()
+
+
+def pack(dungeon: Dungeon, roomTypes: Sequence[RoomType],
+         enemyTypes: Sequence[EnemyType]) -> bytes:
+    """
+    Packs a dungeon into the binary format. The format is a fixed size
+    header, followed by one little endian column for each room
+    attribute, the key list, and the flattened path tree. The layout is
+    described by PackedDungeon.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to pack.
+
+    roomTypes: Sequence[RoomType]
+        The room types of the config used to generate the dungeon.
+
+    enemyTypes: Sequence[EnemyType]
+        The enemy types of the config used to generate the dungeon.
+
+    Returns
+    -------
+    The packed dungeon.
+    """
+
+    roomIds = type_ids(roomTypes)
+    enemyIds = type_ids(enemyTypes)
+    rooms = dungeon.rooms
+
+    enemyStart = [0]
+    enemies: List[int] = []
+    for room in rooms:
+        enemies.extend(enemyIds[id(enemy)] for enemy in room.enemies)
+        enemyStart.append(len(enemies))
+
+    keys: List[int] = []
+    for key in dungeon.keys:
+        keys.extend((key.keyLocation.index, key.lockLocation.index,
+                     key.lockedDoor))
+
+    path: List[int] = []
+    path_to_list(dungeon.mainPath, path)
+
+    seed = -1 if dungeon.seed is None else dungeon.seed
+    header = HEADER.pack(MAGIC, len(rooms), len(dungeon.keys),
+                         len(enemies), len(path), dungeon.region_count(),
+                         seed)
+
+    return b''.join([
+        header,
+        column_bytes('d', [room.difficulty for room in rooms]),
+        column_bytes('i', [room.x for room in rooms]),
+        column_bytes('i', [room.y for room in rooms]),
+        column_bytes('i', [room.depth for room in rooms]),
+        column_bytes('i', [room.region for room in rooms]),
+        column_bytes('i', [-1 if room.type is None
+                           else roomIds[id(room.type)] for room in rooms]),
+        column_bytes('i', enemyStart),
+        column_bytes('i', enemies),
+        column_bytes('i', keys),
+        column_bytes('i', path),
+        column_bytes('B', [door_mask(room) for room in rooms]),
+    ])
+
+
+class PackedDungeon:
+    """
+    A packed dungeon is a read only view over a dungeon in the binary
+    format. Each column is exposed as a memoryview into the original
+    buffer, so columns can be read without copying or unpacking the
+    whole dungeon.
+
+    Attributes
+    ----------
+    roomCount: int
+        The number of rooms in the dungeon.
+
+    keyCount: int
+        The number of keys in the dungeon.
+
+    enemyCount: int
+        The total number of enemies in the dungeon.
+
+    regionCount: int
+        The number of regions in the dungeon.
+
+    seed: Optional[int]
+        The seed the dungeon was generated with, if known.
+
+    size: int
+        The total size of the packed dungeon, in bytes.
+
+    difficulty, x, y, depth, region, type: memoryview
+        One value per room, indexed by room index. A type of -1 means
+        the room has no type.
+
+    enemyStart: memoryview
+        The start of the enemies of each room within the enemies column.
+        Contains one more value than there are rooms.
+
+    enemies: memoryview
+        The enemy type ids of all rooms.
+
+    keys: memoryview
+        The key room index, lock room index, and locked door of each
+        key.
+
+    path: memoryview
+        The flattened main path, as written by path_to_list.
+
+    doors: memoryview
+        The door bitmask of each room.
+    """
+
+    def __init__(self, data: Buffer) -> None:
+        """
+        Parameters
+        ----------
+        data: Buffer
+            A buffer containing a packed dungeon. The buffer may be
+            larger than the dungeon.
+
+        Raises
+        ------
+        GeneratorError
+            If the buffer does not contain a packed dungeon.
+        """
+
+        view = memoryview(data).cast('B')
+
+        if len(view) < HEADER.size:
+            raise GeneratorError('Buffer too small for a packed dungeon')
+
+        magic, rooms, keys, enemies, path, regions, seed = \
+            HEADER.unpack_from(view)
+
+        if magic != MAGIC:
+            raise GeneratorError('Buffer does not contain a packed dungeon')
+
+        self.roomCount = rooms
+        self.keyCount = keys
+        self.enemyCount = enemies
+        self.regionCount = regions
+        self.seed: Optional[int] = None if seed < 0 else seed
+
+        self.pos = HEADER.size
+        self.view = view
+
+        self.difficulty = self.column('d', rooms)
+        self.x = self.column('i', rooms)
+        self.y = self.column('i', rooms)
+        self.depth = self.column('i', rooms)
+        self.region = self.column('i', rooms)
+        self.type = self.column('i', rooms)
+        self.enemyStart = self.column('i', rooms + 1)
+        self.enemies = self.column('i', enemies)
+        self.keys = self.column('i', keys * 3)
+        self.path = self.column('i', path)
+        self.doors = self.column('B', rooms)
+
+        self.size = self.pos
+
+    def column(self, typecode: ColumnType, count: int) -> Any:
+        """
+        Internal function for reading the next column of the buffer.
+
+        Parameters
+        ----------
+        typecode: ColumnType
+            The array typecode of the column.
+
+        count: int
+            The number of values in the column.
+
+        Returns
+        -------
+        A memoryview of the column, or an array if the host is big
+        endian and the column had to be converted.
+        """
+
+        width = array(typecode).itemsize
+        start = self.pos
+        self.pos += width * count
+
+        if self.pos > len(self.view):
+            raise GeneratorError('Packed dungeon is truncated')
+
+        raw = self.view[start:self.pos]
+
+        if sys.byteorder == 'big' and width > 1:
+            column = array(typecode, raw.tobytes())
+            column.byteswap()
+            return column
+
+        return raw.cast(typecode)
+
+    def to_dungeon(self, roomTypes: Sequence[RoomType],
+                   enemyTypes: Sequence[EnemyType]) -> Dungeon:
+        """
+        Unpacks this view into a full dungeon.
+
+        Parameters
+        ----------
+        roomTypes: Sequence[RoomType]
+            The room types of the config used to generate the dungeon.
+
+        enemyTypes: Sequence[EnemyType]
+            The enemy types of the config used to generate the dungeon.
+
+        Returns
+        -------
+        The unpacked dungeon.
+        """
+
+        dungeon = Dungeon()
+        dungeon.seed = self.seed
+
+        enemyStart = self.enemyStart
+        enemies = self.enemies
+
+        for i in range(self.roomCount):
+            room = DungeonRoom()
+            room.x = self.x[i]
+            room.y = self.y[i]
+            room.doors = mask_doors(self.doors[i])
+            room.depth = self.depth[i]
+            room.difficulty = self.difficulty[i]
+            room.region = self.region[i]
+            room.enemies = [enemyTypes[e] for e
+                            in enemies[enemyStart[i]:enemyStart[i + 1]]]
+
+            if self.type[i] >= 0:
+                room.type = roomTypes[self.type[i]]
+
+            dungeon.add_room(room)
+
+        keys = self.keys
+        for i in range(0, len(keys), 3):
+            dungeon.keys.append(DungeonKey(dungeon.rooms[keys[i]],
+                                           dungeon.rooms[keys[i + 1]],
+                                           keys[i + 2]))
+
+        dungeon.mainPath, _ = path_from_list(dungeon, self.path)
+        return dungeon
+
+
+def unpack(data: Buffer, roomTypes: Sequence[RoomType],
+           enemyTypes: Sequence[EnemyType]) -> Dungeon:
+    """
+    Unpacks a dungeon which was packed with pack.
+
+    Parameters
+    ----------
+    data: Buffer
+        The packed dungeon.
+
+    roomTypes: Sequence[RoomType]
+        The room types of the config used to generate the dungeon.
+
+    enemyTypes: Sequence[EnemyType]
+        The enemy types of the config used to generate the dungeon.
+
+    Returns
+    -------
+    The unpacked dungeon.
+    """
+
+    return PackedDungeon(data).to_dungeon(roomTypes, enemyTypes)
@@ -1,7 +1,12 @@
 from PIL import Image, ImageDraw, ImageFont, ImageColor  # type: ignore
-from typing import Tuple, List, cast, Dict
+from typing import Tuple, List, cast, Dict, Optional, Set, Sequence, Union, \
+    Iterator, Mapping, Any, overload
 from math import sqrt, floor
-from DunGEN import Dungeon, DungeonRoom, DungeonPath
+from functools import lru_cache
+from io import BytesIO
+from DunGEN import Dungeon, DungeonRoom, DungeonPath, DungeonKey
+from DungeonStats import required_rooms
+from RenderCache import RenderCache, describe_object, cache_key
 from abc import ABCMeta, abstractmethod
 from random import randrange as rand
 
@@ -32,6 +37,8 @@ class PaintableRoom:
         The room size in pixels.
     """
 
+    __slots__ = ('room', 'start', 'end', 'center', 'rect', 'size')
+
     def __init__(self, room: DungeonRoom):
         """
         Parameters
@@ -47,186 +54,1257 @@ class PaintableRoom:
         self.rect = (0, 0, 0, 0)
         self.size = 0
 
+    def translated(self, dx: int, dy: int) -> 'PaintableRoom':
+        """
+        Creates a copy of this paintable room with all pixel coordinates
+        moved by the given offset.
+
+        Parameters
+        ----------
+        dx: int
+            The number of pixels to move along the x axis.
+
+        dy: int
+            The number of pixels to move along the y axis.
+
+        Returns
+        -------
+        The moved copy of this paintable room.
+        """
+
+        p = PaintableRoom(self.room)
+        p.start = (self.start[0] + dx, self.start[1] + dy)
+        p.end = (self.end[0] + dx, self.end[1] + dy)
+        p.center = (self.center[0] + dx, self.center[1] + dy)
+        p.rect = (p.start[0], p.start[1], p.end[0], p.end[1])
+        p.size = self.size
+        return p
+
+
+# The paintable wrapper of each room in a dungeon, indexed by room index.
+# This is either a list, or a RoomLayout. While only part of a layer is
+# being redrawn, this is a PartialRooms instead, which only holds the
+# rooms within that area.
+PaintableRooms = Union[Sequence[Optional[PaintableRoom]],
+                       Mapping[int, PaintableRoom]]
+
+
+class RoomIndex:
+    """
+    A room index holds lookups over a whole dungeon which layers need
+    when drawing single rooms, so redrawing a few rooms does not need to
+    look at every key, or walk the path tree, of the dungeon.
+
+    Attributes
+    ----------
+    keys: Dict[int, List[DungeonKey]]
+        The keys located within each room, by room index.
+
+    locks: Dict[int, List[DungeonKey]]
+        The keys which unlock a door of each room, by room index.
+
+    required: Set[DungeonRoom]
+        The rooms which lie along a required path of the dungeon.
+    """
+
+    def __init__(self, dungeon: Dungeon) -> None:
+        """
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to index.
+        """
+
+        self.keys: Dict[int, List[DungeonKey]] = {}
+        self.locks: Dict[int, List[DungeonKey]] = {}
+
+        for key in dungeon.keys:
+            self.keys.setdefault(key.keyLocation.index, []).append(key)
+            self.locks.setdefault(key.lockLocation.index, []).append(key)
+
+        self.required = required_rooms(dungeon)
+
+
+class PartialRooms(Dict[int, PaintableRoom]):
+    """
+    The paintable wrappers of the rooms within an area which is being
+    redrawn, by room index, along with the room index of the dungeon
+    built during the last full render. Only the rooms within the area
+    are stored, so creating one does not depend on the size of the map.
+
+    Attributes
+    ----------
+    index: RoomIndex
+        The room index of the dungeon being redrawn.
+    """
+
+    def __init__(self, index: RoomIndex) -> None:
+        """
+        Parameters
+        ----------
+        index: RoomIndex
+            The room index of the dungeon being redrawn.
+        """
+
+        super().__init__()
+        self.index = index
+
+
+def room_index(dungeon: Dungeon,
+               paintableRooms: PaintableRooms) -> RoomIndex:
+    """
+    Gets the room index to use when drawing rooms. Partial redraws reuse
+    the index of the last full render, while full renders index the
+    dungeon once for the whole layer.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon being drawn.
+
+    paintableRooms: PaintableRooms
+        The paintable wrappers of the rooms being drawn.
+
+    Returns
+    -------
+    The room index of the dungeon.
+    """
+
+    if isinstance(paintableRooms, PartialRooms):
+        return paintableRooms.index
+
+    return RoomIndex(dungeon)
+
+
+def paintable_room(paintableRooms: PaintableRooms,
+                   room: DungeonRoom) -> PaintableRoom:
+    """
+    Gets the paintable wrapper of a room which is being drawn. Layers
+    may only draw the rooms they are given, which always have a wrapper.
+
+    Parameters
+    ----------
+    paintableRooms: PaintableRooms
+        The paintable wrapper of each room, indexed by room index.
+
+    room: DungeonRoom
+        The room being drawn.
+
+    Returns
+    -------
+    The paintable wrapper of the room.
+
+    Raises
+    ------
+    ValueError
+        If the room is not being drawn.
+    """
+
+    paint: Optional[PaintableRoom] = None
+    if isinstance(paintableRooms, Mapping):
+        paint = paintableRooms.get(room.index)
+    elif 0 <= room.index < len(paintableRooms):
+        paint = paintableRooms[room.index]
+
+    if paint is None:
+        raise ValueError('Room ' + str(room.index) + ' is not drawn')
+
+    return paint
+
+
+# The nearest neighbour resampling filter. Newer versions of Pillow keep
+# the filters in the Resampling enum.
+NEAREST = getattr(Image, 'Resampling', Image).NEAREST
+
+
+class RenderLayer(metaclass=ABCMeta):
+    """
+    An interface which is used to render an image layer of a dungeon.
+
+    Attributes
+    ----------
+    usesRandom: bool
+        Whether or not this layer draws from the shared random module
+        while rendering. Such layers are never rendered at the same time
+        as a dungeon is being generated on another thread.
+
+    renderState: Tuple[str, ...]
+        The names of attributes which hold state from the last render,
+        rather than render settings. These are left out of the painter
+        config fingerprint, so they do not change the cache key.
+    """
+
+    usesRandom = False
+    renderState: Tuple[str, ...] = ()
+
+    def get_palette(self) -> Optional[List[Tuple[int, int, int]]]:
+        """
+        Gets the colors this layer draws with, besides transparency. If
+        the painter config uses palette layers, layers with a palette
+        are rendered into 8-bit palette images instead of RGBA images.
+        Layers which draw anti-aliased text, or more than 255 colors,
+        must not declare a palette. By default, layers have no palette.
+
+        Returns
+        -------
+        The colors used by this layer, or None if this layer must be
+        rendered as an RGBA image.
+        """
+
+        return None
+
+    @abstractmethod
+    def render_layer(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     img: Image, draw: ImageDraw) -> None:
+        """
+        Renders a single image layer of a dungeon.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon which is being rendered.
+
+        paintableRooms: PaintableRooms
+            The paintable wrapper of each room, indexed by room index,
+            which can be used to extract the pixel coordinates of each
+            room.
+
+        img: Image
+            The virtual image being written to. A new, empty image is
+            created for each render layer and composed at the end.
+
+        draw: ImageDraw
+            The drawing handler to rendering to the image.
+        """
+
+    def update_area(self, dungeon: Dungeon,
+                    paintableRooms: PaintableRooms,
+                    area: Tuple[int, int, int, int],
+                    rooms: List[DungeonRoom], img: 'Image.Image',
+                    index: Optional[RoomIndex] = None) -> bool:
+        """
+        Redraws a single area of a layer image which was previously
+        rendered with render_layer, after the rooms within that area have
+        changed. By default, layers do not support partial updates.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon which is being rendered.
+
+        paintableRooms: PaintableRooms
+            The paintable wrapper of each room, indexed by room index,
+            which can be used to extract the pixel coordinates of each
+            room.
+
+        area: Tuple[int, int, int, int]
+            The pixel area to redraw, in the format (x1, y1, x2, y2),
+            where the second point lies outside of the area.
+
+        rooms: List[DungeonRoom]
+            All rooms which may draw within the given area.
+
+        img: Image
+            The previously rendered layer image to update.
+
+        index: Optional[RoomIndex]
+            The room index of the dungeon, built during the last full
+            render. If None, the dungeon is indexed again.
+
+        Returns
+        -------
+        True if the area was updated. False if this layer does not
+        support partial updates, in which case the entire layer must be
+        rendered again.
+        """
+
+        return False
+
+
+class RoomRenderLayer(RenderLayer):
+    """
+    A render layer which draws each room of the dungeon independently,
+    without drawing outside of the room bounds by more than a few
+    pixels. These layers can redraw small areas of the map after a room
+    has changed without rendering the entire layer again.
+    """
+
+    @abstractmethod
+    def render_rooms(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     rooms: List[DungeonRoom], img: 'Image.Image',
+                     draw: 'ImageDraw.ImageDraw') -> None:
+        """
+        Renders the given rooms of a dungeon.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon which is being rendered.
+
+        paintableRooms: PaintableRooms
+            The paintable wrapper of each room, indexed by room index,
+            which can be used to extract the pixel coordinates of each
+            room to render.
+
+        rooms: List[DungeonRoom]
+            The rooms to render.
+
+        img: Image
+            The virtual image being written to.
+
+        draw: ImageDraw
+            The drawing handler to rendering to the image.
+        """
+
+    def render_layer(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     img: 'Image.Image',
+                     draw: 'ImageDraw.ImageDraw') -> None:
+        """See RenderLayer for docs."""
+
+        self.render_rooms(dungeon, paintableRooms, dungeon.rooms, img, draw)
+
+    def update_area(self, dungeon: Dungeon,
+                    paintableRooms: PaintableRooms,
+                    area: Tuple[int, int, int, int],
+                    rooms: List[DungeonRoom], img: 'Image.Image',
+                    index: Optional[RoomIndex] = None) -> bool:
+        """
+        See RenderLayer for docs. The rooms are drawn onto an empty image
+        the size of the area, which then replaces the area within the
+        layer image.
+        """
+
+        x1, y1, x2, y2 = area
+        scratch = Image.new(img.mode, (x2 - x1, y2 - y1), color=None)
+
+        if img.mode == 'P':
+            palette = img.getpalette('RGBA')
+            assert palette is not None
+            scratch.putpalette(palette, 'RGBA')
+
+        if index is None:
+            index = RoomIndex(dungeon)
+
+        local = PartialRooms(index)
+        for room in rooms:
+            local[room.index] = paintable_room(paintableRooms, room) \
+                .translated(-x1, -y1)
+
+        draw = ImageDraw.Draw(scratch)
+        self.render_rooms(dungeon, local, rooms, scratch, draw)
+
+        if img.mode == 'P':
+            palette = scratch.getpalette('RGBA')
+            assert palette is not None
+            img.putpalette(palette, 'RGBA')
+
+        img.paste(scratch, (x1, y1))
+        return True
+
+
+class PainterConfig:
+    """
+    A configuration for how a dungeon should be drawn with the painter.
+
+    ...
+
+    Attributes
+    ----------
+    layeredImage: bool
+        If true, the generated image will contain a seperate layer for
+        each step with a transparent background. This can be useful for
+        manual editing in an image editor after. If false, the output
+        image will have only a single layer, and all steps will be
+        overlapped.
+
+    roomSize: int
+        The size of each room, in pixels.
+
+    headerSize: int
+        If header text is desired, this value can be used to vertically
+        offset the map image to make room for the header. Set to 0 to
+        disable.
+
+    layers: List[RenderLayer]
+        A list of layers which are used to print the dungeon. These are
+        handled in the order in which they are listed.
+
+    imageName: str
+        Specifies the filename of the image to generate. This is where
+        the image will be saved to. This filename must use a TIFF file
+        extension to use layers. Set to an empty string to skip saving
+        the image to disk.
+
+    cache: Optional[RenderCache]
+        If set, rendered images are stored in this cache and reused when
+        the same dungeon is rendered again with the same settings.
+
+    vectorized: bool
+        If true, room positions are plotted for all rooms at once into a
+        RoomLayout, using NumPy, which is much faster for large
+        dungeons. The rendered images are identical. NumPy must be
+        installed to use this option.
+
+    paletteLayers: bool
+        If true, layers which declare a palette are rendered into 8-bit
+        palette images, which use a quarter of the memory of RGBA
+        images. They are only converted to RGBA when composited into a
+        single layer. Layered images save these layers as palette images
+        with an alpha channel, as TIFF palettes can not store
+        transparency. The rendered image looks identical.
+    """
+
+    def __init__(self) -> None:
+        self.layeredImage = True
+        self.roomSize = 128
+        self.headerSize = 64
+        self.imageName = 'Dungeon.tiff'
+        self.layers: List[RenderLayer] = []
+        self.cache: Optional[RenderCache] = None
+        self.vectorized = False
+        self.paletteLayers = False
+
+    def add_render_layer(self, layer: RenderLayer) -> None:
+        """
+        Appends a new render layer to use when rendering dungeons with
+        this configuration.
+
+        Parameters
+        ----------
+        layer: RenderLayer
+            The new render layer.
+        """
+
+        self.layers.append(layer)
+
+    def fingerprint(self) -> str:
+        """
+        Creates a stable description of the render settings of this
+        config, including the settings of each render layer. The image
+        name and cache are not included, as they do not affect the
+        rendered image.
+
+        Returns
+        -------
+        A string which is equal for configs which render identical
+        images.
+
+        Raises
+        ------
+        TypeError
+            If a layer holds a setting which can not be described.
+        """
+
+        settings = [repr((self.layeredImage, self.roomSize,
+                          self.headerSize, self.paletteLayers))]
+
+        for layer in self.layers:
+            settings.append(describe_object(layer))
+
+        return '|'.join(settings)
+
+
+def plot_map(dungeon: Dungeon,
+             paintableRooms: List[PaintableRoom],
+             config: PainterConfig) -> Tuple[int, int]:
+    """
+    Plots the pixel position of each room on the final image, and
+    generates the image size required to fully render the dungeon.
+    The pixel coordinates are written to the rooms within the dungeon.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon which is being plotted.
+
+    paintableRooms: PaintableRooms
+        The list to store the paintable wrapper of each room in. Any
+        existing wrappers are replaced.
+
+    config: PainterConfig
+        The config to use when determining room measurements.
+
+    Returns
+    -------
+    A tuple containing the width and height of the image to generate.
+    """
+
+    bounds = dungeon.bounds()
+
+    roomSize = config.roomSize
+    headerSize = config.headerSize
+
+    imageWidth = (bounds[2] - bounds[0] + 3) * roomSize
+    imageHeight = (bounds[3] - bounds[1] + 3) * roomSize + headerSize
+
+    paintableRooms.clear()
+
+    for room in dungeon.rooms:
+        p = PaintableRoom(room)
+        p.start = ((room.x - bounds[0] + 1) * roomSize,
+                   (room.y - bounds[1] + 1) *
+                   roomSize + headerSize)
+
+        p.end = (p.start[0] + roomSize - 1,
+                 p.start[1] + roomSize - 1)
+
+        p.center = (int((p.start[0] + p.end[0]) / 2),
+                    int((p.start[1] + p.end[1]) / 2))
+
+        p.rect = (p.start[0], p.start[1],
+                  p.end[0], p.end[1])
+
+        p.size = roomSize
+
+        paintableRooms.append(p)
+
+    return imageWidth, imageHeight
+
+
+def plot_rooms(dungeon: Dungeon, config: PainterConfig) \
+        -> Tuple[PaintableRooms, Tuple[int, int]]:
+    """
+    Plots the pixel position of each room, using a room layout if the
+    config is vectorized, or plot_map otherwise.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon which is being plotted.
+
+    config: PainterConfig
+        The config to use when determining room measurements.
+
+    Returns
+    -------
+    The paintable rooms, and the width and height of the image to
+    generate.
+    """
+
+    if config.vectorized:
+        layout = RoomLayout(dungeon, config)
+        return layout, layout.imageSize
+
+    paintableRooms: List[PaintableRoom] = []
+    imageSize = plot_map(dungeon, paintableRooms, config)
+
+    return paintableRooms, imageSize
+
+
+class RoomLayout(Sequence[PaintableRoom]):
+    """
+    A room layout holds the pixel position of every room in a dungeon as
+    NumPy arrays, indexed by room index, which are computed for all
+    rooms at once. Render layers can use these arrays to draw many rooms
+    in a single operation.
+
+    A room layout can also be used in place of a list of paintable
+    rooms. Indexing it by room index, or by room, returns a paintable
+    room, which is only created the first time it is needed.
+
+    Attributes
+    ----------
+    rooms: List[DungeonRoom]
+        The rooms of the dungeon, in room index order.
+
+    start: numpy.ndarray
+        The top left pixel coordinates of each room, as an (n, 2) array.
+
+    end: numpy.ndarray
+        The bottom right pixel coordinates of each room, as an (n, 2)
+        array.
+
+    center: numpy.ndarray
+        The center pixel coordinates of each room, as an (n, 2) array.
+
+    rect: numpy.ndarray
+        The start and end points of each room, as an (n, 4) array.
+
+    size: int
+        The room size in pixels.
+
+    imageSize: Tuple[int, int]
+        The width and height of the image required to render the
+        dungeon.
+
+    cells: numpy.ndarray
+        The grid cell of each room, as an (n, 2) array. The map is a grid
+        of cells, each the size of one room, starting below the header.
+
+    gridSize: Tuple[int, int]
+        The number of columns and rows of cells on the map.
+
+    headerSize: int
+        The height of the header above the map, in pixels.
+    """
+
+    def __init__(self, dungeon: Dungeon, config: PainterConfig) -> None:
+        """
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to plot.
+
+        config: PainterConfig
+            The config to use when determining room measurements.
+        """
+
+        import numpy as np
+
+        self.rooms = dungeon.rooms
+        count = len(self.rooms)
+
+        xy = np.fromiter((v for room in self.rooms for v in (room.x, room.y)),
+                         dtype=np.int64, count=count * 2).reshape(count, 2)
+
+        if count > 0:
+            low = xy.min(axis=0)
+            high = xy.max(axis=0)
+        else:
+            bounds = dungeon.bounds()
+            low = np.array(bounds[:2], dtype=np.int64)
+            high = np.array(bounds[2:], dtype=np.int64)
+
+        roomSize = config.roomSize
+        headerSize = config.headerSize
+
+        columns, rows = (high - low + 3).tolist()
+        self.gridSize = (columns, rows)
+        self.imageSize = (columns * roomSize, rows * roomSize + headerSize)
+        self.size = roomSize
+        self.headerSize = headerSize
+
+        offset = np.array([0, headerSize], dtype=np.int64)
+        self.cells = xy - low + 1
+        self.start = self.cells * roomSize + offset
+        self.end = self.start + (roomSize - 1)
+        self.center = (self.start + self.end) // 2
+        self.rect = np.concatenate((self.start, self.end), axis=1)
+
+        self.paintables: List[Optional[PaintableRoom]] = [None] * count
+
+    def __len__(self) -> int:
+        return len(self.paintables)
+
+    @overload
+    def __getitem__(self, key: int) -> PaintableRoom: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> Sequence[PaintableRoom]: ...
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, DungeonRoom):
+            key = key.index
+
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+
+        p = self.paintables[key]
+        if p is None:
+            p = self.paintable(key)
+            self.paintables[key] = p
+
+        return p
+
+    def __iter__(self) -> Iterator[PaintableRoom]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __contains__(self, room: object) -> bool:
+        if not isinstance(room, DungeonRoom):
+            return False
+
+        return 0 <= room.index < len(self) and self.rooms[room.index] is room
+
+    def paintable(self, index: int) -> PaintableRoom:
+        """
+        Internal function for creating the paintable wrapper of a room.
+
+        Parameters
+        ----------
+        index: int
+            The index of the room.
+
+        Returns
+        -------
+        The paintable wrapper of the room.
+        """
+
+        p = PaintableRoom(self.rooms[index])
+        x1, y1, x2, y2 = self.rect[index].tolist()
+        cx, cy = self.center[index].tolist()
+
+        p.start = (x1, y1)
+        p.end = (x2, y2)
+        p.center = (cx, cy)
+        p.rect = (x1, y1, x2, y2)
+        p.size = self.size
+
+        return p
+
+    def fill_rooms(self, img: 'Image.Image', colors: Any) -> None:
+        """
+        Fills every room with a solid color, as drawing a rectangle over
+        the bounds of each room would. The colors are written into a
+        grid with one pixel per cell, which is then scaled up by the room
+        size with a single nearest neighbour resize, and drawn over the
+        image. Cells without a room are left unchanged.
+
+        This always costs time in proportion to the area of the map, so
+        it should only be used to fill every room at once. Layers draw
+        each room separately when only some rooms are redrawn.
+
+        Parameters
+        ----------
+        img: Image
+            The RGBA image to draw on, the size of the full image.
+
+        colors: numpy.ndarray
+            The RGB color of each room, as an (n, 3) array, in room
+            index order.
+        """
+
+        import numpy as np
+
+        cells = self.cells
+        if len(cells) == 0:
+            return
+
+        columns, rows = self.gridSize
+        grid = np.zeros((rows, columns, 4), dtype=np.uint8)
+        grid[cells[:, 1], cells[:, 0], :3] = colors
+        grid[cells[:, 1], cells[:, 0], 3] = 255
+
+        size = (columns * self.size, rows * self.size)
+        tile = Image.fromarray(grid).resize(size, NEAREST)
+        img.paste(tile, (0, self.headerSize), tile)
+
+    def keys(self) -> List[DungeonRoom]:
+        """
+        Gets the rooms within this layout, as the keys of a dictionary
+        of paintable rooms would be.
+
+        Returns
+        -------
+        The rooms of the dungeon, in room index order.
+        """
+
+        return list(self.rooms)
+
+    def values(self) -> List[PaintableRoom]:
+        """
+        Gets the paintable wrapper of every room, as the values of a
+        dictionary of paintable rooms would be.
+
+        Returns
+        -------
+        The paintable wrapper of each room, in room index order.
+        """
+
+        return list(self)
+
+    def items(self) -> List[Tuple[DungeonRoom, PaintableRoom]]:
+        """
+        Gets each room along with it's paintable wrapper, as the items
+        of a dictionary of paintable rooms would be.
+
+        Returns
+        -------
+        A list of room and paintable wrapper pairs, in room index order.
+        """
+
+        return list(zip(self.rooms, self))
+
+    def get(self, room: DungeonRoom,
+            default: Optional[PaintableRoom] = None) \
+            -> Optional[PaintableRoom]:
+        """
+        Gets the paintable wrapper of a room, as the get method of a
+        dictionary of paintable rooms would.
+
+        Parameters
+        ----------
+        room: DungeonRoom
+            The room to look up.
+
+        default: Optional[PaintableRoom]
+            The value to return if the room is not within this layout.
+
+        Returns
+        -------
+        The paintable wrapper of the room, or the default value.
+        """
+
+        if room not in self:
+            return default
+
+        return self[room.index]
+
+
+def create_image(dungeon: Dungeon, config: PainterConfig) \
+        -> Optional[bytes]:
+    """Creates and saves an image of the given dungeon.
+
+    This function can be used to crate an image of a dungeon. This
+    process works by using the steps defined in the config to generate
+    layers of a image, defining different properties of the map. These
+    layers can then be compressed into a single layer when saved or
+    saved as a layered image. If the list of layers in the config are
+    empty, nothing happens.
+
+    If the config has a render cache, the cache is checked before any
+    rendering is done, and newly rendered images are added to it. Images
+    are not cached if a layer holds a setting which can not be described
+    by the config fingerprint.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to create an image of.
+
+    config: PainterConfig
+        A config specifying how the image should be rendered.
+
+    Returns
+    -------
+    The encoded TIFF image, or None if the config has no layers.
+    """
+
+    if len(config.layers) == 0:
+        return None
+
+    key = None
+    data = None
+
+    if config.cache is not None:
+        key = render_cache_key(dungeon, config)
+
+    if config.cache is not None and key is not None:
+        data = config.cache.get(key)
+
+    if data is None:
+        data = render_image(dungeon, config)
+
+        if config.cache is not None and key is not None:
+            config.cache.put(key, data)
+
+    if config.imageName != '':
+        with open(config.imageName, 'wb') as file:
+            file.write(data)
+
+    return data
+
+
+def render_cache_key(dungeon: Dungeon, config: PainterConfig) \
+        -> Optional[str]:
+    """
+    Creates the key to cache an image of a dungeon under.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to create an image of.
+
+    config: PainterConfig
+        A config specifying how the image should be rendered.
+
+    Returns
+    -------
+    The cache key, or None if a layer of the config holds a setting
+    which can not be described, in which case the image must not be
+    cached.
+    """
+
+    try:
+        settings = config.fingerprint()
+    except TypeError:
+        return None
+
+    return cache_key(dungeon.fingerprint(), settings)
+
+
+def render_image(dungeon: Dungeon, config: PainterConfig) -> bytes:
+    """
+    Renders all layers of the given dungeon and encodes them as a TIFF
+    image.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to render.
+
+    config: PainterConfig
+        A config specifying how the image should be rendered. Must
+        contain at least one layer.
+
+    Returns
+    -------
+    The encoded TIFF image.
+    """
+
+    paintableRooms, imageSize = plot_rooms(dungeon, config)
+
+    images = []
+    for layer in config.layers:
+        images.append(paint_layer(dungeon, paintableRooms, layer, imageSize,
+                                  config.paletteLayers))
+
+    return encode_image(images, config)
+
+
+def paint_layer(dungeon: Dungeon,
+                paintableRooms: PaintableRooms,
+                layer: RenderLayer, size: Tuple[int, int],
+                palette: bool = False) -> 'Image.Image':
+    """
+    Renders a single layer of the given dungeon onto a new, transparent
+    image.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to render.
+
+    paintableRooms: PaintableRooms
+        The plotted rooms of the dungeon, as created by plot_map.
+
+    layer: RenderLayer
+        The layer to render.
+
+    size: Tuple[int, int]
+        The width and height of the image, in pixels.
+
+    palette: bool
+        If true, and the layer declares a palette, the layer is rendered
+        into a palette image instead of an RGBA image.
+
+    Returns
+    -------
+    The rendered layer image.
+    """
+
+    img = new_layer_image(layer, size, palette)
+    draw = ImageDraw.Draw(img)
+    layer.render_layer(dungeon, paintableRooms, img, draw)
+
+    return img
+
+
+def new_layer_image(layer: RenderLayer, size: Tuple[int, int],
+                    palette: bool) -> 'Image.Image':
+    """
+    Creates a new, transparent image to render a layer onto.
+
+    Parameters
+    ----------
+    layer: RenderLayer
+        The layer which is going to be rendered.
+
+    size: Tuple[int, int]
+        The width and height of the image, in pixels.
+
+    palette: bool
+        If true, and the layer declares a palette, a palette image is
+        created. The first palette entry is transparent, followed by the
+        colors of the layer.
+
+    Returns
+    -------
+    The new layer image.
+    """
+
+    colors = layer.get_palette() if palette else None
+
+    if colors is None:
+        return Image.new('RGBA', size, color=None)
+
+    entries = [0, 0, 0, 0]
+    for color in colors:
+        entries.extend((color[0], color[1], color[2], 255))
 
-class RenderLayer(metaclass=ABCMeta):
+    img = Image.new('P', size, color=0)
+    img.putpalette(entries, 'RGBA')
+
+    return img
+
+
+def encode_image(images: List['Image.Image'], config: PainterConfig) -> bytes:
     """
-    An interface which is used to render an image layer of a dungeon.
+    Encodes a list of rendered layer images as a TIFF image. If the
+    config does not use layered images, the layers are composited into
+    a single image first, converting palette layers to RGBA. Otherwise,
+    palette layers are saved as palette images with an alpha channel.
+    The given layer images are not modified.
+
+    Parameters
+    ----------
+    images: List[Image]
+        The rendered layer images, in render order.
+
+    config: PainterConfig
+        A config specifying how the image should be saved.
+
+    Returns
+    -------
+    The encoded TIFF image.
     """
 
-    @abstractmethod
-    def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
-                     img: Image, draw: ImageDraw) -> None:
-        """
-        Renders a single image layer of a dungeon.
+    if config.layeredImage:
+        pages = [img.convert('PA') if img.mode == 'P' else img
+                 for img in images]
+        first = pages[0]
+        rest = pages[1:]
+    else:
+        first = promote_image(images[0])
+        for img in images[1:]:
+            first = Image.alpha_composite(first, promote_image(img))
+        rest = []
 
-        Parameters
-        ----------
-        dungeon: Dungeon
-            The dungeon which is being rendered.
+    output = BytesIO()
+    first.save(output, format='TIFF', save_all=config.layeredImage,
+               append_images=rest, compression='tiff_lzw',
+               tiffinfo={317: 2, 278: 1})
 
-        paintableRooms: Dict[DungeonRoom, PaintableRoom]
-            A dictionary of wrappers which can be used to extract the
-            pixel coordinates of each room.
+    return output.getvalue()
 
-        img: Image
-            The virtual image being written to. A new, empty image is
-            created for each render layer and composed at the end.
 
-        draw: ImageDraw
-            The drawing handler to rendering to the image.
-        """
+def promote_image(img: 'Image.Image') -> 'Image.Image':
+    """
+    Converts a palette layer image to RGBA. RGBA images are returned as
+    they are.
 
+    Parameters
+    ----------
+    img: Image
+        The layer image.
 
-class PainterConfig:
+    Returns
+    -------
+    The layer image in RGBA mode.
     """
-    A configuration for how a dungeon should be drawn with the painter.
 
-    ...
+    if img.mode == 'P':
+        return img.convert('RGBA')
+
+    return img
+
+
+class IncrementalPainter:
+    """
+    An incremental painter keeps the rendered layers of a single dungeon
+    in memory and listens for changes to the rooms of that dungeon. When
+    the image is created again, only the changed rooms and the rooms
+    around them are redrawn, so updating a room does not depend on the
+    size of the map. Layers which do not support partial updates are
+    rendered again in full.
+
+    Encoding and saving the final image still covers the whole map.
 
     Attributes
     ----------
-    layeredImage: bool
-        If true, the generated image will contain a seperate layer for
-        each step with a transparent background. This can be useful for
-        manual editing in an image editor after. If false, the output
-        image will have only a single layer, and all steps will be
-        overlapped.
+    dungeon: Dungeon
+        The dungeon being painted.
 
-    roomSize: int
-        The size of each room, in pixels.
+    config: PainterConfig
+        A config specifying how the image should be rendered.
 
-    headerSize: int
-        If header text is desired, this value can be used to vertically
-        offset the map image to make room for the header. Set to 0 to
-        disable.
+    dirty: Set[DungeonRoom]
+        The rooms which have changed since the image was last created.
+    """
 
-    layers: List[RenderLayer]
-        A list of layers which are used to print the dungeon. These are
-        handled in the order in which they are listed.
+    def __init__(self, dungeon: Dungeon, config: PainterConfig) -> None:
+        """
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to paint. The painter registers itself as a
+            listener on every room of this dungeon.
 
-    imageName: str
-        Specifies the filename of the image to generate. This is where
-        the image will be saved to. This filename must use a TIFF file
-        extension to use layers.
-    """
+        config: PainterConfig
+            A config specifying how the image should be rendered.
+        """
 
-    def __init__(self) -> None:
-        self.layeredImage = True
-        self.roomSize = 128
-        self.headerSize = 64
-        self.imageName = 'Dungeon.tiff'
-        self.layers: List[RenderLayer] = []
+        self.dungeon = dungeon
+        self.config = config
+        self.dirty: Set[DungeonRoom] = set()
 
-    def add_render_layer(self, layer: RenderLayer) -> None:
+        self.images: List['Image.Image'] = []
+        self.paintableRooms: PaintableRooms = []
+        self.index: Optional[RoomIndex] = None
+        self.positions: Dict[Tuple[int, int], DungeonRoom] = {}
+        self.watched: List[DungeonRoom] = []
+
+    def mark_dirty(self, room: DungeonRoom) -> None:
         """
-        Appends a new render layer to use when rendering dungeons with
-        this configuration.
+        Marks a room as changed. This is called automatically by the
+        rooms of the dungeon when they are modified.
 
         Parameters
         ----------
-        layer: RenderLayer
-            The new render layer.
+        room: DungeonRoom
+            The room which has changed.
         """
 
-        self.layers.append(layer)
+        self.dirty.add(room)
 
+    def close(self) -> None:
+        """
+        Stops listening for changes to the rooms of the dungeon and frees
+        the rendered layer images.
+        """
 
-def plot_map(dungeon: Dungeon,
-             paintableRooms: Dict[DungeonRoom, PaintableRoom],
-             config: PainterConfig) -> Tuple[int, int]:
-    """
-    Plots the pixel position of each room on the final image, and
-    generates the image size required to fully render the dungeon.
-    The pixel coordinates are written to the rooms within the dungeon.
+        for room in self.watched:
+            room.remove_listener(self.mark_dirty)
 
-    Parameters
-    ----------
-    dungeon: Dungeon
-        The dungeon which is being plotted.
+        self.watched = []
+        self.images = []
+        self.dirty.clear()
 
-    paintableRooms: Dict[DungeonRoom, PaintableRoom]
-        A dictionary of paintable wrappers which can be used to store
-        the pixel coordinates of each room.
+    def create_image(self) -> Optional[bytes]:
+        """
+        Creates and saves an image of the dungeon, redrawing only the
+        parts of the image which have changed since the last call. See
+        create_image for more information.
 
-    config: PainterConfig
-        The config to use when determining room measurements.
+        Returns
+        -------
+        The encoded TIFF image, or None if the config has no layers.
+        """
 
-    Returns
-    -------
-    A tuple containing the width and height of the image to generate.
-    """
+        if len(self.config.layers) == 0:
+            return None
 
-    bounds = dungeon.bounds()
+        if len(self.images) != len(self.config.layers) \
+                or len(self.paintableRooms) != len(self.dungeon.rooms):
+            self.render_all()
+        else:
+            self.render_dirty()
 
-    roomSize = config.roomSize
-    headerSize = config.headerSize
+        data = encode_image(self.images, self.config)
 
-    imageWidth = (bounds[2] - bounds[0] + 3) * roomSize
-    imageHeight = (bounds[3] - bounds[1] + 3) * roomSize + headerSize
+        if self.config.imageName != '':
+            with open(self.config.imageName, 'wb') as file:
+                file.write(data)
 
-    for room in dungeon.rooms:
-        p = PaintableRoom(room)
-        p.start = ((room.x - bounds[0] + 1) * roomSize,
-                   (room.y - bounds[1] + 1) *
-                   roomSize + headerSize)
+        return data
 
-        p.end = (p.start[0] + roomSize - 1,
-                 p.start[1] + roomSize - 1)
+    def render_all(self) -> None:
+        """
+        Internal function for rendering every layer of the dungeon from
+        scratch.
+        """
 
-        p.center = (int((p.start[0] + p.end[0]) / 2),
-                    int((p.start[1] + p.end[1]) / 2))
+        self.close()
 
-        p.rect = (p.start[0], p.start[1],
-                  p.end[0], p.end[1])
+        self.paintableRooms, imageSize = plot_rooms(self.dungeon,
+                                                    self.config)
+        self.index = RoomIndex(self.dungeon)
 
-        p.size = roomSize
+        self.positions = {}
+        for room in self.dungeon.rooms:
+            self.positions[(room.x, room.y)] = room
+            room.add_listener(self.mark_dirty)
+            self.watched.append(room)
 
-        paintableRooms[room] = p
+        for layer in self.config.layers:
+            self.images.append(paint_layer(self.dungeon, self.paintableRooms,
+                                           layer, imageSize,
+                                           self.config.paletteLayers))
 
-    return imageWidth, imageHeight
+    def render_dirty(self) -> None:
+        """
+        Internal function for redrawing the area around each changed
+        room. Rooms which have moved require the entire image to be
+        rendered again.
+        """
 
+        dirty = list(self.dirty)
+        self.dirty.clear()
 
-def create_image(dungeon: Dungeon, config: PainterConfig) -> None:
-    """Creates and saves an image of the given dungeon.
+        for room in dirty:
+            if self.positions.get((room.x, room.y)) is not room:
+                self.render_all()
+                return
 
-    This function can be used to crate an image of a dungeon. This
-    process works by using the steps defined in the config to generate
-    layers of a image, defining different properties of the map. These
-    layers can then be compressed into a single layer when saved or
-    saved as a layered image. If the list of layers in the config are
-    empty, nothing happens.
+        for room in dirty:
+            area, rooms = self.dirty_area(room)
 
-    Parameters
-    ----------
-    dungeon: Dungeon
-        The dungeon to create an image of.
+            for i, layer in enumerate(self.config.layers):
+                img = self.images[i]
 
-    config: PainterConfig
-        A config specifying how the image should be rendered.
-    """
+                if layer.update_area(self.dungeon, self.paintableRooms,
+                                     area, rooms, img, self.index):
+                    continue
 
-    if len(config.layers) == 0:
-        return
+                img = new_layer_image(layer, img.size,
+                                      self.config.paletteLayers)
+                draw = ImageDraw.Draw(img)
+                layer.render_layer(self.dungeon, self.paintableRooms,
+                                   img, draw)
+                self.images[i] = img
 
-    paintableRooms: Dict[DungeonRoom, PaintableRoom] = {}
-    imageWidth, imageHeight = plot_map(dungeon, paintableRooms, config)
+    def dirty_area(self, room: DungeonRoom) \
+            -> Tuple[Tuple[int, int, int, int], List[DungeonRoom]]:
+        """
+        Internal function for finding the pixel area which must be
+        redrawn after a room has changed. The area covers the room and a
+        small margin, as locked doors are drawn slightly over the walls
+        of neighbouring rooms. All rooms which touch the room, including
+        diagonally, may draw within this area.
 
-    images = []
-    for layer in config.layers:
-        img = Image.new('RGBA', (imageWidth, imageHeight), color=None)
-        images.append(img)
+        Parameters
+        ----------
+        room: DungeonRoom
+            The room which has changed.
+
+        Returns
+        -------
+        A tuple containing the area to redraw, in the format
+        (x1, y1, x2, y2), and the list of rooms which may draw within it.
+        """
+
+        margin = 8
+        width, height = self.images[0].size
+        rect = paintable_room(self.paintableRooms, room).rect
+
+        area = (max(0, rect[0] - margin), max(0, rect[1] - margin),
+                min(width, rect[2] + 1 + margin),
+                min(height, rect[3] + 1 + margin))
+
+        rooms = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                near = self.positions.get((room.x + dx, room.y + dy))
+                if near is not None:
+                    rooms.append(near)
+
+        return area, rooms
+
+
+@lru_cache(maxsize=None)
+def load_font(path: str, size: int) -> 'ImageFont.FreeTypeFont':
+    """
+    Loads a TrueType font. Fonts are cached by path and size, so each
+    font file is only read once per process, no matter how many layers
+    or painter configs use it.
+
+    Parameters
+    ----------
+    path: str
+        The file path of the font.
 
-        draw = ImageDraw.Draw(img)
-        layer.render_layer(dungeon, paintableRooms, img, draw)
+    size: int
+        The font size, in points.
 
-    if not config.layeredImage:
-        for i in range(1, len(images)):
-            images[0] = Image.alpha_composite(images[0], images[i])
+    Returns
+    -------
+    The loaded font.
+    """
 
-    images[0].save(config.imageName, save_all=config.layeredImage,
-                   append_images=images[1:], compression='tiff_lzw',
-                   tiffinfo={317: 2, 278: 1})
+    return ImageFont.truetype(path, size)
 
 
 def draw_dotted_line(draw: ImageDraw, start: Tuple[float, float],
@@ -300,7 +1378,53 @@ def draw_hollow_rect(draw: ImageDraw, rect: Tuple[int, int, int, int],
     draw.rectangle(rect, fill=(0, 0, 0, 0))
 
 
-class FillLayer(RenderLayer):
+def hsl_to_rgb(hue: Any, saturation: Any, lightness: Any) -> Any:
+    """
+    Converts arrays of HSL colors to RGB, as ImageColor.getrgb does for
+    a single 'hsl(...)' color string. The same floating point steps as
+    the colorsys module are used, so the results are identical.
+
+    Parameters
+    ----------
+    hue: numpy.ndarray
+        The hue of each color, between 0 and 1.
+
+    saturation: numpy.ndarray
+        The saturation of each color, between 0 and 1.
+
+    lightness: numpy.ndarray
+        The lightness of each color, between 0 and 1.
+
+    Returns
+    -------
+    The RGB colors as an (n, 3) array of bytes.
+    """
+
+    import numpy as np
+
+    h, s, l = np.broadcast_arrays(np.asarray(hue, dtype=np.float64),
+                                  np.asarray(saturation, dtype=np.float64),
+                                  np.asarray(lightness, dtype=np.float64))
+
+    m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+    m1 = 2.0 * l - m2
+
+    def channel(value: Any) -> Any:
+        value = value % 1.0
+        return np.select(
+            [value < 1.0 / 6.0, value < 0.5, value < 2.0 / 3.0],
+            [m1 + (m2 - m1) * value * 6.0, m2,
+             m1 + (m2 - m1) * (2.0 / 3.0 - value) * 6.0],
+            m1)
+
+    rgb = np.stack((channel(h + 1.0 / 3.0), channel(h),
+                    channel(h - 1.0 / 3.0)), axis=-1)
+    rgb = np.where((s == 0.0)[..., None], l[..., None], rgb)
+
+    return (rgb * 255 + 0.5).astype(np.int64).astype(np.uint8)
+
+
+class FillLayer(RoomRenderLayer):
     """
     The FillStep operation simply fills the image with a given color.
     Often used for setting the background color.
@@ -316,16 +1440,22 @@ class FillLayer(RenderLayer):
 
         self.color = color
 
-    def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
-                     img: Image, draw: ImageDraw) -> None:
+    def get_palette(self) -> Optional[List[Tuple[int, int, int]]]:
         """See RenderLayer for docs."""
 
+        return [self.color]
+
+    def render_rooms(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     rooms: List[DungeonRoom], img: Image,
+                     draw: ImageDraw) -> None:
+        """See RoomRenderLayer for docs."""
+
         rect = (0, 0, img.size[0], img.size[1])
         draw.rectangle(rect, fill=self.color)
 
 
-class KeysLayer(RenderLayer):
+class KeysLayer(RoomRenderLayer):
     """
     This layer renders the locked doors in the dungeon and where their
     corresponding keys are located.
@@ -346,21 +1476,31 @@ class KeysLayer(RenderLayer):
         self.keyColor = keyColor
         self.keyRadius = keyRadius
 
-    def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
-                     img: Image, draw: ImageDraw) -> None:
+    def get_palette(self) -> Optional[List[Tuple[int, int, int]]]:
         """See RenderLayer for docs."""
 
-        for key in dungeon.keys:
-            keyRoom = key.keyLocation
-            keyX, keyY = paintableRooms[keyRoom].center
+        return [self.keyColor]
+
+    def render_rooms(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     rooms: List[DungeonRoom], img: Image,
+                     draw: ImageDraw) -> None:
+        """See RoomRenderLayer for docs."""
+
+        index = room_index(dungeon, paintableRooms)
+
+        for room in rooms:
+            if room.index not in index.keys:
+                continue
+
+            keyX, keyY = paintable_room(paintableRooms, room).center
 
             rect = (keyX - self.keyRadius, keyY - self.keyRadius,
                     keyX + self.keyRadius, keyY + self.keyRadius)
             draw.ellipse(rect, fill=self.keyColor)
 
 
-class WallsLayer(RenderLayer):
+class WallsLayer(RoomRenderLayer):
     """
     The DrawRooms step is used to render the walls doorways which define
     the base shape of the dungeon.
@@ -385,20 +1525,27 @@ class WallsLayer(RenderLayer):
         self.wallColor = wallColor
         self.lockColor = lockColor
 
-    def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
-                     img: Image, draw: ImageDraw) -> None:
+    def get_palette(self) -> Optional[List[Tuple[int, int, int]]]:
         """See RenderLayer for docs."""
 
-        for room in dungeon.rooms:
-            rect = paintableRooms[room].rect
+        return [self.wallColor, self.lockColor]
+
+    def render_rooms(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     rooms: List[DungeonRoom], img: Image,
+                     draw: ImageDraw) -> None:
+        """See RoomRenderLayer for docs."""
+
+        for room in rooms:
+            p = paintable_room(paintableRooms, room)
+            rect = p.rect
             draw_hollow_rect(draw, rect, self.wallColor)
 
             doorStart = (rect[2] - rect[0] - self.doorSize) / 2
             doorEnd = doorStart + self.doorSize
 
-            s = paintableRooms[room].start
-            e = paintableRooms[room].end
+            s = p.start
+            e = p.end
             if room.doors[0]:
                 r1 = (s[0], s[1] + doorStart,
                       s[0] + 4, s[1] + doorEnd)
@@ -419,34 +1566,52 @@ class WallsLayer(RenderLayer):
                       s[0] + doorEnd, e[1])
                 draw.rectangle(r4, fill=(0, 0, 0, 0))
 
-        for key in dungeon.keys:
-            room = key.lockLocation
-            door = key.lockedDoor
+        index = room_index(dungeon, paintableRooms)
 
-            paint = paintableRooms[room]
-            doorStart = int(
-                (paint.end[0] - paint.start[0] - self.doorSize) / 2)
-            doorEnd = doorStart + self.doorSize
+        for room in rooms:
+            for key in index.locks.get(room.index, []):
+                self.draw_lock(paintable_room(paintableRooms, room),
+                               key.lockedDoor, draw)
 
-            s = paint.start
+    def draw_lock(self, paint: PaintableRoom, door: int,
+                  draw: ImageDraw) -> None:
+        """
+        Internal function for rendering a locked door.
 
-            if door == 2:
-                s = (s[0] + paint.size, s[1])
-                door = 0
+        Parameters
+        ----------
+        paint: PaintableRoom
+            The room containing the locked door.
 
-            if door == 3:
-                s = (s[0], s[1] + paint.size)
-                door = 1
+        door: int
+            The direction of the locked door.
 
-            if door == 0:
-                r1 = (s[0] - 4 - 2, s[1] + doorStart,
-                      s[0] + 4, s[1] + doorEnd)
-                draw_hollow_rect(draw, r1, self.lockColor)
+        draw: ImageDraw
+            The drawing handler.
+        """
 
-            if door == 1:
-                r2 = (s[0] + doorStart, s[1] - 4 - 2,
-                      s[0] + doorEnd, s[1] + 4)
-                draw_hollow_rect(draw, r2, self.lockColor)
+        doorStart = int((paint.end[0] - paint.start[0] - self.doorSize) / 2)
+        doorEnd = doorStart + self.doorSize
+
+        s = paint.start
+
+        if door == 2:
+            s = (s[0] + paint.size, s[1])
+            door = 0
+
+        if door == 3:
+            s = (s[0], s[1] + paint.size)
+            door = 1
+
+        if door == 0:
+            r1 = (s[0] - 4 - 2, s[1] + doorStart,
+                  s[0] + 4, s[1] + doorEnd)
+            draw_hollow_rect(draw, r1, self.lockColor)
+
+        if door == 1:
+            r2 = (s[0] + doorStart, s[1] - 4 - 2,
+                  s[0] + doorEnd, s[1] + 4)
+            draw_hollow_rect(draw, r2, self.lockColor)
 
 
 class PathLayer(RenderLayer):
@@ -469,14 +1634,19 @@ class PathLayer(RenderLayer):
 
         self.pathColor = pathColor
 
+    def get_palette(self) -> Optional[List[Tuple[int, int, int]]]:
+        """See RenderLayer for docs."""
+
+        return [self.pathColor]
+
     def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
+                     paintableRooms: PaintableRooms,
                      img: Image, draw: ImageDraw) -> None:
         """See RenderLayer for docs."""
 
         path = []
         for room in dungeon.mainPath:
-            path.append(paintableRooms[room].center)
+            path.append(paintable_room(paintableRooms, room).center)
 
         draw.line(path, fill=self.pathColor, width=3)
         self.draw_starting_triangle(dungeon.rooms[0], dungeon,
@@ -486,8 +1656,21 @@ class PathLayer(RenderLayer):
         for sidePath in dungeon.mainPath.sidePaths:
             self.draw_side_path(sidePath, paintableRooms, draw)
 
+    def update_area(self, dungeon: Dungeon,
+                    paintableRooms: PaintableRooms,
+                    area: Tuple[int, int, int, int],
+                    rooms: List[DungeonRoom], img: 'Image.Image',
+                    index: Optional[RoomIndex] = None) -> bool:
+        """
+        See RenderLayer for docs. The path layer only depends on the
+        paths of the dungeon, which are not changed by editing a room,
+        so there is nothing to redraw.
+        """
+
+        return True
+
     def draw_starting_triangle(self, room: DungeonRoom, dungeon: Dungeon,
-                               paintableRooms: Dict[DungeonRoom, PaintableRoom],
+                               paintableRooms: PaintableRooms,
                                draw: ImageDraw) -> None:
         """
         Internal function for rendering the starting triangle arrow.
@@ -501,7 +1684,7 @@ class PathLayer(RenderLayer):
             The drawing handler.
         """
 
-        c = paintableRooms[room].center
+        c = paintable_room(paintableRooms, room).center
         size = 8
 
         points = []
@@ -528,7 +1711,7 @@ class PathLayer(RenderLayer):
         draw.polygon(points, fill=self.pathColor)
 
     def draw_ending_square(self, room: DungeonRoom,
-                           paintableRooms: Dict[DungeonRoom, PaintableRoom],
+                           paintableRooms: PaintableRooms,
                            draw: ImageDraw) -> None:
         """
         Internal function for rendering the ending circle.
@@ -542,13 +1725,13 @@ class PathLayer(RenderLayer):
             The drawing handler.
         """
 
-        c = paintableRooms[room].center
+        c = paintable_room(paintableRooms, room).center
 
         rect = (c[0] - 8, c[1] - 8, c[0] + 8, c[1] + 8)
         draw_hollow_rect(draw, rect, self.pathColor, thickness=4)
 
     def draw_side_path(self, sidePath: DungeonPath,
-                       paintableRooms: Dict[DungeonRoom, PaintableRoom],
+                       paintableRooms: PaintableRooms,
                        draw: ImageDraw) -> None:
         """
         Internal function for rendering a side path starting at a given
@@ -557,9 +1740,11 @@ class PathLayer(RenderLayer):
 
         Parameters
         ----------
-        room: DungeonRoom
-            The room who's pathNext attribute is the first room in the
-            side path.
+        sidePath: DungeonPath
+            The side path to render.
+
+        paintableRooms: PaintableRooms
+            The paintable wrapper of each room, indexed by room index.
 
         draw: ImageDraw
             The drawing handler.
@@ -567,7 +1752,7 @@ class PathLayer(RenderLayer):
 
         path = []
         for room in sidePath:
-            path.append(paintableRooms[room].center)
+            path.append(paintable_room(paintableRooms, room).center)
 
         for i in range(len(path) - 1):
             draw_dotted_line(draw, path[i],
@@ -577,7 +1762,7 @@ class PathLayer(RenderLayer):
             self.draw_side_path(nSidePath, paintableRooms, draw)
 
 
-class RoomNumbersLayer(RenderLayer):
+class RoomNumbersLayer(RoomRenderLayer):
     """
     The layer draws the index number of each room in the top left
     corner of the room.
@@ -598,47 +1783,81 @@ class RoomNumbersLayer(RenderLayer):
         self.font = font
         self.textColor = textColor
 
-    def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
-                     img: Image, draw: ImageDraw) -> None:
-        """See RenderLayer for docs."""
+    def render_rooms(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     rooms: List[DungeonRoom], img: Image,
+                     draw: ImageDraw) -> None:
+        """See RoomRenderLayer for docs."""
+
+        required = room_index(dungeon, paintableRooms).required
 
-        for room in dungeon.rooms:
+        for room in rooms:
             roomName = str(room.index)
 
-            if dungeon.is_room_optional(room):
+            if room not in required:
                 roomName += '*'
 
-            s = paintableRooms[room].start
+            s = paintable_room(paintableRooms, room).start
             draw.text((s[0] + 4, s[1] + 2),
                       roomName, fill=self.textColor, font=self.font)
 
 
-class RegionLayer(RenderLayer):
+class RegionLayer(RoomRenderLayer):
     """
     The region layer is used to visualize the different region clusters
     within a dungeon. Each region is given a random color, and all rooms
     with that region are filled with that color.
+
+    Attributes
+    ----------
+    regionColors: List[Tuple[int, int, int]]
+        The colors picked for each region during the last full render.
+        These are reused when only part of the layer is redrawn.
     """
 
+    usesRandom = True
+    renderState = ('regionColors',)
+
+    def __init__(self) -> None:
+        self.regionColors: List[Tuple[int, int, int]] = []
+
     def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
+                     paintableRooms: PaintableRooms,
                      img: Image, draw: ImageDraw) -> None:
         """See RenderLayer for docs."""
 
-        regionColors = [(0, 0, 0)] * dungeon.region_count()
-        for i in range(len(regionColors)):
+        self.regionColors = []
+        super().render_layer(dungeon, paintableRooms, img, draw)
+
+    def render_rooms(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     rooms: List[DungeonRoom], img: Image,
+                     draw: ImageDraw) -> None:
+        """See RoomRenderLayer for docs."""
+
+        while len(self.regionColors) < dungeon.region_count():
             r = rand(128) + 128
             g = rand(128) + 128
             b = rand(128) + 128
-            regionColors[i] = (r, g, b)
+            self.regionColors.append((r, g, b))
 
-        for room in dungeon.rooms:
-            rect = paintableRooms[room].rect
-            draw.rectangle(rect, fill=regionColors[room.region])
+        if isinstance(paintableRooms, RoomLayout) \
+                and len(rooms) == len(paintableRooms):
+            import numpy as np
 
+            palette = np.array(self.regionColors, dtype=np.uint8) \
+                .reshape(-1, 3)
+            regions = np.fromiter((room.region for room in dungeon.rooms),
+                                  dtype=np.int64, count=len(rooms))
+            paintableRooms.fill_rooms(img, palette[regions])
+            return
 
-class DifficultyLayer(RenderLayer):
+        for room in rooms:
+            rect = paintable_room(paintableRooms, room).rect
+            draw.rectangle(rect, fill=self.regionColors[room.region])
+
+
+class DifficultyLayer(RoomRenderLayer):
     """
     The difficulty layer is used to render a heatmap of difficulty
     across the dungeon for each room. Difficulty is measured as a range
@@ -665,18 +1884,45 @@ class DifficultyLayer(RenderLayer):
         col = 'hsl(' + str((1 - value) * 240) + ', 100%, 50%)'
         return cast(Tuple[int, int, int], ImageColor.getrgb(col))
 
-    def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
-                     img: Image, draw: ImageDraw) -> None:
-        """See RenderLayer for docs."""
+    def get_gradient_colors(self, values: Any) -> Any:
+        """
+        Converts an array of percentile values to heatmap colors at once,
+        as get_gradient_color does for each value.
+
+        Parameters
+        ----------
+        values: numpy.ndarray
+            The percentiles.
+
+        Returns
+        -------
+        The RGB color of each value, as an (n, 3) array.
+        """
+
+        return hsl_to_rgb((1 - values) * 240 / 360.0, 1.0, 0.5)
+
+    def render_rooms(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     rooms: List[DungeonRoom], img: Image,
+                     draw: ImageDraw) -> None:
+        """See RoomRenderLayer for docs."""
+
+        if isinstance(paintableRooms, RoomLayout) \
+                and len(rooms) == len(paintableRooms):
+            import numpy as np
 
-        for room in dungeon.rooms:
-            rect = paintableRooms[room].rect
+            values = np.fromiter((room.difficulty for room in dungeon.rooms),
+                                 dtype=np.float64, count=len(rooms))
+            paintableRooms.fill_rooms(img, self.get_gradient_colors(values))
+            return
+
+        for room in rooms:
+            rect = paintable_room(paintableRooms, room).rect
             col = self.get_gradient_color(room.difficulty)
             draw.rectangle(rect, fill=col)
 
 
-class RoomTypeLayer(RenderLayer):
+class RoomTypeLayer(RoomRenderLayer):
     """
     The room type layer can be used to visualize the room types for each
     room in the dungeon. The name of the room type is printed in the
@@ -698,21 +1944,22 @@ class RoomTypeLayer(RenderLayer):
         self.font = font
         self.color = color
 
-    def render_layer(self, dungeon: Dungeon,
-                     paintableRooms: Dict[DungeonRoom, PaintableRoom],
-                     img: Image, draw: ImageDraw) -> None:
-        """See RenderLayer for docs."""
+    def render_rooms(self, dungeon: Dungeon,
+                     paintableRooms: PaintableRooms,
+                     rooms: List[DungeonRoom], img: Image,
+                     draw: ImageDraw) -> None:
+        """See RoomRenderLayer for docs."""
 
-        for room in dungeon.rooms:
+        for room in rooms:
             if room.type is None:
                 continue
 
-            text, lines = self.word_wrap(room.type.name,
-                                         paintableRooms[room].size - 8)
+            p = paintable_room(paintableRooms, room)
+            text, lines = self.word_wrap(room.type.name, p.size - 8)
 
             w, h = self.font.getsize(text)
 
-            r = paintableRooms[room].rect
+            r = p.rect
             draw.multiline_text((r[0] + 4, r[3] - h * lines - 2),
                                 text, fill=self.color, font=self.font)
 
@@ -0,0 +1,516 @@
+"""
+DungeonServer is a module for running a long lived dungeon generation
+service. The server keeps a pool of worker processes with every config
+already built, so each request only pays for generating the dungeon
+itself.
+
+Clients connect over a Unix socket or a local TCP port and send one JSON
+request per line. Each request looks like:
+
+    {"id": 1, "config": "basic", "seed": 42, "format": "json",
+     "render": false}
+
+Only the seed is required. The format may be "json", for a dungeon dict
+as written by DungeonIO.to_dict, or "binary", for a base64 encoded
+DungeonIO.pack record. If render is true, a base64 encoded image is
+included as well. The server answers with one JSON line per request, in
+the order they complete, which always contains the request id and either
+"ok": true with the results, or "ok": false with an error message.
+"""
+
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, \
+    TYPE_CHECKING, cast
+from concurrent.futures import ProcessPoolExecutor
+from base64 import b64encode
+import asyncio
+import json
+import sys
+import DungeonIO
+import DunGEN
+from DunGEN import GeneratorConfig, CompiledConfig
+
+if TYPE_CHECKING:
+    from DungeonPainter import PainterConfig
+
+
+ConfigFactory = Callable[[], GeneratorConfig]
+PainterFactory = Callable[[], 'PainterConfig']
+ConfigRegistry = Mapping[str,
+                         Tuple[ConfigFactory, Optional[PainterFactory]]]
+
+# A single job sent to a worker: config name, seed, format and render flag.
+Job = Tuple[str, int, str, bool]
+
+workerRegistry: ConfigRegistry = {}
+workerConfigs: Dict[str, CompiledConfig] = {}
+workerPainters: Dict[str, 'PainterConfig'] = {}
+
+
+def init_worker(registry: ConfigRegistry) -> None:
+    """
+    Prepares a worker process by building and compiling every generator
+    config in the registry up front. Painter configs are only built once
+    a dungeon is first rendered with them, so workers which never render
+    do not need to load any fonts.
+
+    Parameters
+    ----------
+    registry: ConfigRegistry
+        The config factories, by config name. The factories must be
+        module level functions, so they can be sent to the worker.
+    """
+
+    global workerRegistry
+
+    workerRegistry = registry
+    for name, (factory, _) in registry.items():
+        workerConfigs[name] = factory().compile()
+
+
+def run_job(job: Job) -> Dict[str, Any]:
+    """
+    Generates, serializes and optionally renders a single dungeon within
+    a worker process.
+
+    Parameters
+    ----------
+    job: Job
+        The config name, seed, output format and render flag.
+
+    Returns
+    -------
+    The response fields for the job, excluding the request id.
+
+    Raises
+    ------
+    GeneratorError
+        If the job requests an unknown config or format, or requests a
+        render from a config without a painter.
+    """
+
+    name, seed, outputFormat, render = job
+
+    config = workerConfigs.get(name)
+    if config is None:
+        raise DunGEN.GeneratorError('Unknown config: ' + name)
+
+    dungeon = DunGEN.gen_map(config, seed)
+    response: Dict[str, Any] = {'ok': True, 'seed': seed}
+
+    if outputFormat == 'json':
+        response['dungeon'] = DungeonIO.to_dict(dungeon, config.roomTypes,
+                                                config.enemyTypes)
+    elif outputFormat == 'binary':
+        data = DungeonIO.pack(dungeon, config.roomTypes, config.enemyTypes)
+        response['dungeon'] = b64encode(data).decode('ascii')
+    else:
+        raise DunGEN.GeneratorError('Unknown format: ' + outputFormat)
+
+    if render:
+        response['image'] = b64encode(render_dungeon(name, dungeon)) \
+            .decode('ascii')
+
+    return response
+
+
+def render_dungeon(name: str, dungeon: DunGEN.Dungeon) -> bytes:
+    """
+    Internal function for rendering a dungeon within a worker process.
+
+    Parameters
+    ----------
+    name: str
+        The name of the config the dungeon was generated with.
+
+    dungeon: Dungeon
+        The dungeon to render.
+
+    Returns
+    -------
+    The encoded image.
+    """
+
+    painter = workerPainters.get(name)
+    if painter is None:
+        factory = workerRegistry[name][1]
+        if factory is None:
+            raise DunGEN.GeneratorError('Config cannot render: ' + name)
+
+        painter = factory()
+        painter.imageName = ''
+        workerPainters[name] = painter
+
+    # Imported only once a painter is found, so configs which can not
+    # render report that, rather than a missing Pillow install.
+    import DungeonPainter
+
+    data = DungeonPainter.create_image(dungeon, painter)
+    assert data is not None
+
+    return data
+
+
+def run_batch(jobs: List[Job]) -> List[Dict[str, Any]]:
+    """
+    Runs a batch of jobs within a worker process. A failed job does not
+    affect the rest of the batch.
+
+    Parameters
+    ----------
+    jobs: List[Job]
+        The jobs to run.
+
+    Returns
+    -------
+    The response fields for each job, in the same order as the jobs.
+    """
+
+    responses = []
+    for job in jobs:
+        try:
+            responses.append(run_job(job))
+        except Exception as e:
+            responses.append({'ok': False, 'seed': job[1],
+                              'error': type(e).__name__ + ': ' + str(e)})
+
+    return responses
+
+
+class GenerationServer:
+    """
+    An asyncio server which generates dungeons on a pool of warm worker
+    processes.
+
+    Incoming requests are placed on a bounded queue. When the queue is
+    full, the server stops reading from the connection until there is
+    room, which pushes back on clients that send requests faster than
+    they can be generated. Queued requests are grouped into batches, so
+    many small requests share a single round trip to a worker.
+
+    Attributes
+    ----------
+    registry: ConfigRegistry
+        The config factories which are available to clients, by name.
+
+    workers: int
+        The number of worker processes.
+
+    batchSize: int
+        The maximum number of requests to send to a worker at once.
+
+    batchDelay: float
+        The maximum number of seconds to wait for a batch to fill up
+        once the first request of the batch has arrived.
+
+    queue: asyncio.Queue
+        The requests waiting to be sent to a worker.
+    """
+
+    def __init__(self, registry: ConfigRegistry, workers: int = 4,
+                 batchSize: int = 16, batchDelay: float = 0.002,
+                 queueSize: int = 1024) -> None:
+        """
+        Parameters
+        ----------
+        registry: ConfigRegistry
+            The config factories which are available to clients, by
+            name. The factories must be module level functions.
+
+        workers: int
+            The number of worker processes.
+
+        batchSize: int
+            The maximum number of requests to send to a worker at once.
+
+        batchDelay: float
+            The maximum number of seconds to wait for a batch to fill up.
+
+        queueSize: int
+            The maximum number of requests waiting for a worker before
+            the server stops accepting more.
+        """
+
+        self.registry = registry
+        self.workers = workers
+        self.batchSize = batchSize
+        self.batchDelay = batchDelay
+
+        self.queue: 'asyncio.Queue[Tuple[Job, asyncio.Future[Any]]]' = \
+            asyncio.Queue(queueSize)
+
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.servers: List[asyncio.AbstractServer] = []
+        self.dispatcher: Optional['asyncio.Task[None]'] = None
+        self.running: 'set[asyncio.Task[None]]' = set()
+
+    async def start(self) -> None:
+        """
+        Starts the worker processes and waits for each of them to finish
+        building their configs.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        self.pool = ProcessPoolExecutor(self.workers,
+                                        initializer=init_worker,
+                                        initargs=(self.registry,))
+
+        # Submitting an empty batch to each worker forces all of the
+        # processes to start, so the first real requests are not slowed
+        # down by config construction.
+        await asyncio.gather(*[loop.run_in_executor(self.pool, run_batch, [])
+                               for _ in range(self.workers)])
+
+        self.dispatcher = asyncio.create_task(self.dispatch())
+
+    async def listen_unix(self, path: str) -> None:
+        """
+        Accepts clients on a Unix socket.
+
+        Parameters
+        ----------
+        path: str
+            The file path of the socket.
+        """
+
+        server = await asyncio.start_unix_server(self.handle_client, path)
+        self.servers.append(server)
+
+    async def listen_tcp(self, host: str, port: int) -> None:
+        """
+        Accepts clients on a TCP port.
+
+        Parameters
+        ----------
+        host: str
+            The address to listen on, such as 127.0.0.1.
+
+        port: int
+            The port to listen on.
+        """
+
+        server = await asyncio.start_server(self.handle_client, host, port)
+        self.servers.append(server)
+
+    async def serve_forever(self) -> None:
+        """
+        Serves clients until the task is cancelled.
+        """
+
+        await asyncio.gather(*[s.serve_forever() for s in self.servers])
+
+    async def close(self) -> None:
+        """
+        Stops accepting clients, cancels any queued requests and shuts
+        down the worker processes.
+        """
+
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+
+        while not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            future.cancel()
+
+        if self.pool is not None:
+            if sys.version_info >= (3, 9):
+                self.pool.shutdown(cancel_futures=True)
+            else:
+                self.pool.shutdown()
+
+    async def generate(self, config: str, seed: int,
+                       outputFormat: str = 'json',
+                       render: bool = False) -> Dict[str, Any]:
+        """
+        Queues a dungeon to be generated and waits for the result. If the
+        queue is full, this waits until there is room.
+
+        Parameters
+        ----------
+        config: str
+            The name of the config to generate the dungeon with.
+
+        seed: int
+            The seed to generate the dungeon with.
+
+        outputFormat: str
+            The format to serialize the dungeon in, "json" or "binary".
+
+        render: bool
+            Whether or not to also render an image of the dungeon.
+
+        Returns
+        -------
+        The response fields for the request.
+        """
+
+        response = await (await self.submit((config, seed, outputFormat,
+                                             render)))
+        return cast(Dict[str, Any], response)
+
+    async def submit(self, job: Job) -> 'asyncio.Future[Any]':
+        """
+        Queues a job, waiting until there is room in the queue if it is
+        full.
+
+        Parameters
+        ----------
+        job: Job
+            The job to queue.
+
+        Returns
+        -------
+        A future which receives the response fields of the job.
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((job, future))
+
+        return future
+
+    async def dispatch(self) -> None:
+        """
+        Internal task for collecting queued requests into batches and
+        sending them to the workers. At most two batches per worker are
+        in flight at once, so requests back up in the queue, rather than
+        in the executor, when the workers fall behind.
+        """
+
+        slots = asyncio.Semaphore(self.workers * 2)
+
+        while True:
+            await slots.acquire()
+            batch = [await self.queue.get()]
+
+            deadline = asyncio.get_running_loop().time() + self.batchDelay
+            while len(batch) < self.batchSize:
+                timeout = deadline - asyncio.get_running_loop().time()
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(),
+                                                        max(0, timeout)))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self.run(batch, slots))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def run(self, batch: List[Tuple[Job, 'asyncio.Future[Any]']],
+                  slots: asyncio.Semaphore) -> None:
+        """
+        Internal task for running a single batch on a worker and
+        delivering the results.
+
+        Parameters
+        ----------
+        batch: List[Tuple[Job, asyncio.Future]]
+            The jobs to run, and the futures to deliver the results to.
+
+        slots: asyncio.Semaphore
+            The semaphore to release once the batch is complete.
+        """
+
+        loop = asyncio.get_running_loop()
+        live = [(job, future) for job, future in batch
+                if not future.cancelled()]
+
+        try:
+            if live:
+                responses = await loop.run_in_executor(
+                    self.pool, run_batch, [job for job, _ in live])
+            else:
+                responses = []
+
+        except Exception as e:
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        finally:
+            slots.release()
+
+        for (_, future), response in zip(live, responses):
+            if not future.done():
+                future.set_result(response)
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """
+        Internal task for serving a single client connection. Requests
+        are read one line at a time, and each response is written as
+        soon as it is ready.
+
+        Parameters
+        ----------
+        reader: asyncio.StreamReader
+            The stream to read requests from.
+
+        writer: asyncio.StreamWriter
+            The stream to write responses to.
+        """
+
+        pending: 'set[asyncio.Task[None]]' = set()
+        lock = asyncio.Lock()
+
+        async def respond(response: Dict[str, Any]) -> None:
+            async with lock:
+                writer.write(json.dumps(response, separators=(',', ':'))
+                             .encode() + b'\n')
+                await writer.drain()
+
+        async def deliver(requestId: Any, future: 'asyncio.Future[Any]') \
+                -> None:
+            try:
+                response = await future
+            except Exception as e:
+                response = {'ok': False,
+                            'error': type(e).__name__ + ': ' + str(e)}
+
+            response['id'] = requestId
+            await respond(response)
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                requestId = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError('Request must be a JSON object')
+
+                    requestId = request.get('id')
+                    job = (str(request.get('config', 'basic')),
+                           int(request['seed']),
+                           str(request.get('format', 'json')),
+                           bool(request.get('render', False)))
+
+                except (ValueError, TypeError, KeyError) as e:
+                    await respond({'id': requestId, 'ok': False,
+                                   'error': 'Bad request: ' + repr(e)})
+                    continue
+
+                # Waiting for room in the queue here, before reading the
+                # next line, is what applies backpressure to the client.
+                future = await self.submit(job)
+
+                task = asyncio.create_task(deliver(requestId, future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.gather(*pending)
+
+        except ConnectionError:
+            for task in pending:
+                task.cancel()
+
+        finally:
+            writer.close()
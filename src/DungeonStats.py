@@ -0,0 +1,743 @@
+"""
+DungeonStats is a module for collecting statistics over large numbers of
+generated dungeons, such as when tuning the parameters of generator
+layers.
+
+Every statistic is collected with a streaming algorithm, which keeps a
+fixed amount of memory no matter how many dungeons are added. Means and
+variances use Welford's algorithm, quantiles use a merging digest, which
+keeps a bounded number of weighted centroids, and distributions use
+histograms with fixed bins. Every statistic can be merged with another
+statistic of the same kind, so stats can be collected separately by
+each worker process, and combined afterwards.
+"""
+
+from typing import Any, Dict, List, Sequence, Set, Tuple
+from math import asin, pi, sqrt
+
+from DunGEN import Dungeon, DungeonRoom, DungeonPath, GeneratorError
+
+
+def required_rooms(dungeon: Dungeon) -> Set[DungeonRoom]:
+    """
+    Finds every room which lies along a required path of a dungeon.
+    These are the rooms for which Dungeon.is_room_optional returns
+    False, but the paths are only walked once.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to check.
+
+    Returns
+    -------
+    The set of required rooms.
+    """
+
+    required: Set[DungeonRoom] = set()
+    paths: List[DungeonPath] = [dungeon.mainPath]
+
+    while len(paths) > 0:
+        path = paths.pop()
+        required.update(path.rooms)
+        paths.extend(p for p in path.sidePaths if not p.optional)
+
+    return required
+
+
+class RunningStats:
+    """
+    Running stats track the count, mean, variance, minimum and maximum of
+    a stream of values, using Welford's algorithm.
+
+    Attributes
+    ----------
+    count: int
+        The number of values added.
+
+    mean: float
+        The mean of the values added.
+
+    m2: float
+        The sum of squared differences from the mean.
+
+    low: float
+        The smallest value added, or inf if no values have been added.
+
+    high: float
+        The largest value added, or -inf if no values have been added.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'low', 'high')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.low = float('inf')
+        self.high = float('-inf')
+
+    def add(self, value: float) -> None:
+        """
+        Adds a single value.
+
+        Parameters
+        ----------
+        value: float
+            The value to add.
+        """
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+        if value < self.low:
+            self.low = value
+        if value > self.high:
+            self.high = value
+
+    def merge(self, other: 'RunningStats') -> None:
+        """
+        Adds the values of another set of running stats to these stats.
+
+        Parameters
+        ----------
+        other: RunningStats
+            The stats to add.
+        """
+
+        if other.count == 0:
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count \
+            / count
+        self.count = count
+
+        self.low = min(self.low, other.low)
+        self.high = max(self.high, other.high)
+
+    def variance(self) -> float:
+        """
+        Calculates the sample variance of the values added.
+
+        Returns
+        -------
+        The sample variance, or 0 if fewer than two values were added.
+        """
+
+        if self.count < 2:
+            return 0.0
+
+        return self.m2 / (self.count - 1)
+
+    def std(self) -> float:
+        """
+        Calculates the sample standard deviation of the values added.
+
+        Returns
+        -------
+        The standard deviation, or 0 if fewer than two values were added.
+        """
+
+        return sqrt(self.variance())
+
+
+class QuantileDigest:
+    """
+    A quantile digest estimates quantiles of a stream of values, in the
+    style of a merging t-digest. Values are collected into a buffer,
+    which is periodically sorted and merged into a list of weighted
+    centroids. Centroids near the tails are kept small, so extreme
+    quantiles stay accurate, while centroids near the median may grow
+    large. The number of centroids is bounded by the compression.
+
+    Attributes
+    ----------
+    compression: int
+        Controls the number of centroids kept. Larger values are more
+        accurate, but use more memory.
+
+    means: List[float]
+        The means of the centroids, in increasing order.
+
+    weights: List[float]
+        The weights of the centroids.
+
+    buffer: List[Tuple[float, float]]
+        Values and weights which have not yet been merged.
+
+    total: float
+        The total weight of all values added.
+
+    low: float
+        The smallest value added.
+
+    high: float
+        The largest value added.
+    """
+
+    __slots__ = ('compression', 'means', 'weights', 'buffer', 'total',
+                 'low', 'high')
+
+    def __init__(self, compression: int = 100) -> None:
+        """
+        Parameters
+        ----------
+        compression: int
+            Controls the number of centroids kept. Must be at least 10.
+
+        Raises
+        ------
+        GeneratorError
+            If the compression is less than 10.
+        """
+
+        if compression < 10:
+            raise GeneratorError('Digest compression must be at least 10')
+
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.buffer: List[Tuple[float, float]] = []
+        self.total = 0.0
+        self.low = float('inf')
+        self.high = float('-inf')
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        """
+        Adds a single value.
+
+        Parameters
+        ----------
+        value: float
+            The value to add.
+
+        weight: float
+            The weight of the value.
+        """
+
+        self.buffer.append((value, weight))
+        self.total += weight
+
+        if value < self.low:
+            self.low = value
+        if value > self.high:
+            self.high = value
+
+        if len(self.buffer) >= self.compression * 5:
+            self.compress()
+
+    def merge(self, other: 'QuantileDigest') -> None:
+        """
+        Adds the values of another digest to this digest.
+
+        Parameters
+        ----------
+        other: QuantileDigest
+            The digest to add.
+        """
+
+        self.buffer.extend(zip(other.means, other.weights))
+        self.buffer.extend(other.buffer)
+        self.total += other.total
+        self.low = min(self.low, other.low)
+        self.high = max(self.high, other.high)
+
+        self.compress()
+
+    def compress(self) -> None:
+        """
+        Merges the buffered values into the centroids. Neighbouring
+        centroids are combined as long as the combined centroid covers
+        at most one unit of the scale function, k = compression / 2pi *
+        asin(2q - 1), so centroids near q = 0 and q = 1 stay small.
+        """
+
+        if len(self.buffer) == 0:
+            return
+
+        points = sorted(self.buffer + list(zip(self.means, self.weights)))
+        self.buffer = []
+
+        scale = self.compression / (2 * pi)
+        means: List[float] = []
+        weights: List[float] = []
+
+        mean, weight = points[0]
+        before = 0.0
+        kLow = scale * asin(-1.0)
+
+        for value, w in points[1:]:
+            q = min((before + weight + w) / self.total, 1.0)
+
+            if scale * asin(2 * q - 1) - kLow <= 1:
+                weight += w
+                mean += (value - mean) * w / weight
+                continue
+
+            means.append(mean)
+            weights.append(weight)
+            before += weight
+            kLow = scale * asin(2 * min(before / self.total, 1.0) - 1)
+            mean, weight = value, w
+
+        means.append(mean)
+        weights.append(weight)
+
+        self.means = means
+        self.weights = weights
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile of the values added. Values are linearly
+        interpolated between the centres of neighbouring centroids.
+
+        Parameters
+        ----------
+        q: float
+            The quantile, between 0 and 1.
+
+        Returns
+        -------
+        The estimated value, or NaN if no values have been added.
+        """
+
+        self.compress()
+
+        if self.total == 0:
+            return float('nan')
+
+        target = q * self.total
+        means = self.means
+        weights = self.weights
+
+        if target <= weights[0] / 2:
+            return self.low + (means[0] - self.low) \
+                * min(target / (weights[0] / 2), 1.0)
+
+        position = weights[0] / 2
+        for i in range(1, len(means)):
+            step = (weights[i - 1] + weights[i]) / 2
+
+            if target <= position + step:
+                t = (target - position) / step
+                return means[i - 1] + (means[i] - means[i - 1]) * t
+
+            position += step
+
+        remaining = weights[-1] / 2
+        t = min((target - position) / remaining, 1.0) if remaining > 0 \
+            else 1.0
+        return means[-1] + (self.high - means[-1]) * t
+
+
+class Histogram:
+    """
+    A histogram counts values within equally sized bins between a low
+    and high bound. Values outside of the bounds are counted separately.
+
+    Attributes
+    ----------
+    low: float
+        The lower bound of the first bin.
+
+    high: float
+        The upper bound of the last bin. Values equal to the upper bound
+        are counted in the last bin.
+
+    counts: List[int]
+        The number of values within each bin.
+
+    underflow: int
+        The number of values below the lower bound.
+
+    overflow: int
+        The number of values above the upper bound.
+    """
+
+    __slots__ = ('low', 'high', 'counts', 'underflow', 'overflow')
+
+    def __init__(self, low: float, high: float, bins: int) -> None:
+        """
+        Parameters
+        ----------
+        low: float
+            The lower bound of the first bin.
+
+        high: float
+            The upper bound of the last bin.
+
+        bins: int
+            The number of bins.
+
+        Raises
+        ------
+        GeneratorError
+            If the bounds are empty, or there are no bins.
+        """
+
+        if high <= low:
+            raise GeneratorError('Histogram bounds must not be empty')
+
+        if bins < 1:
+            raise GeneratorError('Histogram must have at least one bin')
+
+        self.low = low
+        self.high = high
+        self.counts = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+
+    def add(self, value: float) -> None:
+        """
+        Adds a single value.
+
+        Parameters
+        ----------
+        value: float
+            The value to add.
+        """
+
+        if value < self.low:
+            self.underflow += 1
+        elif value > self.high:
+            self.overflow += 1
+        else:
+            bins = len(self.counts)
+            index = int((value - self.low) / (self.high - self.low) * bins)
+            self.counts[min(index, bins - 1)] += 1
+
+    def merge(self, other: 'Histogram') -> None:
+        """
+        Adds the counts of another histogram to this histogram.
+
+        Parameters
+        ----------
+        other: Histogram
+            The histogram to add. It must have the same bounds and
+            number of bins.
+
+        Raises
+        ------
+        GeneratorError
+            If the histograms have different bins.
+        """
+
+        if (other.low, other.high, len(other.counts)) \
+                != (self.low, self.high, len(self.counts)):
+            raise GeneratorError('Can not merge histograms with '
+                                 'different bins')
+
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    def edges(self) -> List[float]:
+        """
+        Calculates the edges of each bin.
+
+        Returns
+        -------
+        A list of bin edges, one longer than the number of bins.
+        """
+
+        bins = len(self.counts)
+        return [self.low + (self.high - self.low) * i / bins
+                for i in range(bins + 1)]
+
+
+class MetricSummary:
+    """
+    A metric summary combines running stats and a quantile digest, to
+    summarize a single metric.
+
+    Attributes
+    ----------
+    stats: RunningStats
+        The count, mean, variance and bounds of the metric.
+
+    digest: QuantileDigest
+        The quantiles of the metric.
+    """
+
+    __slots__ = ('stats', 'digest')
+
+    def __init__(self, compression: int = 100) -> None:
+        """
+        Parameters
+        ----------
+        compression: int
+            The compression of the quantile digest.
+        """
+
+        self.stats = RunningStats()
+        self.digest = QuantileDigest(compression)
+
+    def add(self, value: float) -> None:
+        """
+        Adds a single value.
+
+        Parameters
+        ----------
+        value: float
+            The value to add.
+        """
+
+        self.stats.add(value)
+        self.digest.add(value)
+
+    def merge(self, other: 'MetricSummary') -> None:
+        """
+        Adds the values of another summary to this summary.
+
+        Parameters
+        ----------
+        other: MetricSummary
+            The summary to add.
+        """
+
+        self.stats.merge(other.stats)
+        self.digest.merge(other.digest)
+
+    def report(self, quantiles: Sequence[float] = (0.5, 0.9, 0.99)) \
+            -> Dict[str, Any]:
+        """
+        Creates a summary of this metric.
+
+        Parameters
+        ----------
+        quantiles: Sequence[float]
+            The quantiles to include.
+
+        Returns
+        -------
+        A dictionary with the count, mean, standard deviation, minimum,
+        maximum and requested quantiles of the metric. Quantiles are
+        keyed as 'p50', 'p90' and so on.
+        """
+
+        if self.stats.count == 0:
+            return {'count': 0}
+
+        report: Dict[str, Any] = {
+            'count': self.stats.count,
+            'mean': self.stats.mean,
+            'std': self.stats.std(),
+            'min': self.stats.low,
+            'max': self.stats.high
+        }
+
+        for q in quantiles:
+            report['p' + format(q * 100, 'g')] = self.digest.quantile(q)
+
+        return report
+
+
+# Metrics collected once per dungeon, in report order.
+DUNGEON_METRICS = ('rooms', 'regions', 'keys', 'mainPath', 'maxDepth',
+                   'enemies', 'optionalRooms')
+
+
+class DungeonStats:
+    """
+    Dungeon stats collect metrics over a stream of generated dungeons.
+    Per dungeon metrics, such as the number of rooms, are summarized
+    with running stats and quantiles, while per room values, such as
+    difficulty and depth, are collected into histograms. Room types and
+    enemies are counted by name.
+
+    Attributes
+    ----------
+    dungeons: int
+        The number of dungeons added.
+
+    metrics: Dict[str, MetricSummary]
+        The summary of each per dungeon metric, by name.
+
+    difficulty: Histogram
+        The difficulty of every room.
+
+    depth: Histogram
+        The depth of every room. Each bin holds a single depth.
+
+    roomDifficulty: MetricSummary
+        The summary of the difficulty of every room.
+
+    roomDepth: MetricSummary
+        The summary of the depth of every room.
+
+    roomTypes: Dict[str, int]
+        The number of rooms of each room type, by name.
+
+    enemyTypes: Dict[str, int]
+        The number of enemies of each enemy type, by name.
+    """
+
+    def __init__(self, difficultyBins: int = 20, maxDepth: int = 64,
+                 compression: int = 100) -> None:
+        """
+        Parameters
+        ----------
+        difficultyBins: int
+            The number of bins in the difficulty histogram, between 0
+            and 1.
+
+        maxDepth: int
+            The largest depth counted in the depth histogram. Deeper
+            rooms are counted as overflow.
+
+        compression: int
+            The compression of each quantile digest.
+        """
+
+        self.dungeons = 0
+        self.metrics = {name: MetricSummary(compression)
+                        for name in DUNGEON_METRICS}
+        self.difficulty = Histogram(0.0, 1.0, difficultyBins)
+        self.depth = Histogram(-0.5, maxDepth + 0.5, maxDepth + 1)
+        self.roomDifficulty = MetricSummary(compression)
+        self.roomDepth = MetricSummary(compression)
+        self.roomTypes: Dict[str, int] = {}
+        self.enemyTypes: Dict[str, int] = {}
+
+    def add(self, dungeon: Dungeon) -> None:
+        """
+        Adds the metrics of a single dungeon.
+
+        Parameters
+        ----------
+        dungeon: Dungeon
+            The dungeon to add.
+        """
+
+        self.dungeons += 1
+        required = required_rooms(dungeon)
+
+        enemies = 0
+        maxDepth = 0
+
+        for room in dungeon.rooms:
+            self.difficulty.add(room.difficulty)
+            self.roomDifficulty.add(room.difficulty)
+            self.depth.add(room.depth)
+            self.roomDepth.add(room.depth)
+
+            if room.depth > maxDepth:
+                maxDepth = room.depth
+
+            if room.type is not None:
+                name = room.type.name
+                self.roomTypes[name] = self.roomTypes.get(name, 0) + 1
+
+            for enemy in room.enemies:
+                name = enemy.name
+                self.enemyTypes[name] = self.enemyTypes.get(name, 0) + 1
+
+            enemies += len(room.enemies)
+
+        metrics = self.metrics
+        metrics['rooms'].add(len(dungeon.rooms))
+        metrics['regions'].add(dungeon.region_count())
+        metrics['keys'].add(len(dungeon.keys))
+        metrics['mainPath'].add(len(dungeon.mainPath.rooms))
+        metrics['maxDepth'].add(maxDepth)
+        metrics['enemies'].add(enemies)
+        metrics['optionalRooms'].add(len(dungeon.rooms) - len(required))
+
+    def merge(self, other: 'DungeonStats') -> None:
+        """
+        Adds the metrics of another set of dungeon stats to these stats.
+        Both must have been created with the same histogram bins.
+
+        Parameters
+        ----------
+        other: DungeonStats
+            The stats to add.
+
+        Raises
+        ------
+        GeneratorError
+            If the histograms have different bins.
+        """
+
+        self.dungeons += other.dungeons
+
+        for name, summary in other.metrics.items():
+            self.metrics[name].merge(summary)
+
+        self.difficulty.merge(other.difficulty)
+        self.depth.merge(other.depth)
+        self.roomDifficulty.merge(other.roomDifficulty)
+        self.roomDepth.merge(other.roomDepth)
+
+        for name, count in other.roomTypes.items():
+            self.roomTypes[name] = self.roomTypes.get(name, 0) + count
+
+        for name, count in other.enemyTypes.items():
+            self.enemyTypes[name] = self.enemyTypes.get(name, 0) + count
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Creates a summary report of every metric, which can be written
+        as JSON.
+
+        Returns
+        -------
+        A dictionary holding the number of dungeons, a summary of each
+        per dungeon and per room metric, the difficulty and depth
+        histograms, and the room type and enemy counts.
+        """
+
+        def histogram(h: Histogram) -> Dict[str, Any]:
+            return {'edges': h.edges(), 'counts': list(h.counts),
+                    'underflow': h.underflow, 'overflow': h.overflow}
+
+        return {
+            'dungeons': self.dungeons,
+            'metrics': {name: self.metrics[name].report()
+                        for name in DUNGEON_METRICS},
+            'rooms': {'difficulty': self.roomDifficulty.report(),
+                      'depth': self.roomDepth.report()},
+            'histograms': {'difficulty': histogram(self.difficulty),
+                           'depth': histogram(self.depth)},
+            'roomTypes': dict(sorted(self.roomTypes.items())),
+            'enemyTypes': dict(sorted(self.enemyTypes.items()))
+        }
+
+    def format_report(self) -> str:
+        """
+        Creates a short, human readable summary of the per dungeon and
+        per room metrics.
+
+        Returns
+        -------
+        The summary, with one metric per line.
+        """
+
+        lines = ['%d dungeons' % self.dungeons]
+
+        rows: List[Tuple[str, MetricSummary]] = \
+            [(name, self.metrics[name]) for name in DUNGEON_METRICS]
+        rows.append(('roomDifficulty', self.roomDifficulty))
+        rows.append(('roomDepth', self.roomDepth))
+
+        for name, summary in rows:
+            if summary.stats.count == 0:
+                continue
+
+            lines.append('  %-15s mean %8.3f  std %8.3f  p50 %8.3f  '
+                         'p99 %8.3f  max %8.3f'
+                         % (name, summary.stats.mean, summary.stats.std(),
+                            summary.digest.quantile(0.5),
+                            summary.digest.quantile(0.99),
+                            summary.stats.high))
+
+        return '\n'.join(lines)
+
@@ -0,0 +1,366 @@
+"""
+DungeonTransport is a module for passing batches of serialized dungeons
+from worker processes back to the parent process through shared memory,
+instead of pickling them through the pool's result pipe.
+
+A worker writes a batch of records, usually packed dungeons made by
+DungeonIO.pack, into a single shared memory block, and returns only a
+small SharedBatch handle naming the block. The parent opens the block
+and reads each record as a memoryview into shared memory, without
+copying it. Packed dungeons store room and enemy types as integer ids
+into the type lists of the generator config, so they can be read with
+PackedDungeon, or turned back into dungeons with the same config in the
+parent.
+
+A block is laid out as a fixed size header, followed by a table of
+record offsets, followed by the records, each starting on an 8 byte
+boundary so the columns of packed dungeons are aligned:
+
+    magic, count                    BATCH_HEADER
+    offset 0 ... offset count       count + 1 little endian uint64
+    record 0 ... record count - 1
+
+Record i starts at offset i, rounded up to the alignment, and ends at
+offset i + 1. An empty record, such as for a dungeon which failed to
+generate, has a length of 0.
+
+Ownership of a block is handed from the worker to the parent. The
+worker closes it's mapping after writing, and the parent unlinks the
+block once it is done reading, so each block must be opened exactly
+once. As a block must outlive the mapping of the worker, this module
+only supports POSIX shared memory. Blocks are left registered with the
+resource tracker of the worker, so any block the parent fails to open,
+such as when it stops early, is unlinked when the tracker shuts down.
+The parent must call share_tracker before starting its workers, so
+that they share it's tracker instead of each starting their own.
+"""
+
+from typing import Any, List, Optional, Sequence
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import os
+import struct
+
+from DunGEN import Dungeon, RoomType, EnemyType, GeneratorError
+from DungeonIO import Buffer, PackedDungeon, pack
+
+
+BATCH_HEADER = struct.Struct('<4sI')
+BATCH_MAGIC = b'DGB1'
+OFFSET = struct.Struct('<Q')
+ALIGNMENT = 8
+
+
+class SharedBatch:
+    """
+    A shared batch is a handle to a block of shared memory holding a
+    batch of records. It is small, and is sent between processes in
+    place of the records themselves.
+
+    Attributes
+    ----------
+    name: str
+        The name of the shared memory block.
+
+    count: int
+        The number of records in the batch.
+
+    size: int
+        The size of the batch within the block, in bytes. The block may
+        be larger, as it is rounded up to a whole number of pages.
+    """
+
+    __slots__ = ('name', 'count', 'size')
+
+    def __init__(self, name: str, count: int, size: int) -> None:
+        self.name = name
+        self.count = count
+        self.size = size
+
+    def open(self) -> 'SharedBatchReader':
+        """
+        Opens the batch for reading. Each batch must only be opened
+        once, by the process which received it.
+
+        Returns
+        -------
+        A reader over the records of the batch.
+
+        Raises
+        ------
+        GeneratorError
+            If the block does not contain a batch.
+        """
+
+        return SharedBatchReader(self)
+
+
+class SharedBatchReader:
+    """
+    A shared batch reader gives access to the records of a shared batch
+    without copying them. The block is unlinked when the reader is
+    closed, so all records must be released before then, such as by
+    using each record within a with statement.
+
+    Attributes
+    ----------
+    batch: SharedBatch
+        The batch being read.
+
+    memory: Optional[SharedMemory]
+        The mapped block, or None once closed.
+
+    offsets: List[int]
+        The offset of each record, and the end of the last record.
+    """
+
+    def __init__(self, batch: SharedBatch) -> None:
+        """
+        Parameters
+        ----------
+        batch: SharedBatch
+            The batch to open.
+
+        Raises
+        ------
+        GeneratorError
+            If the block does not contain a batch.
+        """
+
+        memory = SharedMemory(batch.name)
+        self.batch = batch
+        self.memory: Optional[SharedMemory] = memory
+
+        buf = memory.buf
+        assert buf is not None
+        magic, count = BATCH_HEADER.unpack_from(buf)
+
+        if magic != BATCH_MAGIC or count != batch.count:
+            self.close()
+            raise GeneratorError('Shared memory block ' + repr(batch.name)
+                                 + ' does not contain the expected batch')
+
+        start = BATCH_HEADER.size
+        self.offsets: List[int] = [
+            OFFSET.unpack_from(buf, start + i * OFFSET.size)[0]
+            for i in range(count + 1)]
+
+    def __enter__(self) -> 'SharedBatchReader':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.batch.count
+
+    def __getitem__(self, index: int) -> memoryview:
+        """
+        Gets a single record.
+
+        Parameters
+        ----------
+        index: int
+            The index of the record.
+
+        Returns
+        -------
+        A read only view of the record within shared memory. Empty
+        records are returned as an empty view.
+
+        Raises
+        ------
+        GeneratorError
+            If the reader has been closed.
+        """
+
+        if self.memory is None:
+            raise GeneratorError('Shared batch is closed')
+
+        if not 0 <= index < self.batch.count:
+            raise IndexError('record index out of range')
+
+        buf = self.memory.buf
+        assert buf is not None
+
+        start = align(self.offsets[index])
+        end = self.offsets[index + 1]
+
+        return buf[start:end].toreadonly()
+
+    def dungeon(self, index: int) -> Optional[PackedDungeon]:
+        """
+        Gets a single record as a packed dungeon.
+
+        Parameters
+        ----------
+        index: int
+            The index of the record.
+
+        Returns
+        -------
+        A packed dungeon view into shared memory, or None if the record
+        is empty.
+
+        Raises
+        ------
+        GeneratorError
+            If the record is not a packed dungeon.
+        """
+
+        record = self[index]
+        if len(record) == 0:
+            return None
+
+        return PackedDungeon(record)
+
+    def close(self) -> None:
+        """
+        Unmaps and unlinks the block. Does nothing if the reader is
+        already closed.
+
+        Raises
+        ------
+        BufferError
+            If a record returned by this reader has not been released.
+        """
+
+        if self.memory is None:
+            return
+
+        memory = self.memory
+        self.memory = None
+
+        memory.unlink()
+        memory.close()
+
+
+def align(offset: int) -> int:
+    """
+    Rounds an offset up to the record alignment.
+
+    Parameters
+    ----------
+    offset: int
+        The offset to round.
+
+    Returns
+    -------
+    The aligned offset.
+    """
+
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def share_tracker() -> None:
+    """
+    Starts the resource tracker of this process, if it is not already
+    running. Worker processes started afterwards share the tracker, so
+    blocks they create are only unlinked by it once this process, and
+    every worker, has exited.
+
+    Raises
+    ------
+    GeneratorError
+        If the platform does not support POSIX shared memory.
+    """
+
+    if os.name != 'posix':
+        raise GeneratorError('Shared batches require POSIX shared memory')
+
+    resource_tracker.ensure_running()
+
+
+def share_records(records: Sequence[Optional[Buffer]]) -> SharedBatch:
+    """
+    Writes a batch of records into a new block of shared memory. The
+    block is handed to the process the returned batch is sent to, which
+    must open it to free it, and must have called share_tracker before
+    starting this process.
+
+    Parameters
+    ----------
+    records: Sequence[Optional[Buffer]]
+        The records to write. None is written as an empty record.
+
+    Returns
+    -------
+    The handle of the new batch.
+
+    Raises
+    ------
+    GeneratorError
+        If the platform does not support POSIX shared memory.
+    """
+
+    if os.name != 'posix':
+        raise GeneratorError('Shared batches require POSIX shared memory')
+
+    count = len(records)
+    pos = BATCH_HEADER.size + (count + 1) * OFFSET.size
+    offsets = [pos]
+
+    for record in records:
+        pos = align(pos)
+        if record is not None:
+            pos += len(memoryview(record).cast('B'))
+
+        offsets.append(pos)
+
+    memory = SharedMemory(create=True, size=pos)
+
+    try:
+        buf = memory.buf
+        assert buf is not None
+        BATCH_HEADER.pack_into(buf, 0, BATCH_MAGIC, count)
+
+        start = BATCH_HEADER.size
+        for i, offset in enumerate(offsets):
+            OFFSET.pack_into(buf, start + i * OFFSET.size, offset)
+
+        for record, offset in zip(records, offsets):
+            if record is not None:
+                data = memoryview(record).cast('B')
+                start = align(offset)
+                buf[start:start + len(data)] = data
+
+    except BaseException:
+        memory.close()
+        memory.unlink()
+        raise
+
+    # The block stays registered with the resource tracker shared with
+    # the parent, so a block the parent never opens is still unlinked
+    # once the parent exits.
+    memory.close()
+    return SharedBatch(memory.name, count, pos)
+
+
+def share_dungeons(dungeons: Sequence[Optional[Dungeon]],
+                   roomTypes: Sequence[RoomType],
+                   enemyTypes: Sequence[EnemyType]) -> SharedBatch:
+    """
+    Packs a batch of dungeons into a new block of shared memory, as
+    share_records does. The dungeons can be read back in another process
+    with SharedBatchReader.dungeon, and unpacked with the same room and
+    enemy types.
+
+    Parameters
+    ----------
+    dungeons: Sequence[Optional[Dungeon]]
+        The dungeons to pack. None is written as an empty record.
+
+    roomTypes: Sequence[RoomType]
+        The room types of the config used to generate the dungeons.
+
+    enemyTypes: Sequence[EnemyType]
+        The enemy types of the config used to generate the dungeons.
+
+    Returns
+    -------
+    The handle of the new batch.
+    """
+
+    return share_records([None if dungeon is None
+                          else pack(dungeon, roomTypes, enemyTypes)
+                          for dungeon in dungeons])
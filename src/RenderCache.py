@@ -0,0 +1,406 @@
+"""
+RenderCache is a module for caching rendered dungeon images. Images are
+stored by a content address, made from the fingerprint of the dungeon
+and the painter config which was used to render it, so a dungeon which
+has already been rendered with the same settings never needs to be
+drawn again.
+"""
+
+from typing import Any, Optional, cast
+from collections import OrderedDict
+from hashlib import blake2b
+from threading import Lock
+import os
+
+
+def describe_value(value: Any) -> str:
+    """
+    Converts a render setting into a stable string representation which
+    can be used as part of a cache key. Fonts are described by their file
+    path and size. Dicts and sets are described by their sorted contents.
+
+    Parameters
+    ----------
+    value: Any
+        The value to describe.
+
+    Returns
+    -------
+    A string which is equal for equal render settings, even across
+    different processes.
+
+    Raises
+    ------
+    TypeError
+        If the value is of a type which can not be described. Such
+        settings can not be part of a cache key.
+    """
+
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return repr(value)
+
+    if isinstance(value, (tuple, list)):
+        return '(' + ','.join(describe_value(v) for v in value) + ')'
+
+    if isinstance(value, dict):
+        items = sorted(describe_value(k) + ':' + describe_value(v)
+                       for k, v in value.items())
+        return '{' + ','.join(items) + '}'
+
+    if isinstance(value, (set, frozenset)):
+        return 'set(' + ','.join(sorted(describe_value(v)
+                                        for v in value)) + ')'
+
+    if hasattr(value, 'path') and hasattr(value, 'size'):
+        return 'font(' + repr(value.path) + ',' + repr(value.size) + ')'
+
+    raise TypeError('Cannot describe render setting of type '
+                    + type(value).__qualname__)
+
+
+def describe_object(obj: Any) -> str:
+    """
+    Converts an object, such as a render layer, into a stable string
+    representation based on it's type and attributes. Attributes named
+    in the renderState of the object's class are skipped, as they hold
+    state from the last render rather than settings.
+
+    Parameters
+    ----------
+    obj: Any
+        The object to describe.
+
+    Returns
+    -------
+    A string describing the type and attributes of the object.
+
+    Raises
+    ------
+    TypeError
+        If an attribute can not be described.
+    """
+
+    skipped = getattr(type(obj), 'renderState', ())
+    attributes = sorted((name, value) for name, value in vars(obj).items()
+                        if name not in skipped)
+    values = ','.join(name + '=' + describe_value(value)
+                      for name, value in attributes)
+
+    return type(obj).__qualname__ + '{' + values + '}'
+
+
+def cache_key(*parts: str) -> str:
+    """
+    Combines a set of fingerprints into a single cache key.
+
+    Parameters
+    ----------
+    parts: str
+        The fingerprints to combine.
+
+    Returns
+    -------
+    A hex string to use as a cache key.
+    """
+
+    h = blake2b(digest_size=20)
+
+    for part in parts:
+        h.update(part.encode())
+        h.update(b'\0')
+
+    return h.hexdigest()
+
+
+class RenderCache:
+    """
+    A two tiered, least recently used cache for encoded dungeon images.
+    Recently used images are kept in memory, while all cached images are
+    also written to disk, if a cache directory is provided, so they can
+    be shared between runs. Both tiers are size capped, and the least
+    recently used images are evicted first. A cache may be shared by
+    several threads, such as the executor threads of the async renderer.
+
+    Attributes
+    ----------
+    memoryLimit: int
+        The maximum number of bytes of image data to hold in memory.
+
+    directory: Optional[str]
+        The directory to store cached images in. If None, only the
+        memory tier is used.
+
+    diskLimit: int
+        The maximum number of bytes of image data to store within the
+        cache directory.
+
+    hits: int
+        The number of lookups which found a cached image.
+
+    misses: int
+        The number of lookups which did not find a cached image.
+    """
+
+    def __init__(self, directory: Optional[str] = None,
+                 memoryLimit: int = 64 * 1024 * 1024,
+                 diskLimit: int = 1024 * 1024 * 1024) -> None:
+        """
+        Parameters
+        ----------
+        directory: Optional[str]
+            The directory to store cached images in. The directory is
+            created if it does not exist. If None, only the memory tier
+            is used.
+
+        memoryLimit: int
+            The maximum number of bytes of image data to hold in memory.
+
+        diskLimit: int
+            The maximum number of bytes of image data to store within
+            the cache directory.
+        """
+
+        self.memoryLimit = memoryLimit
+        self.directory = directory
+        self.diskLimit = diskLimit
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = Lock()
+        self.memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.memorySize = 0
+
+        self.disk: Optional['OrderedDict[str, int]'] = None
+        self.diskSize = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Looks up a cached image. The memory tier is checked first,
+        followed by the disk tier. Images found on disk are promoted to
+        the memory tier.
+
+        Parameters
+        ----------
+        key: str
+            The cache key of the image.
+
+        Returns
+        -------
+        The encoded image, or None if the image is not cached.
+        """
+
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return data
+
+            data = self.read_disk(key)
+            if data is None:
+                self.misses += 1
+                return None
+
+            self.store_memory(key, data)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """
+        Adds an image to the cache, evicting the least recently used
+        images from each tier as needed.
+
+        Parameters
+        ----------
+        key: str
+            The cache key of the image.
+
+        data: bytes
+            The encoded image.
+        """
+
+        with self.lock:
+            self.store_memory(key, data)
+            self.write_disk(key, data)
+
+    def clear(self) -> None:
+        """
+        Removes all images from both tiers of the cache.
+        """
+
+        with self.lock:
+            self.memory.clear()
+            self.memorySize = 0
+
+            for key in list(self.disk_index()):
+                self.remove_disk(key)
+
+    def store_memory(self, key: str, data: bytes) -> None:
+        """
+        Internal function for adding an image to the memory tier.
+
+        Parameters
+        ----------
+        key: str
+            The cache key of the image.
+
+        data: bytes
+            The encoded image.
+        """
+
+        if len(data) > self.memoryLimit:
+            return
+
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memorySize -= len(old)
+
+        self.memory[key] = data
+        self.memorySize += len(data)
+
+        while self.memorySize > self.memoryLimit:
+            _, evicted = self.memory.popitem(last=False)
+            self.memorySize -= len(evicted)
+
+    def disk_path(self, key: str) -> str:
+        """
+        Gets the file path of a cached image on disk.
+
+        Parameters
+        ----------
+        key: str
+            The cache key of the image.
+
+        Returns
+        -------
+        The file path to store the image at.
+        """
+
+        return os.path.join(cast(str, self.directory), key + '.img')
+
+    def disk_index(self) -> 'OrderedDict[str, int]':
+        """
+        Gets the index of images stored on disk, ordered from least to
+        most recently used. The index is built from the cache directory
+        the first time it is needed.
+
+        Returns
+        -------
+        An ordered mapping of cache keys to file sizes.
+        """
+
+        if self.disk is not None:
+            return self.disk
+
+        self.disk = OrderedDict()
+        self.diskSize = 0
+
+        if self.directory is None:
+            return self.disk
+
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.img'):
+                continue
+
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+
+        for _, key, size in sorted(files):
+            self.disk[key] = size
+            self.diskSize += size
+
+        return self.disk
+
+    def read_disk(self, key: str) -> Optional[bytes]:
+        """
+        Internal function for reading an image from the disk tier. The
+        modification time of the file is updated to mark it as recently
+        used.
+
+        Parameters
+        ----------
+        key: str
+            The cache key of the image.
+
+        Returns
+        -------
+        The encoded image, or None if it is not stored on disk.
+        """
+
+        if self.directory is None:
+            return None
+
+        index = self.disk_index()
+        if key not in index:
+            return None
+
+        path = self.disk_path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            os.utime(path)
+
+        except OSError:
+            self.diskSize -= index.pop(key)
+            return None
+
+        index.move_to_end(key)
+        return data
+
+    def write_disk(self, key: str, data: bytes) -> None:
+        """
+        Internal function for writing an image to the disk tier. Files
+        are written atomically, so an interrupted write never leaves a
+        partial image in the cache.
+
+        Parameters
+        ----------
+        key: str
+            The cache key of the image.
+
+        data: bytes
+            The encoded image.
+        """
+
+        if self.directory is None or len(data) > self.diskLimit:
+            return
+
+        index = self.disk_index()
+        if key in index:
+            self.diskSize -= index.pop(key)
+
+        path = self.disk_path(key)
+        temp = path + '.' + str(os.getpid()) + '.tmp'
+        with open(temp, 'wb') as file:
+            file.write(data)
+        os.replace(temp, path)
+
+        index[key] = len(data)
+        self.diskSize += len(data)
+
+        while self.diskSize > self.diskLimit:
+            evicted = next(iter(index))
+            self.remove_disk(evicted)
+
+    def remove_disk(self, key: str) -> None:
+        """
+        Internal function for removing an image from the disk tier.
+
+        Parameters
+        ----------
+        key: str
+            The cache key of the image.
+        """
+
+        index = self.disk_index()
+        self.diskSize -= index.pop(key, 0)
+
+        try:
+            os.remove(self.disk_path(key))
+        except FileNotFoundError:
+            pass
+
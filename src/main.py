@@ -1,14 +1,25 @@
-from PIL import ImageFont  # type: ignore
+from typing import BinaryIO, Dict, List, Optional, Tuple, TYPE_CHECKING
+from math import log, exp
+import argparse
+import json
+import struct
 import sys
 import os
-import subprocess
-import DungeonPainter
+import time
+import DungeonIO
+from DungeonArchive import DungeonArchive
 import DunGEN
-from DunGEN import GeneratorConfig, RoomType
-from DungeonPainter import PainterConfig
+from DunGEN import GeneratorConfig, CompiledConfig, RoomType, Dungeon, \
+    FilterStats
+from DungeonStats import DungeonStats, required_rooms
 
 import BasicDungeonDesign
 
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from DungeonPainter import PainterConfig
+    from DungeonTransport import SharedBatch
+
 
 BACKGROUND_COLOR = (13, 13, 13)
 WALL_COLOR = (77, 77, 77)
@@ -16,10 +27,19 @@ ROOM_NUMBER_COLOR = (48, 48, 48)
 LOCKED_DOOR_COLOR = (96, 0, 0)
 KEY_COLOR = (128, 96, 0)
 PATH_COLOR = (76, 76, 0)
-ROOM_NUMBER_FONT = ImageFont.truetype('Seagram tfb.ttf', 16)
+ROOM_NUMBER_FONT = 'Seagram tfb.ttf'
+ROOM_NUMBER_FONT_SIZE = 16
+
+# Modules which must never be imported just to generate dungeons.
+RENDER_MODULES = ('PIL', 'DungeonPainter')
+
+# Modules which are only needed to generate dungeons in bulk.
+BULK_MODULES = ('concurrent', 'multiprocessing', 'DungeonTransport')
 
 
 def open_image(filename: str) -> None:
+    import subprocess
+
     if sys.platform.startswith('linux'):
         open_cmd = 'xdg-open'
     if sys.platform.startswith('win32'):
@@ -31,25 +51,123 @@ def open_image(filename: str) -> None:
     subprocess.run([open_cmd, filename], check=True)
 
 
-def get_dungeon_config() -> GeneratorConfig:
+def get_dungeon_config(teams: bool = False) -> GeneratorConfig:
     dungeonConfig = GeneratorConfig()
 
     dungeonConfig.roomTypes = BasicDungeonDesign.get_room_types()
     dungeonConfig.enemyTypes = BasicDungeonDesign.get_enemy_types()
 
+    enemies: DunGEN.EnemiesLayer
+    if teams:
+        enemies = DunGEN.TeamEnemiesLayer(
+            dungeonConfig.enemyTypes, BasicDungeonDesign.get_enemy_teams())
+    else:
+        enemies = DunGEN.EnemiesLayer(dungeonConfig.enemyTypes)
+
     dungeonConfig.layers = [
         DunGEN.BranchingPathLayer((15, 30), (1, 4), 4, 12),
         DunGEN.AssignRegionsLayer(),
         DunGEN.AssignDifficultiesLayer(2/3, 0.05, 0.1),
         DunGEN.AssignRoomTypes(dungeonConfig.roomTypes),
-        DunGEN.EnemiesLayer(dungeonConfig.enemyTypes)
+        enemies
     ]
 
     return dungeonConfig
 
 
-def get_painter_config() -> PainterConfig:
-    painterConfig = PainterConfig()
+def get_team_dungeon_config() -> GeneratorConfig:
+    return get_dungeon_config(teams=True)
+
+
+def count_turns(dungeon: Dungeon) -> int:
+    """
+    Counts the number of times the main path of a dungeon changes
+    direction.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to check.
+
+    Returns
+    -------
+    The number of turns along the main path.
+    """
+
+    rooms = dungeon.mainPath.rooms
+    turns = 0
+
+    for i in range(2, len(rooms)):
+        if rooms[i - 2].direction_to(rooms[i - 1]) \
+                != rooms[i - 1].direction_to(rooms[i]):
+            turns += 1
+
+    return turns
+
+
+def optional_fraction(dungeon: Dungeon) -> float:
+    """
+    Calculates the fraction of rooms in a dungeon which are optional.
+
+    Parameters
+    ----------
+    dungeon: Dungeon
+        The dungeon to check.
+
+    Returns
+    -------
+    The fraction of optional rooms, between 0 and 1.
+    """
+
+    if len(dungeon.rooms) == 0:
+        return 0.0
+
+    return 1 - len(required_rooms(dungeon)) / len(dungeon.rooms)
+
+
+def add_quality_filters(config: GeneratorConfig, minRegions: int,
+                        minTurns: int, maxOptional: float) -> None:
+    """
+    Adds filters which reject dungeons of low quality to a config. Each
+    filter is placed directly after the layer it depends on, so rejected
+    dungeons skip the remaining layers. Filters which are disabled are
+    not added.
+
+    Parameters
+    ----------
+    config: GeneratorConfig
+        The config to add the filters to.
+
+    minRegions: int
+        The minimum number of regions, or 0 to disable.
+
+    minTurns: int
+        The minimum number of turns along the main path, or 0 to
+        disable.
+
+    maxOptional: float
+        The maximum fraction of optional rooms, or 1 to disable.
+    """
+
+    if minTurns > 0:
+        config.add_filter(lambda d: count_turns(d) >= minTurns,
+                          'min-turns', DunGEN.BranchingPathLayer)
+
+    if maxOptional < 1:
+        config.add_filter(lambda d: optional_fraction(d) <= maxOptional,
+                          'max-optional', DunGEN.BranchingPathLayer)
+
+    if minRegions > 0:
+        config.add_filter(lambda d: d.region_count() >= minRegions,
+                          'min-regions', DunGEN.AssignRegionsLayer)
+
+
+def get_painter_config() -> 'PainterConfig':
+    import DungeonPainter
+
+    font = DungeonPainter.load_font(ROOM_NUMBER_FONT, ROOM_NUMBER_FONT_SIZE)
+
+    painterConfig = DungeonPainter.PainterConfig()
     painterConfig.layeredImage = True
 
     painterConfig.layers = [
@@ -57,20 +175,722 @@ def get_painter_config() -> PainterConfig:
         DungeonPainter.RegionLayer(),
         DungeonPainter.DifficultyLayer(),
         DungeonPainter.WallsLayer(32, WALL_COLOR, LOCKED_DOOR_COLOR),
-        DungeonPainter.RoomNumbersLayer(ROOM_NUMBER_FONT, ROOM_NUMBER_COLOR),
+        DungeonPainter.RoomNumbersLayer(font, ROOM_NUMBER_COLOR),
         DungeonPainter.PathLayer(PATH_COLOR),
         DungeonPainter.KeysLayer(KEY_COLOR, 8),
-        DungeonPainter.RoomTypeLayer(ROOM_NUMBER_FONT, ROOM_NUMBER_COLOR)
+        DungeonPainter.RoomTypeLayer(font, ROOM_NUMBER_COLOR)
     ]
 
     return painterConfig
 
 
-if __name__ == '__main__':
+class LatencyHistogram:
+    """
+    A fixed size histogram of latencies with logarithmic bins, used to
+    estimate latency percentiles over any number of samples with
+    constant memory. Each bin is about 2% wider than the last, which
+    bounds the relative error of each percentile.
+    """
+
+    def __init__(self, low: float = 1e-5, high: float = 1e3,
+                 growth: float = 1.02) -> None:
+        """
+        Parameters
+        ----------
+        low: float
+            The smallest latency, in seconds, with it's own bin.
+
+        high: float
+            The largest latency, in seconds, with it's own bin.
+
+        growth: float
+            The ratio between the bounds of each bin.
+        """
+
+        self.low = low
+        self.scale = log(growth)
+        self.bins = [0] * (int(log(high / low) / self.scale) + 2)
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """
+        Adds a latency sample.
+
+        Parameters
+        ----------
+        value: float
+            The latency, in seconds.
+        """
+
+        index = 0
+        if value > self.low:
+            index = min(len(self.bins) - 1,
+                        int(log(value / self.low) / self.scale) + 1)
+
+        self.bins[index] += 1
+        self.count += 1
+
+    def percentile(self, p: float) -> float:
+        """
+        Estimates a latency percentile.
+
+        Parameters
+        ----------
+        p: float
+            The percentile, between 0 and 100.
+
+        Returns
+        -------
+        The estimated latency, in seconds, or 0 if no samples have been
+        added.
+        """
+
+        if self.count == 0:
+            return 0.0
+
+        target = p / 100 * (self.count - 1)
+        seen = 0
+        for index, count in enumerate(self.bins):
+            seen += count
+            if seen > target:
+                if index == 0:
+                    return self.low
+
+                return self.low * exp((index - 0.5) * self.scale)
+
+        return self.low * exp((len(self.bins) - 1) * self.scale)
+
+
+WorkerResult = Tuple[int, Optional[bytes], float, Optional[str]]
+QualityFilters = Tuple[int, int, float]
+BatchResult = Tuple[List[WorkerResult], FilterStats, Optional[DungeonStats],
+                    Optional['SharedBatch']]
+
+workerConfig: Optional[CompiledConfig] = None
+workerFormat = 'jsonl'
+workerRender: Optional[str] = None
+workerRetries = 0
+workerSeedStep = 1
+workerStats = False
+workerShared = False
+
+
+def init_worker(outputFormat: str, renderDir: Optional[str],
+                filters: QualityFilters = (0, 0, 1.0), retries: int = 0,
+                seedStep: int = 1, collectStats: bool = False,
+                shared: bool = False, teams: bool = False) -> None:
+    """
+    Prepares a process for generating dungeons. The generator config is
+    built and compiled once per process and reused for every dungeon.
+
+    Parameters
+    ----------
+    outputFormat: str
+        The format to serialize dungeons in, either 'jsonl', 'binary'
+        or 'archive'.
+
+    renderDir: Optional[str]
+        If set, the directory to render an image of each dungeon into.
+
+    filters: QualityFilters
+        The minimum regions, minimum turns and maximum optional fraction
+        to filter dungeons with, as passed to add_quality_filters.
+
+    retries: int
+        The number of other seeds to try when a dungeon is rejected.
+
+    seedStep: int
+        The amount to increase the seed by for each retry.
+
+    collectStats: bool
+        If true, dungeon stats are collected for each batch.
+
+    shared: bool
+        If true, the serialized dungeons of each batch are returned in
+        shared memory, rather than pickled with the results.
+
+    teams: bool
+        If true, enemies are placed in teams, as by TeamEnemiesLayer.
+    """
+
+    global workerConfig, workerFormat, workerRender, workerRetries, \
+        workerSeedStep, workerStats, workerShared
+
+    config = get_dungeon_config(teams)
+    add_quality_filters(config, *filters)
+
+    workerConfig = config.compile()
+    workerFormat = outputFormat
+    workerRender = renderDir
+    workerRetries = retries
+    workerSeedStep = seedStep
+    workerStats = collectStats
+    workerShared = shared
+
+
+def generate_seeds(seeds: List[int]) -> BatchResult:
+    """
+    Generates a batch of dungeons within a worker process.
+
+    Parameters
+    ----------
+    seeds: List[int]
+        The seeds of the dungeons to generate.
+
+    Returns
+    -------
+    A list containing the seed, serialized dungeon, latency in seconds,
+    and error name of each dungeon, the filter stats of the batch, the
+    dungeon stats of the batch, if enabled, and the shared memory batch
+    holding the serialized dungeons, if enabled. If generation failed,
+    the dungeon is None and the error name is set. If the dungeons are
+    shared, every dungeon in the results is None, and successful
+    dungeons are read from the shared batch at the same index instead.
+    The seed is the requested seed, even if the dungeon was accepted
+    after retrying with another seed.
+    """
+
+    config = workerConfig
+    assert config is not None
+
+    stats = FilterStats()
+    dungeonStats = DungeonStats() if workerStats else None
+    results: List[WorkerResult] = []
+    for seed in seeds:
+        start = time.perf_counter()
+
+        try:
+            dungeon = DunGEN.gen_map(config, seed, workerRetries, stats,
+                                     workerSeedStep)
+
+            if workerRender is not None:
+                import DungeonPainter
+
+                painterConfig = get_painter_config()
+                painterConfig.imageName = os.path.join(
+                    workerRender, 'dungeon-' + str(seed) + '.tiff')
+                DungeonPainter.create_image(dungeon, painterConfig)
+
+        except Exception as e:
+            results.append((seed, None, time.perf_counter() - start,
+                            type(e).__name__))
+            continue
+
+        if dungeonStats is not None:
+            dungeonStats.add(dungeon)
+
+        if workerFormat in ('binary', 'archive'):
+            data = DungeonIO.pack(dungeon, config.roomTypes,
+                                  config.enemyTypes)
+        else:
+            data = (json.dumps(DungeonIO.to_dict(dungeon, config.roomTypes,
+                                                 config.enemyTypes),
+                               separators=(',', ':')) + '\n').encode()
+
+        results.append((seed, data, time.perf_counter() - start, None))
+
+    if not workerShared:
+        return results, stats, dungeonStats, None
+
+    from DungeonTransport import share_records
+
+    shared = share_records([data for _, data, _, _ in results])
+    results = [(seed, None, seconds, error)
+               for seed, _, seconds, error in results]
+
+    return results, stats, dungeonStats, shared
+
+
+class ShardWriter:
+    """
+    Writes serialized dungeons to stdout or to a set of shard files, as
+    soon as they are generated. Dungeons are assigned to a shard by
+    their seed. Binary records are prefixed with their length. In the
+    archive format, each shard is a dungeon archive instead.
+    """
+
+    def __init__(self, output: Optional[str], shards: int,
+                 outputFormat: str) -> None:
+        """
+        Parameters
+        ----------
+        output: Optional[str]
+            The output file name, or None to write to stdout. If there
+            is more than one shard, the shard number is added to the
+            file name.
+
+        shards: int
+            The number of files to split the output between.
+
+        outputFormat: str
+            The output format, either 'jsonl', 'binary' or 'archive'.
+            Archives can not be written to stdout, and are appended to
+            if they already exist.
+        """
+
+        self.binary = outputFormat == 'binary'
+        self.files: List[BinaryIO] = []
+        self.archives: List[DungeonArchive] = []
+
+        if output is None:
+            self.files.append(sys.stdout.buffer)
+            return
+
+        if shards == 1:
+            names = [output]
+        else:
+            name, ext = os.path.splitext(output)
+            names = [name + '-' + str(i).zfill(5) + ext
+                     for i in range(shards)]
+
+        for path in names:
+            if outputFormat == 'archive':
+                self.archives.append(DungeonArchive(path, 'a'))
+            else:
+                self.files.append(open(path, 'wb'))
+
+    def write(self, seed: int, data: DungeonIO.Buffer) -> None:
+        """
+        Writes a single serialized dungeon.
+
+        Parameters
+        ----------
+        seed: int
+            The seed of the dungeon.
+
+        data: DungeonIO.Buffer
+            The serialized dungeon.
+        """
+
+        if len(self.archives) > 0:
+            self.archives[seed % len(self.archives)].append_packed(data)
+            return
+
+        file = self.files[seed % len(self.files)]
+
+        if self.binary:
+            file.write(struct.pack('<I', len(data)))
 
-    dungeonConfig = get_dungeon_config()
-    dungeon = DunGEN.gen_map(dungeonConfig)
+        file.write(data)
+
+    def close(self) -> None:
+        """
+        Flushes all output and closes any opened shard files.
+        """
+
+        for file in self.files:
+            if file is sys.stdout.buffer:
+                file.flush()
+            else:
+                file.close()
+
+        for archive in self.archives:
+            archive.close()
+
+
+def generate_command(args: argparse.Namespace) -> None:
+    """
+    Generates a range of seeded dungeons and streams them to the output
+    as they complete. Only a small, fixed number of batches are in
+    flight at once, so memory use does not grow with the number of
+    dungeons. A throughput summary is printed to stderr, along with the
+    acceptance rate of the quality filters, if any are enabled. If
+    requested, a report of dungeon stats is written as JSON.
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        The parsed command line arguments.
+    """
+
+    # The process pool and shared memory modules are slow to import, so
+    # they are only loaded when generating in bulk.
+    from concurrent.futures import ProcessPoolExecutor, wait, \
+        FIRST_COMPLETED
+    from DungeonTransport import share_tracker
+
+    if args.render is not None:
+        os.makedirs(args.render, exist_ok=True)
+
+    writer = ShardWriter(args.output, args.shards, args.format)
+    latency = LatencyHistogram()
+    errors: Dict[str, int] = {}
+    filterStats = FilterStats()
+    dungeonStats = DungeonStats() if args.stats is not None else None
+
+    filters = (args.min_regions, args.min_turns, args.max_optional)
+    initargs = (args.format, args.render, filters, args.retries, args.count,
+                dungeonStats is not None, args.transport == 'shm',
+                args.teams)
+
+    def handle(batch: BatchResult) -> None:
+        results, stats, batchStats, shared = batch
+
+        # The shared block is opened first, so it is freed even if
+        # writing the batch fails part way through.
+        reader = shared.open() if shared is not None else None
+
+        try:
+            filterStats.merge(stats)
+
+            if dungeonStats is not None and batchStats is not None:
+                dungeonStats.merge(batchStats)
+
+            for i, (seed, data, seconds, error) in enumerate(results):
+                latency.add(seconds)
+
+                if error is not None:
+                    errors[error] = errors.get(error, 0) + 1
+                elif data is not None:
+                    writer.write(seed, data)
+                elif reader is not None:
+                    with reader[i] as record:
+                        writer.write(seed, record)
+
+        finally:
+            if reader is not None:
+                reader.close()
+
+    def discard(future: 'Future[BatchResult]') -> None:
+        if future.cancel():
+            return
+
+        try:
+            shared = future.result()[3]
+        except Exception:
+            return
+
+        if shared is not None:
+            shared.open().close()
+
+    end = args.seed + args.count
+    batches = (list(range(s, min(end, s + args.batch)))
+               for s in range(args.seed, end, args.batch))
+
+    start = time.perf_counter()
+
+    if args.workers <= 1:
+        # Shared memory is only worth using between processes.
+        init_worker(args.format, args.render, filters, args.retries,
+                    args.count, dungeonStats is not None, shared=False,
+                    teams=args.teams)
+        for batch in batches:
+            handle(generate_seeds(batch))
+
+    else:
+        if args.transport == 'shm':
+            share_tracker()
+
+        with ProcessPoolExecutor(args.workers, initializer=init_worker,
+                                 initargs=initargs) as pool:
+            pending: 'set[Future[BatchResult]]' = set()
+
+            # If writing stops early, such as when stdout is closed, the
+            # batches still in flight are cancelled or their shared
+            # blocks freed, rather than left until the process exits.
+            try:
+                for batch in batches:
+                    if len(pending) >= args.workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pending.remove(future)
+                            handle(future.result())
+
+                    pending.add(pool.submit(generate_seeds, batch))
+
+                while len(pending) > 0:
+                    handle(pending.pop().result())
+
+            finally:
+                for future in pending:
+                    discard(future)
+
+    writer.close()
+    elapsed = time.perf_counter() - start
+
+    failed = sum(errors.values())
+    rate = args.count / elapsed if elapsed > 0 else 0.0
+
+    print('Generated %d dungeons in %.2fs (%.1f maps/s), %d failed'
+          % (args.count - failed, elapsed, rate, failed), file=sys.stderr)
+    print('Latency p50 %.2fms, p99 %.2fms'
+          % (latency.percentile(50) * 1000, latency.percentile(99) * 1000),
+          file=sys.stderr)
+
+    for name, count in sorted(errors.items()):
+        print('  %s: %d' % (name, count), file=sys.stderr)
+
+    if filterStats.rejected:
+        print('Filters accepted %.1f%% of %d attempts, %.2fs spent on '
+              'rejected maps, ~%.2fs saved by rejecting early'
+              % (filterStats.acceptance_rate() * 100,
+                 filterStats.attempts(), filterStats.rejectedTime,
+                 filterStats.time_saved()), file=sys.stderr)
+
+        for name, count in sorted(filterStats.rejected.items()):
+            print('  %s: %d rejected' % (name, count), file=sys.stderr)
+
+    if dungeonStats is not None:
+        print(dungeonStats.format_report(), file=sys.stderr)
+
+        with open(args.stats, 'w') as file:
+            json.dump(dungeonStats.report(), file, indent=2)
+
+
+def preview_command(args: argparse.Namespace) -> None:
+    """
+    Generates a single dungeon, renders it, and opens the image.
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        The parsed command line arguments.
+    """
+
+    import DungeonPainter
+
+    dungeonConfig = get_dungeon_config(args.teams)
+    dungeon = DunGEN.gen_map(dungeonConfig, args.seed)
 
     painterConfig = get_painter_config()
     DungeonPainter.create_image(dungeon, painterConfig)
-    open_image('Dungeon.tiff')
+    open_image(painterConfig.imageName)
+
+
+def serve_command(args: argparse.Namespace) -> None:
+    """
+    Runs a generation server until interrupted.
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        The parsed command line arguments.
+    """
+
+    import asyncio
+    from DungeonServer import GenerationServer
+
+    registry = {'basic': (get_dungeon_config, get_painter_config),
+                'teams': (get_team_dungeon_config, get_painter_config)}
+
+    async def serve() -> None:
+        server = GenerationServer(registry, args.workers, args.batch,
+                                  args.delay / 1000, args.queue)
+        await server.start()
+
+        if args.socket is not None:
+            await server.listen_unix(args.socket)
+            print('Listening on ' + args.socket, file=sys.stderr)
+
+        if args.port is not None:
+            await server.listen_tcp(args.host, args.port)
+            print('Listening on %s:%d' % (args.host, args.port),
+                  file=sys.stderr)
+
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def measure_imports() -> List[Tuple[int, str]]:
+    """
+    Measures the import time of the generator in a fresh interpreter,
+    using "python -X importtime".
+
+    Returns
+    -------
+    The time spent importing each module, excluding it's own imports,
+    in microseconds, along with the module name.
+    """
+
+    import subprocess
+
+    code = 'import main, DunGEN, DungeonIO, BasicDungeonDesign; ' \
+        'main.get_dungeon_config()'
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stderr=subprocess.PIPE, text=True, check=True)
+
+    modules: List[Tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        selfTime, _, name = line[len('import time:'):].split('|', 2)
+        modules.append((int(selfTime), name.strip()))
+
+    return modules
+
+
+def leaked_modules(modules: List[Tuple[int, str]]) -> List[str]:
+    """
+    Finds the rendering and bulk generation modules within a list of
+    imported modules, as returned by measure_imports.
+
+    Parameters
+    ----------
+    modules: List[Tuple[int, str]]
+        The imported modules.
+
+    Returns
+    -------
+    The sorted names of the modules which should not have been imported.
+    """
+
+    return sorted({name for _, name in modules
+                   if name.split('.')[0] in RENDER_MODULES + BULK_MODULES})
+
+
+def importtime_command(args: argparse.Namespace) -> None:
+    """
+    Measures the import time of the generator in a fresh interpreter,
+    and prints the slowest modules. Exits with an error if any rendering
+    module, such as Pillow, or any module only needed for bulk
+    generation, such as multiprocessing, is imported, since those slow
+    down cold starts.
+
+    Parameters
+    ----------
+    args: argparse.Namespace
+        The parsed command line arguments.
+    """
+
+    modules = measure_imports()
+
+    total = sum(us for us, _ in modules)
+    print('Imported %d modules in %.1fms' % (len(modules), total / 1000))
+
+    for us, name in sorted(modules, reverse=True)[:args.top]:
+        print('  %8.1fms  %s' % (us / 1000, name))
+
+    leaked = leaked_modules(modules)
+
+    if leaked:
+        print('Slow modules imported by the generator: '
+              + ', '.join(leaked), file=sys.stderr)
+        sys.exit(1)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+    Parameters
+    ----------
+    argv: List[str]
+        The command line arguments, without the program name.
+
+    Returns
+    -------
+    The parsed arguments.
+    """
+
+    parser = argparse.ArgumentParser(description='Generate dungeons.')
+    commands = parser.add_subparsers(dest='command')
+
+    preview = commands.add_parser(
+        'preview', help='generate, render and open a single dungeon')
+    preview.add_argument('--seed', type=int, default=None,
+                         help='the seed to generate the dungeon with')
+    preview.add_argument('--teams', action='store_true',
+                         help='place enemies in teams')
+
+    generate = commands.add_parser(
+        'generate', help='generate many dungeons from a range of seeds')
+    generate.add_argument('-n', '--count', type=int, default=1,
+                          help='the number of dungeons to generate')
+    generate.add_argument('-s', '--seed', type=int, default=0,
+                          help='the first seed of the range')
+    generate.add_argument('-w', '--workers', type=int,
+                          default=os.cpu_count() or 1,
+                          help='the number of worker processes')
+    generate.add_argument('-f', '--format',
+                          choices=['jsonl', 'binary', 'archive'],
+                          default='jsonl', help='the output format')
+    generate.add_argument('-o', '--output', default=None,
+                          help='the output file, or stdout if not set')
+    generate.add_argument('--shards', type=int, default=1,
+                          help='the number of files to split output into')
+    generate.add_argument('--batch', type=int, default=16,
+                          help='the number of dungeons per worker task')
+    generate.add_argument('--render', metavar='DIR', default=None,
+                          help='also render each dungeon into this folder')
+    generate.add_argument('--retries', type=int, default=0,
+                          help='seeds to try when a dungeon is rejected')
+    generate.add_argument('--min-regions', type=int, default=0,
+                          help='reject dungeons with fewer regions')
+    generate.add_argument('--min-turns', type=int, default=0,
+                          help='reject dungeons whose main path turns '
+                          'fewer times')
+    generate.add_argument('--max-optional', type=float, default=1.0,
+                          metavar='FRACTION',
+                          help='reject dungeons with a larger fraction '
+                          'of optional rooms')
+    generate.add_argument('--stats', metavar='FILE', default=None,
+                          help='write a JSON report of dungeon stats')
+    generate.add_argument('--transport', choices=['pickle', 'shm'],
+                          default='pickle',
+                          help='how workers return dungeons to the parent')
+    generate.add_argument('--teams', action='store_true',
+                          help='place enemies in teams')
+
+    serve = commands.add_parser(
+        'serve', help='run a generation server with warm worker processes')
+    serve.add_argument('--socket', default=None,
+                       help='the Unix socket to listen on')
+    serve.add_argument('--host', default='127.0.0.1',
+                       help='the address to listen on')
+    serve.add_argument('--port', type=int, default=None,
+                       help='the TCP port to listen on')
+    serve.add_argument('-w', '--workers', type=int,
+                       default=os.cpu_count() or 1,
+                       help='the number of worker processes')
+    serve.add_argument('--batch', type=int, default=16,
+                       help='the maximum number of requests per worker task')
+    serve.add_argument('--delay', type=float, default=2,
+                       help='milliseconds to wait for a batch to fill up')
+    serve.add_argument('--queue', type=int, default=1024,
+                       help='the maximum number of queued requests')
+
+    importtime = commands.add_parser(
+        'importtime', help='check that the generator imports quickly')
+    importtime.add_argument('--top', type=int, default=10,
+                            help='the number of slowest modules to list')
+
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        args = parser.parse_args(['preview'] + argv)
+
+    if args.command == 'serve' and args.socket is None and args.port is None:
+        parser.error('serve requires --socket or --port')
+
+    if args.command == 'generate' and args.format == 'archive' \
+            and args.output is None:
+        parser.error('the archive format requires --output')
+
+    return args
+
+
+def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+
+    if args.command == 'generate':
+        generate_command(args)
+    elif args.command == 'serve':
+        serve_command(args)
+    elif args.command == 'importtime':
+        importtime_command(args)
+    else:
+        preview_command(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
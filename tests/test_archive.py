@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+from DungeonArchive import DungeonArchive  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class DungeonArchiveTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = main.get_dungeon_config().compile()
+        self.dungeons = {}
+
+        for seed in range(12):
+            try:
+                self.dungeons[seed] = DunGEN.gen_map(self.config, seed)
+            except ZeroDivisionError:
+                continue
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'dungeons.dga')
+
+        with DungeonArchive(self.path, 'a') as archive:
+            for dungeon in self.dungeons.values():
+                archive.append(dungeon, self.config.roomTypes,
+                               self.config.enemyTypes)
+
+    def describe(self, dungeon: DunGEN.Dungeon) -> dict:
+        return DungeonIO.to_dict(dungeon, self.config.roomTypes,
+                                 self.config.enemyTypes)
+
+    def test_round_trip_by_seed(self) -> None:
+        with DungeonArchive(self.path) as archive:
+            self.assertEqual(len(archive), len(self.dungeons))
+            self.assertIsNone(archive.get(1000))
+
+            for seed, dungeon in self.dungeons.items():
+                packed = archive.get(seed)
+                self.assertIsNotNone(packed)
+
+                unpacked = packed.to_dungeon(self.config.roomTypes,
+                                             self.config.enemyTypes)
+                self.assertEqual(unpacked.seed, seed)
+                self.assertEqual(self.describe(unpacked),
+                                 self.describe(dungeon))
+                del packed
+
+    def test_select_reads_matching_entries(self) -> None:
+        regions = sorted(max(room.region for room in dungeon.rooms) + 1
+                         for dungeon in self.dungeons.values())
+        threshold = regions[len(regions) // 2]
+
+        expected = [seed for seed, dungeon in self.dungeons.items()
+                    if max(room.region for room in dungeon.rooms) + 1
+                    >= threshold]
+
+        with DungeonArchive(self.path) as archive:
+            selected = [packed.seed for packed in archive.select(
+                lambda entry: entry.regionCount >= threshold)]
+
+        self.assertEqual(selected, expected)
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_index_array_matches_entries(self) -> None:
+        with DungeonArchive(self.path) as archive:
+            entries = archive.index_array()
+            self.assertEqual(entries['seed'].tolist(),
+                             list(self.dungeons))
+            self.assertEqual(entries['roomCount'].tolist(),
+                             [len(dungeon.rooms)
+                              for dungeon in self.dungeons.values()])
+            del entries
+
+    def test_append_after_read(self) -> None:
+        dungeon = next(iter(self.dungeons.values()))
+
+        with DungeonArchive(self.path, 'a') as archive:
+            self.assertEqual(archive.entry(-1).seed, list(self.dungeons)[-1])
+
+            index = archive.append(dungeon, self.config.roomTypes,
+                                   self.config.enemyTypes)
+            self.assertEqual(index, len(self.dungeons))
+            self.assertEqual(archive.entry(-1).seed, dungeon.seed)
+            self.assertEqual(len(list(archive.entries())),
+                             len(self.dungeons) + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+from DungeonAsync import gen_map_async  # noqa: E402
+
+
+class GenMapAsyncTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = main.get_dungeon_config().compile()
+
+    def describe(self, dungeon: DunGEN.Dungeon) -> dict:
+        return DungeonIO.to_dict(dungeon, self.config.roomTypes,
+                                 self.config.enemyTypes)
+
+    def check_executor(self, executor) -> None:
+        with executor:
+            dungeon = asyncio.run(gen_map_async(self.config, 1, executor))
+
+        self.assertEqual(self.describe(dungeon),
+                         self.describe(DunGEN.gen_map(self.config, 1)))
+
+        packed = DungeonIO.pack(dungeon, self.config.roomTypes,
+                                self.config.enemyTypes)
+        unpacked = DungeonIO.unpack(packed, self.config.roomTypes,
+                                    self.config.enemyTypes)
+        self.assertEqual(self.describe(unpacked), self.describe(dungeon))
+
+    def test_thread_pool(self) -> None:
+        self.check_executor(ThreadPoolExecutor(1))
+
+    def test_process_pool_keeps_config_types(self) -> None:
+        self.check_executor(ProcessPoolExecutor(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+
+MAIN = os.path.join(os.path.dirname(__file__), '..', 'src', 'main.py')
+
+
+class GenerateCommandTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def generate(self, name: str, *args: str) -> str:
+        output = os.path.join(self.directory, name)
+        subprocess.run([sys.executable, MAIN, 'generate', '-n', '6',
+                        '-o', output] + list(args),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       check=True)
+        return output
+
+    def read(self, path: str) -> List[bytes]:
+        with open(path, 'rb') as file:
+            return file.read().splitlines()
+
+    def test_teams_with_one_worker(self) -> None:
+        plain = self.read(self.generate('plain.jsonl', '-w', '1'))
+        teams = self.read(self.generate('teams.jsonl', '-w', '1', '--teams'))
+        pooled = self.read(self.generate('pooled.jsonl', '-w', '2',
+                                         '--teams'))
+
+        self.assertGreater(len(plain), 0)
+        self.assertNotEqual(teams, plain)
+        self.assertEqual(teams, pooled)
+
+    def read_records(self, path: str) -> List[bytes]:
+        with open(path, 'rb') as file:
+            data = file.read()
+
+        records = []
+        pos = 0
+        while pos < len(data):
+            size, = struct.unpack_from('<I', data, pos)
+            pos += 4
+            records.append(data[pos:pos + size])
+            pos += size
+
+        return records
+
+    def test_worker_counts_write_the_same_records(self) -> None:
+        single = self.read(self.generate('single.jsonl', '-w', '1'))
+        pooled = self.read(self.generate('pooled.jsonl', '-w', '2'))
+
+        self.assertGreater(len(single), 0)
+        self.assertEqual(sorted(pooled), sorted(single))
+
+        config = main.get_dungeon_config().compile()
+        expected = {}
+        for line in single:
+            record = json.loads(line)
+            expected[record['seed']] = record
+
+        for workers in ('1', '2'):
+            output = self.generate('dungeons-w' + workers + '.bin',
+                                   '-w', workers, '-f', 'binary',
+                                   '--shards', '2')
+            name, ext = os.path.splitext(output)
+
+            seeds = []
+            for shard in range(2):
+                path = name + '-' + str(shard).zfill(5) + ext
+
+                for data in self.read_records(path):
+                    packed = DungeonIO.PackedDungeon(data)
+                    self.assertEqual(packed.size, len(data))
+                    self.assertEqual(packed.seed % 2, shard)
+
+                    dungeon = packed.to_dungeon(config.roomTypes,
+                                                config.enemyTypes)
+                    self.assertEqual(
+                        DungeonIO.to_dict(dungeon, config.roomTypes,
+                                          config.enemyTypes),
+                        expected[packed.seed])
+
+                    seeds.append(packed.seed)
+
+            self.assertEqual(sorted(seeds), sorted(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
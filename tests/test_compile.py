@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+
+
+class CompiledConfigTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = main.get_dungeon_config()
+        self.plan = self.config.compile()
+
+    def describe(self, seed: int) -> dict:
+        return DungeonIO.to_dict(DunGEN.gen_map(self.plan, seed),
+                                 self.plan.roomTypes, self.plan.enemyTypes)
+
+    def test_plan_matches_config(self) -> None:
+        for seed in range(1, 8):
+            try:
+                dungeon = DunGEN.gen_map(self.config, seed)
+            except ZeroDivisionError:
+                continue
+
+            expected = DungeonIO.to_dict(dungeon, self.config.roomTypes,
+                                         self.config.enemyTypes)
+            self.assertEqual(self.describe(seed), expected)
+
+    def test_config_changes_do_not_affect_plan(self) -> None:
+        expected = self.describe(1)
+
+        self.config.layers[2].noise = -0.5
+        self.config.enemyTypes[0].priority = 1000
+        self.config.roomTypes[-1].difficulty = 0
+        self.config.enemyTypes[-1].requiresRoom = ['Missing']
+
+        self.assertEqual(self.describe(1), expected)
+
+        with self.assertRaises(DunGEN.GeneratorError):
+            self.config.compile()
+
+    def test_layers_share_the_plan_types(self) -> None:
+        roomLayer = self.plan.layers[3]
+        enemyLayer = self.plan.layers[4]
+
+        self.assertEqual(list(self.plan.roomTypes), roomLayer.roomTypes)
+        self.assertEqual(list(self.plan.enemyTypes), enemyLayer.enemyTypes)
+
+        for original, snapshot in zip(self.config.roomTypes,
+                                      self.plan.roomTypes):
+            self.assertIsNot(original, snapshot)
+            self.assertEqual(original.name, snapshot.name)
+
+        with self.assertRaises(AttributeError):
+            self.plan.layers = ()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import BasicDungeonDesign  # noqa: E402
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+from DunGEN import CounterRNG  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class CounterRNGTest(unittest.TestCase):
+
+    def test_streams_and_seeds_differ(self) -> None:
+        rng = CounterRNG(12345, 3)
+        self.assertEqual(rng.bits(4, 1), CounterRNG(12345, 3).bits(4, 1))
+        self.assertNotEqual(rng.bits(4, 1), CounterRNG(12345, 4).bits(4, 1))
+        self.assertNotEqual(rng.bits(4, 1), CounterRNG(12346, 3).bits(4, 1))
+        self.assertNotEqual(rng.bits(4, 1), rng.bits(4, 2))
+
+        values = [rng.random(room) for room in range(1000)]
+        self.assertTrue(all(0 <= value < 1 for value in values))
+        self.assertTrue(all(0 <= rng.randrange(7, room) < 7
+                            for room in range(1000)))
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_arrays_match_scalar_draws(self) -> None:
+        rng = CounterRNG(12345, 3)
+        rooms = [0, 1, 7, 1000, 2 ** 31, 2 ** 32 - 1]
+
+        for draw in (0, 5):
+            self.assertEqual(rng.random_array(np.array(rooms), draw).tolist(),
+                             [rng.random(room, draw) for room in rooms])
+
+        self.assertEqual(rng.random_array(100).tolist(),
+                         [rng.random(room) for room in range(100)])
+        self.assertEqual(rng.randrange_array(17, 1000).tolist(),
+                         [rng.randrange(17, room) for room in range(1000)])
+
+        sizes = np.arange(1, 101)
+        self.assertEqual(rng.randrange_array(sizes, 100, 2).tolist(),
+                         [rng.randrange(int(n), room, 2)
+                          for room, n in enumerate(sizes)])
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_vectorized_layers_match_scalar_layers(self) -> None:
+        def compile_config(vectorized: bool) -> DunGEN.CompiledConfig:
+            config = main.get_dungeon_config()
+            config.layers[2] = DunGEN.AssignDifficultiesLayer(
+                2 / 3, 0.05, 0.1, vectorized, stream=1)
+            config.layers[3] = DunGEN.AssignRoomTypes(config.roomTypes,
+                                                      stream=2)
+            config.layers[4] = DunGEN.TeamEnemiesLayer(
+                config.enemyTypes, BasicDungeonDesign.get_enemy_teams(),
+                stream=3)
+            return config.compile()
+
+        scalar = compile_config(False)
+        vectorized = compile_config(True)
+
+        for seed in (1, 2, 3, 4):
+            self.assertEqual(
+                DungeonIO.to_dict(DunGEN.gen_map(scalar, seed),
+                                  scalar.roomTypes, scalar.enemyTypes),
+                DungeonIO.to_dict(DunGEN.gen_map(vectorized, seed),
+                                  vectorized.roomTypes,
+                                  vectorized.enemyTypes))
+
+
+if __name__ == '__main__':
+    unittest.main()
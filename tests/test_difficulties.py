@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class VectorizedDifficultiesTest(unittest.TestCase):
+
+    def compile_config(self, vectorized: bool,
+                       stream: Optional[int]) -> DunGEN.CompiledConfig:
+        config = main.get_dungeon_config()
+        config.layers[2] = DunGEN.AssignDifficultiesLayer(
+            2 / 3, 0.05, 0.1, vectorized, stream)
+        return config.compile()
+
+    def check_stream(self, stream: Optional[int]) -> None:
+        scalar = self.compile_config(False, stream)
+        vectorized = self.compile_config(True, stream)
+
+        for seed in range(1, 31):
+            try:
+                expected = DunGEN.gen_map(scalar, seed)
+            except ZeroDivisionError:
+                with self.assertRaises(ZeroDivisionError):
+                    DunGEN.gen_map(vectorized, seed)
+                continue
+
+            dungeon = DunGEN.gen_map(vectorized, seed)
+
+            # Difficulties must be bit identical, not just close.
+            self.assertEqual([float(room.difficulty).hex()
+                              for room in dungeon.rooms],
+                             [float(room.difficulty).hex()
+                              for room in expected.rooms])
+
+            # Later layers must see the same random generator state.
+            self.assertEqual(
+                DungeonIO.to_dict(dungeon, vectorized.roomTypes,
+                                  vectorized.enemyTypes),
+                DungeonIO.to_dict(expected, scalar.roomTypes,
+                                  scalar.enemyTypes))
+
+    def test_random_module_stream(self) -> None:
+        self.check_stream(None)
+
+    def test_counter_stream(self) -> None:
+        self.check_stream(1)
+
+
+if __name__ == '__main__':
+    unittest.main()
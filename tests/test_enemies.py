@@ -0,0 +1,379 @@
+import os
+import random
+import sys
+import unittest
+from bisect import bisect_right
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import BasicDungeonDesign  # noqa: E402
+import DunGEN  # noqa: E402
+import main  # noqa: E402
+
+
+def get_enemy_types() -> List[DunGEN.EnemyType]:
+    enemyTypes = BasicDungeonDesign.get_enemy_types()
+    enemyTypes.append(BasicDungeonDesign.enemy(
+        'Puzzle Guard', 6, 3, requiresRoom=['Simple Maze', 'Hallway']))
+    enemyTypes.append(BasicDungeonDesign.enemy(
+        'Lost Guard', 4, 2, requiresRoom=['Missing Room']))
+    return enemyTypes
+
+
+def make_room(roomType: DunGEN.RoomType = None,
+              enemies: List[DunGEN.EnemyType] = []) -> DunGEN.DungeonRoom:
+    room = DunGEN.DungeonRoom()
+    room.type = roomType
+    room.enemies = list(enemies)
+    return room
+
+
+def get_rooms(enemyTypes: List[DunGEN.EnemyType]) -> List[DunGEN.DungeonRoom]:
+    byName = {x.name: x for x in enemyTypes}
+    roomTypes = {x.name: x for x in BasicDungeonDesign.get_room_types()}
+
+    return [
+        make_room(),
+        make_room(roomTypes['Hallway']),
+        make_room(roomTypes['Empty Room'], [byName['Minion']]),
+        make_room(roomTypes['Simple Maze'], [byName['Tank']]),
+        make_room(roomTypes['Complex Maze'],
+                  [byName['Ranged'], byName['Ranged']]),
+        make_room(None, [byName['Tank Mini-Boss'], byName['Support']]),
+    ]
+
+
+def old_meets_enemy_requirements(enemy: DunGEN.EnemyType,
+                                 room: DunGEN.DungeonRoom) -> bool:
+    if len(enemy.requiresEnemy) == 0:
+        return True
+
+    return any(en.name in enemy.requiresEnemy for en in room.enemies)
+
+
+def old_meets_room_type_requirements(enemy: DunGEN.EnemyType,
+                                     room: DunGEN.DungeonRoom) -> bool:
+    if len(enemy.requiresRoom) == 0:
+        return True
+
+    if room.type is None:
+        return False
+
+    return room.type.name in enemy.requiresRoom
+
+
+def old_random_enemy(enemyTypes: List[DunGEN.EnemyType],
+                     search: Callable[[DunGEN.EnemyType], bool]) \
+        -> DunGEN.EnemyType:
+    weighted = [x for x in filter(search, enemyTypes)
+                for _ in range(x.priority)]
+
+    if len(weighted) == 0:
+        raise DunGEN.GeneratorError
+
+    return weighted[random.randrange(len(weighted))]
+
+
+def old_candidates(enemyTypes: List[DunGEN.EnemyType],
+                   room: DunGEN.DungeonRoom, endOfRegion: bool,
+                   difficulty: float) -> List[DunGEN.EnemyType]:
+    return [x for x in enemyTypes
+            if x.difficulty <= difficulty
+            and room.has_room_for(x)
+            and (not x.endOfRegion or endOfRegion)
+            and old_meets_enemy_requirements(x, room)
+            and old_meets_room_type_requirements(x, room)]
+
+
+def old_fill_room(enemyTypes: List[DunGEN.EnemyType],
+                  room: DunGEN.DungeonRoom, endOfRegion: bool,
+                  difficulty: float) -> List[str]:
+    names = []
+
+    while difficulty > 0:
+        candidates = old_candidates(enemyTypes, room, endOfRegion,
+                                    difficulty)
+        try:
+            enemy = old_random_enemy(candidates, lambda x: True)
+        except DunGEN.GeneratorError:
+            break
+
+        room.enemies.append(enemy)
+        names.append(enemy.name)
+        difficulty -= enemy.difficulty
+
+    return names
+
+
+def new_fill_room(table: DunGEN.EnemyTable, room: DunGEN.DungeonRoom,
+                  endOfRegion: bool, difficulty: float) -> List[str]:
+    placement = DunGEN.EnemyPlacement(table, room, endOfRegion)
+    names = []
+
+    while difficulty > 0:
+        enemy = placement.pick(difficulty)
+        if enemy is None:
+            break
+
+        room.add_enemy(enemy)
+        placement.add(enemy)
+        names.append(enemy.name)
+        difficulty -= enemy.difficulty
+
+    return names
+
+
+class EnemyHelpersTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.enemyTypes = get_enemy_types()
+        self.layer = DunGEN.EnemiesLayer(self.enemyTypes)
+        self.compiled = self.layer.compile(DunGEN.CompiledConfig(
+            DunGEN.GeneratorConfig()))
+
+    def test_requirements_match_name_checks(self) -> None:
+        for layer in (self.layer, self.compiled):
+            for room in get_rooms(layer.enemyTypes):
+                for enemy in layer.enemyTypes:
+                    self.assertEqual(
+                        layer.meets_enemy_requirements(enemy, room),
+                        old_meets_enemy_requirements(enemy, room))
+                    self.assertEqual(
+                        layer.meets_room_type_requirements(enemy, room),
+                        old_meets_room_type_requirements(enemy, room))
+
+        # Enemy types from outside of the layer are checked by name.
+        outsider = BasicDungeonDesign.enemy(
+            'Outsider', 5, 1, requiresEnemy=['Minion'],
+            requiresRoom=['Empty Room'])
+        for room in get_rooms(self.enemyTypes):
+            self.assertEqual(
+                self.layer.meets_enemy_requirements(outsider, room),
+                old_meets_enemy_requirements(outsider, room))
+            self.assertEqual(
+                self.layer.meets_room_type_requirements(outsider, room),
+                old_meets_room_type_requirements(outsider, room))
+
+    def test_has_room_for(self) -> None:
+        boss = self.enemyTypes[0]
+        minion = next(x for x in self.enemyTypes if x.name == 'Minion')
+
+        room = make_room()
+        self.assertTrue(room.has_room_for(boss))
+
+        room.add_enemy(boss)
+        self.assertFalse(room.has_room_for(boss))
+
+        for _ in range(minion.maxCount - 1):
+            room.add_enemy(minion)
+        self.assertTrue(room.has_room_for(minion))
+
+        room.add_enemy(minion)
+        self.assertFalse(room.has_room_for(minion))
+
+    def test_random_enemy_matches_weighted_list(self) -> None:
+        searches = [
+            lambda x: True,
+            lambda x: x.difficulty <= 0.08,
+            lambda x: not x.endOfRegion and len(x.requiresEnemy) == 0,
+        ]
+
+        for search in searches:
+            random.seed(3)
+            expected = [old_random_enemy(self.enemyTypes, search).name
+                        for _ in range(50)]
+
+            random.seed(3)
+            actual = [self.layer.random_enemy(search).name
+                      for _ in range(50)]
+
+            self.assertEqual(actual, expected)
+
+        with self.assertRaises(DunGEN.GeneratorError):
+            self.layer.random_enemy(lambda x: x.difficulty > 1)
+
+
+class EnemyTableTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.enemyTypes = get_enemy_types()
+        self.table = DunGEN.EnemyTable(self.enemyTypes)
+
+    def test_candidates_match_filter(self) -> None:
+        for room in get_rooms(self.enemyTypes):
+            for endOfRegion in (False, True):
+                for difficulty in (0.0, 0.02, 0.05, 0.1, 0.3, 1.0):
+                    placement = DunGEN.EnemyPlacement(self.table, room,
+                                                      endOfRegion)
+                    placement.set_limit(bisect_right(
+                        self.table.difficulties, difficulty))
+
+                    weights = placement.weights.weights
+                    actual = [x.name for i, x in enumerate(self.enemyTypes)
+                              if weights[i] > 0]
+                    expected = [x.name for x in old_candidates(
+                        self.enemyTypes, room, endOfRegion, difficulty)]
+
+                    self.assertEqual(actual, expected)
+
+    def test_picks_match_weighted_list(self) -> None:
+        for seed in range(10):
+            for endOfRegion in (False, True):
+                random.seed(seed)
+                expected = [old_fill_room(self.enemyTypes, room,
+                                          endOfRegion, 0.6)
+                            for room in get_rooms(self.enemyTypes)]
+
+                random.seed(seed)
+                actual = [new_fill_room(self.table, room, endOfRegion, 0.6)
+                          for room in get_rooms(self.enemyTypes)]
+
+                self.assertEqual(actual, expected)
+
+    def test_requirements_rule_out_every_enemy(self) -> None:
+        byName = {x.name: x for x in self.enemyTypes}
+        enemyTypes = [byName['Support'], byName['Lost Guard'],
+                      byName['Tank Mini-Boss']]
+        table = DunGEN.EnemyTable(enemyTypes)
+
+        roomType = BasicDungeonDesign.room('Hallway', 3, 10)
+        for room in (make_room(), make_room(roomType)):
+            self.assertEqual(old_candidates(enemyTypes, room, False, 1.0),
+                             [])
+
+            placement = DunGEN.EnemyPlacement(table, room, False)
+            self.assertIsNone(placement.pick(1.0))
+            self.assertEqual(placement.weights.total(), 0)
+
+            with self.assertRaises(DunGEN.GeneratorError):
+                old_random_enemy(enemyTypes, lambda x: x in old_candidates(
+                    enemyTypes, room, False, 1.0))
+
+
+class PlacementStatsTest(unittest.TestCase):
+
+    def test_place_enemies_returns_room_metrics(self) -> None:
+        config = main.get_dungeon_config().compile()
+        dungeon = DunGEN.gen_map(config, 1)
+
+        plain = BasicDungeonDesign.room('Plain', 0, 1)
+        rooms = []
+        for room in dungeon.rooms:
+            room.enemies = []
+            if not room.type.isEntrance and not room.type.isExit:
+                room.type = plain
+                room.difficulty = 0
+                rooms.append(room)
+
+        # Budgets and difficulties are powers of two, so they subtract
+        # without rounding errors.
+        enemy = BasicDungeonDesign.enemy('Grunt', 0, 1)
+        enemy.difficulty = 0.125
+
+        filled, starved = rooms[0], rooms[1]
+        filled.difficulty = 0.25
+        starved.difficulty = 0.0625
+
+        layer = DunGEN.EnemiesLayer([enemy])
+        stats = layer.place_enemies(dungeon)
+
+        self.assertEqual(stats.rooms, len(rooms))
+        self.assertEqual(stats.enemies, 2)
+        self.assertEqual(stats.failures, 1)
+        self.assertEqual(stats.leftover, 0.0625)
+        self.assertEqual(stats.failure_rate(), 1 / len(rooms))
+
+        self.assertEqual(len(stats.roomFailures), len(dungeon.rooms))
+        self.assertEqual(stats.roomFailures[starved.index], 1)
+        self.assertEqual(stats.roomLeftover[starved.index], 0.0625)
+        self.assertEqual(stats.roomFailures[filled.index], 0)
+        self.assertEqual(stats.roomLeftover[filled.index], 0)
+        self.assertEqual(sum(stats.roomFailures), 1)
+
+        self.assertEqual(starved.enemies, [])
+        self.assertEqual(filled.enemies, [enemy, enemy])
+
+        # Only process_dungeon adds to the totals of the layer.
+        self.assertEqual(layer.stats.rooms, 0)
+
+        for room in rooms:
+            room.enemies = []
+
+        layer.process_dungeon(dungeon)
+        self.assertEqual(layer.stats.failures, 1)
+        self.assertEqual(layer.stats.leftover, 0.0625)
+        self.assertEqual(layer.stats.roomFailures, [])
+
+
+class TeamEnemiesLayerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.enemyTypes = [BasicDungeonDesign.enemy(name, 1, 1, maxCount=50)
+                           for name in ('A', 'B', 'C', 'D')]
+        self.teams = [(['A', 'B'], 100), (['A', 'C'], -100)]
+        self.layer = DunGEN.TeamEnemiesLayer(self.enemyTypes, self.teams)
+
+        self.builds = 0
+        build_synergy = self.layer.build_synergy
+
+        def counted(table: DunGEN.EnemyTable) -> None:
+            self.builds += 1
+            build_synergy(table)
+
+        self.layer.build_synergy = counted
+
+    def test_synergy_is_built_once(self) -> None:
+        config = main.get_dungeon_config().compile()
+        dungeon = DunGEN.gen_map(config, 1)
+        for room in dungeon.rooms:
+            room.enemies = []
+
+        self.layer.place_enemies(dungeon)
+        self.layer.place_enemies(dungeon)
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(self.layer.synergy, [
+            [0, 100, -100, 0],
+            [100, 0, 0, 0],
+            [-100, 0, 0, 0],
+            [0, 0, 0, 0],
+        ])
+        self.assertEqual(self.layer.partners, [[1, 2], [0], [0], []])
+
+        compiled = self.layer.compile(config)
+        self.assertEqual(self.builds, 2)
+
+        compiled.place_enemies(dungeon)
+        compiled.place_enemies(dungeon)
+        self.assertEqual(self.builds, 2)
+
+        self.layer.teams = [(['B', 'D'], 50)]
+        self.layer.place_enemies(dungeon)
+        self.assertEqual(self.builds, 3)
+        self.assertEqual(self.layer.partners, [[], [3], [], [1]])
+
+    def test_picks_favor_teammates(self) -> None:
+        table = self.layer.build_table()
+
+        def picks(enemies: List[DunGEN.EnemyType]) -> Dict[str, int]:
+            counts = {x.name: 0 for x in self.enemyTypes}
+
+            random.seed(7)
+            for _ in range(400):
+                placement = self.layer.placement(
+                    table, make_room(None, enemies), False)
+                counts[placement.pick(1.0).name] += 1
+
+            return counts
+
+        alone = picks([])
+        self.assertTrue(all(count > 0 for count in alone.values()))
+
+        counts = picks([self.enemyTypes[0]])
+        self.assertEqual(counts['C'], 0)
+        self.assertGreater(counts['B'], counts['A'] * 1.5)
+        self.assertGreater(counts['B'], counts['D'] * 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+
+
+class FilterRetryTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        config = main.get_dungeon_config()
+        self.plain = config.compile()
+        main.add_quality_filters(config, 5, 0, 1.0)
+        self.config = config.compile()
+
+    def describe(self, dungeon: DunGEN.Dungeon,
+                 config: DunGEN.CompiledConfig) -> dict:
+        return DungeonIO.to_dict(dungeon, config.roomTypes,
+                                 config.enemyTypes)
+
+    def test_filter_is_placed_after_its_layer(self) -> None:
+        layers = self.config.layers
+        self.assertIsInstance(layers[1], DunGEN.AssignRegionsLayer)
+        self.assertIsInstance(layers[2], DunGEN.FilterLayer)
+        self.assertEqual(layers[2].name, 'min-regions')
+
+        with self.assertRaises(DunGEN.GeneratorError):
+            DunGEN.GeneratorConfig().add_filter(
+                lambda d: True, 'missing', DunGEN.AssignRegionsLayer)
+
+    def test_retries_match_the_accepted_seed(self) -> None:
+        # Seeds 1 and 2 have fewer than 5 regions, and seed 3 has 5.
+        stats = DunGEN.FilterStats()
+        dungeon = DunGEN.gen_map(self.config, 1, retries=2, stats=stats)
+
+        self.assertEqual(dungeon.seed, 3)
+        expected = self.describe(dungeon, self.config)
+        self.assertEqual(expected, self.describe(
+            DunGEN.gen_map(self.plain, 3), self.plain))
+        self.assertEqual(expected, self.describe(
+            DunGEN.gen_map(self.config, 1, retries=2), self.config))
+
+        self.assertEqual(stats.accepted, 1)
+        self.assertEqual(stats.rejected, {'min-regions': 2})
+        self.assertEqual(stats.rejectedAt, {2: 2})
+        self.assertEqual(stats.attempts(), 3)
+
+        # Rejected dungeons stop at the filter.
+        self.assertEqual(stats.layerRuns[:3], [3, 3, 3])
+        self.assertEqual(stats.layerRuns[3:], [1] * (len(stats.layerRuns) - 3))
+
+    def test_seed_step_and_exhausted_retries(self) -> None:
+        dungeon = DunGEN.gen_map(self.config, 1, retries=1, seedStep=3)
+        self.assertEqual(dungeon.seed, 4)
+
+        with self.assertRaises(DunGEN.DungeonRejected) as context:
+            DunGEN.gen_map(self.config, 1, retries=1)
+        self.assertEqual(context.exception.name, 'min-regions')
+
+    def test_merged_stats_add_up(self) -> None:
+        first = DunGEN.FilterStats()
+        second = DunGEN.FilterStats()
+        DunGEN.gen_map(self.config, 1, retries=2, stats=first)
+        DunGEN.gen_map(self.config, 4, stats=second)
+
+        first.merge(second)
+        self.assertEqual(first.accepted, 2)
+        self.assertEqual(first.rejected, {'min-regions': 2})
+        self.assertEqual(first.attempts(), 4)
+        self.assertAlmostEqual(first.acceptance_rate(), 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import main  # noqa: E402
+
+# West, north, east, south, as used by room doors.
+STEPS = ((-1, 0), (0, -1), (1, 0), (0, 1))
+
+
+class DungeonGraphTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = main.get_dungeon_config().compile()
+        self.dungeon = DunGEN.gen_map(self.config, 1)
+
+    def test_edges_match_room_doors(self) -> None:
+        dungeon = self.dungeon
+        graph = dungeon.adjacency()
+        positions = {(room.x, room.y): room for room in dungeon.rooms}
+
+        self.assertEqual(len(graph), len(dungeon.rooms))
+        self.assertEqual(graph.exit, dungeon.mainPath.rooms[-1].index)
+
+        for room in dungeon.rooms:
+            expected = set()
+            for door, (dx, dy) in enumerate(STEPS):
+                other = positions.get((room.x + dx, room.y + dy))
+                if other is None:
+                    continue
+
+                if room.doors[door] or other.doors[(door + 2) % 4]:
+                    expected.add(other.index)
+
+            neighbours = graph.neighbours(room.index)
+            self.assertEqual(len(neighbours), len(expected))
+            self.assertEqual(set(neighbours), expected)
+
+            for target in neighbours:
+                self.assertIn(room.index, graph.neighbours(target))
+
+    def test_locked_doors_block_distances(self) -> None:
+        dungeon = self.dungeon
+        graph = dungeon.adjacency()
+        self.assertGreater(len(dungeon.keys), 0)
+
+        for i, key in enumerate(dungeon.keys):
+            self.assertEqual(graph.keyRooms[i], key.keyLocation.index)
+
+            lock = key.lockLocation.index
+            start = graph.offsets[lock]
+            edges = [e for e in range(start, graph.offsets[lock + 1])
+                     if graph.directions[e] == key.lockedDoor]
+            self.assertEqual([graph.locks[e] for e in edges], [i])
+
+        open_ = graph.entrance_distances()
+        locked = graph.entrance_distances(locked=True)
+        self.assertTrue(all(d >= 0 for d in open_))
+        self.assertEqual(graph.exitDistances[graph.exit], 0)
+
+        for room in dungeon.rooms:
+            if room.region == 0:
+                self.assertGreaterEqual(locked[room.index], open_[room.index])
+            else:
+                self.assertEqual(locked[room.index], -1)
+
+        key = graph.key_distances(0)
+        self.assertEqual(key[graph.keyRooms[0]], 0)
+        self.assertIs(graph.key_distances(0), key)
+
+    def test_graph_is_rebuilt_when_a_room_changes(self) -> None:
+        dungeon = self.dungeon
+        graph = dungeon.adjacency()
+        self.assertIs(dungeon.adjacency(), graph)
+
+        # Doorways open on either side are connected, so closing the
+        # doors of the neighbouring rooms alone keeps the edges.
+        closed = (False, False, False, False)
+        neighbours = list(graph.neighbours(0))
+        for target in neighbours:
+            dungeon.rooms[target].doors = closed
+
+        self.assertIsNot(dungeon.adjacency(), graph)
+        self.assertEqual(list(dungeon.adjacency().neighbours(0)), neighbours)
+
+        dungeon.rooms[0].doors = closed
+        self.assertEqual(len(dungeon.adjacency().neighbours(0)), 0)
+        self.assertEqual(
+            dungeon.adjacency().entrance_distances()[neighbours[0]], -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
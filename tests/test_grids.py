@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import main  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class DungeonGridsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = main.get_dungeon_config().compile()
+        self.dungeon = DunGEN.gen_map(self.config, 1)
+
+    def test_cells_match_rooms(self) -> None:
+        dungeon = self.dungeon
+        grids = dungeon.as_grids(self.config.roomTypes)
+        minX, minY, _, _ = dungeon.bounds()
+
+        self.assertEqual(grids.origin, (minX, minY))
+        self.assertEqual(int(grids.occupied.sum()), len(dungeon.rooms))
+        self.assertEqual(int((grids.index >= 0).sum()), len(dungeon.rooms))
+
+        for room in dungeon.rooms:
+            cell = (room.y - minY, room.x - minX)
+            doors = sum(1 << i for i, door in enumerate(room.doors) if door)
+
+            self.assertTrue(grids.occupied[cell])
+            self.assertEqual(grids.index[cell], room.index)
+            self.assertEqual(grids.region[cell], room.region)
+            self.assertEqual(grids.difficulty[cell], room.difficulty)
+            self.assertEqual(grids.doors[cell], doors)
+            self.assertIs(self.config.roomTypes[grids.type[cell]],
+                          room.type)
+
+    def test_grids_are_cached_until_a_room_changes(self) -> None:
+        dungeon = self.dungeon
+        grids = dungeon.as_grids()
+        self.assertIs(dungeon.as_grids(), grids)
+
+        room = dungeon.rooms[1]
+        room.region = 99
+
+        minX, minY, _, _ = dungeon.bounds()
+        updated = dungeon.as_grids()
+        self.assertIsNot(updated, grids)
+        self.assertEqual(updated.region[room.y - minY, room.x - minX], 99)
+
+    def test_batch_rows_share_one_buffer(self) -> None:
+        other = DunGEN.gen_map(self.config, 2)
+        shape = (40, 40)
+        batch = np.zeros((2, DunGEN.DungeonGrids.nbytes(shape)),
+                         dtype=np.uint8)
+
+        self.dungeon.as_grids(shape=shape, out=batch[0])
+        other.as_grids(shape=shape, out=batch[1])
+
+        # Grids written to a given buffer are not cached, so the rooms
+        # are not watched for changes.
+        self.assertEqual(other.watched, 0)
+        self.assertNotIsInstance(other.rooms[0], DunGEN.WatchedDungeonRoom)
+
+        grids = DunGEN.DungeonGrids(batch, shape)
+        self.assertEqual(grids.region.shape, (2,) + shape)
+        np.testing.assert_array_equal(
+            grids.region[1], other.as_grids(shape=shape).region)
+        np.testing.assert_array_equal(
+            grids.occupied[0], self.dungeon.as_grids(shape=shape).occupied)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main  # noqa: E402
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    def test_generator_does_not_import_slow_modules(self) -> None:
+        modules = main.measure_imports()
+        names = {name for _, name in modules}
+
+        self.assertIn('DunGEN', names)
+        self.assertEqual(main.leaked_modules(modules), [])
+
+    def test_leaked_modules_are_found(self) -> None:
+        modules = [(10, 'DunGEN'), (20, 'PIL.Image'),
+                   (30, 'concurrent.futures.process')]
+        self.assertEqual(main.leaked_modules(modules),
+                         ['PIL.Image', 'concurrent.futures.process'])
+
+
+if __name__ == '__main__':
+    unittest.main()
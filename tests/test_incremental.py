@@ -0,0 +1,94 @@
+import os
+import random
+import sys
+import unittest
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import main  # noqa: E402
+
+try:
+    import DungeonPainter
+    from PIL import Image, ImageFont
+except ImportError:
+    DungeonPainter = None
+
+
+@unittest.skipIf(DungeonPainter is None, 'Pillow is not installed')
+class IncrementalPainterTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = main.get_dungeon_config().compile()
+        self.dungeon = DunGEN.gen_map(self.config, 1)
+
+        font = ImageFont.load_default()
+
+        self.painter = DungeonPainter.PainterConfig()
+        self.painter.imageName = ''
+        self.painter.layers = [
+            DungeonPainter.FillLayer(main.BACKGROUND_COLOR),
+            DungeonPainter.RegionLayer(),
+            DungeonPainter.DifficultyLayer(),
+            DungeonPainter.WallsLayer(32, main.WALL_COLOR,
+                                      main.LOCKED_DOOR_COLOR),
+            DungeonPainter.RoomNumbersLayer(font, main.ROOM_NUMBER_COLOR),
+            DungeonPainter.PathLayer(main.PATH_COLOR),
+            DungeonPainter.KeysLayer(main.KEY_COLOR, 8),
+        ]
+
+    def pages(self, data: bytes) -> list:
+        image = Image.open(BytesIO(data))
+        pages = []
+
+        for i in range(image.n_frames):
+            image.seek(i)
+            pages.append(image.tobytes())
+
+        return pages
+
+    def full_render(self) -> list:
+        # Region colors are picked at random, so the full render must
+        # pick the same colors as the first incremental render.
+        random.seed(5)
+        return self.pages(DungeonPainter.create_image(self.dungeon,
+                                                      self.painter))
+
+    def test_redraw_matches_full_render(self) -> None:
+        incremental = DungeonPainter.IncrementalPainter(self.dungeon,
+                                                        self.painter)
+        self.addCleanup(incremental.close)
+
+        random.seed(5)
+        self.assertEqual(self.pages(incremental.create_image()),
+                         self.full_render())
+
+        keyRoom = self.dungeon.keys[0].keyLocation
+        lockRoom = self.dungeon.keys[0].lockLocation
+        keyRoom.difficulty = 1 - keyRoom.difficulty
+        lockRoom.difficulty = 0.5
+        self.dungeon.rooms[3].difficulty = 0
+
+        self.assertEqual(len(incremental.dirty), 3)
+        self.assertEqual(self.pages(incremental.create_image()),
+                         self.full_render())
+
+    def test_rooms_outside_the_area_are_not_drawn(self) -> None:
+        paintableRooms, _ = DungeonPainter.plot_rooms(self.dungeon,
+                                                      self.painter)
+        room = self.dungeon.rooms[1]
+
+        partial = DungeonPainter.PartialRooms(
+            DungeonPainter.RoomIndex(self.dungeon))
+        partial[room.index] = paintableRooms[room.index]
+
+        self.assertIs(DungeonPainter.paintable_room(partial, room),
+                      paintableRooms[room.index])
+
+        with self.assertRaises(ValueError):
+            DungeonPainter.paintable_room(partial, self.dungeon.rooms[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
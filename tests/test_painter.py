@@ -0,0 +1,128 @@
+import os
+import random
+import sys
+import unittest
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import main  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import DungeonPainter
+    from PIL import Image, ImageFont
+except ImportError:
+    DungeonPainter = None
+
+
+@unittest.skipIf(DungeonPainter is None, 'Pillow is not installed')
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class RenderOptionsTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = main.get_dungeon_config().compile()
+        self.dungeons = []
+
+        for seed in (1, 2, 3):
+            try:
+                self.dungeons.append(DunGEN.gen_map(self.config, seed))
+            except ZeroDivisionError:
+                continue
+
+        self.assertGreater(len(self.dungeons), 1)
+
+    def painter(self, layered: bool, vectorized: bool = False,
+                paletteLayers: bool = False) -> 'DungeonPainter.PainterConfig':
+        painter = DungeonPainter.PainterConfig()
+        painter.imageName = ''
+        painter.layeredImage = layered
+        painter.vectorized = vectorized
+        painter.paletteLayers = paletteLayers
+        painter.layers = [
+            DungeonPainter.FillLayer(main.BACKGROUND_COLOR),
+            DungeonPainter.RegionLayer(),
+            DungeonPainter.DifficultyLayer(),
+            DungeonPainter.WallsLayer(32, main.WALL_COLOR,
+                                      main.LOCKED_DOOR_COLOR),
+            DungeonPainter.RoomNumbersLayer(ImageFont.load_default(),
+                                            main.ROOM_NUMBER_COLOR),
+            DungeonPainter.PathLayer(main.PATH_COLOR),
+            DungeonPainter.KeysLayer(main.KEY_COLOR, 8),
+        ]
+
+        return painter
+
+    def pages(self, dungeon: DunGEN.Dungeon,
+              painter: 'DungeonPainter.PainterConfig') -> list:
+        # Region colors are picked at random, so each render must pick
+        # the same colors.
+        random.seed(5)
+        data = DungeonPainter.create_image(dungeon, painter)
+
+        image = Image.open(BytesIO(data))
+        pages = []
+
+        for i in range(image.n_frames):
+            image.seek(i)
+            pages.append(image.convert('RGBA').tobytes())
+
+        return pages
+
+    def test_options_render_identical_images(self) -> None:
+        options = [
+            {'vectorized': True},
+            {'paletteLayers': True},
+            {'vectorized': True, 'paletteLayers': True},
+        ]
+
+        for layered in (True, False):
+            for dungeon in self.dungeons:
+                expected = self.pages(dungeon, self.painter(layered))
+                self.assertEqual(len(expected),
+                                 7 if layered else 1)
+
+                for option in options:
+                    with self.subTest(layered=layered, seed=dungeon.seed,
+                                      **option):
+                        actual = self.pages(dungeon,
+                                            self.painter(layered, **option))
+                        self.assertEqual(actual, expected)
+
+    def test_layout_matches_plot_map(self) -> None:
+        painter = self.painter(True)
+
+        for dungeon in self.dungeons:
+            paintableRooms = []
+            imageSize = DungeonPainter.plot_map(dungeon, paintableRooms,
+                                                painter)
+            layout = DungeonPainter.RoomLayout(dungeon, painter)
+
+            self.assertEqual(layout.imageSize, imageSize)
+            self.assertEqual(len(layout), len(paintableRooms))
+
+            def describe(p: DungeonPainter.PaintableRoom) -> tuple:
+                return p.room, p.start, p.end, p.center, p.rect, p.size
+
+            for room, expected in zip(dungeon.rooms, paintableRooms):
+                self.assertEqual(describe(layout[room.index]),
+                                 describe(expected))
+                self.assertEqual(describe(layout[room]), describe(expected))
+                self.assertIs(layout.get(room), layout[room.index])
+
+            self.assertEqual(
+                [(room, describe(p)) for room, p in layout.items()],
+                [(p.room, describe(p)) for p in paintableRooms])
+
+            outsider = DunGEN.DungeonRoom()
+            self.assertNotIn(outsider, layout)
+            self.assertIsNone(layout.get(outsider))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import BasicDungeonDesign  # noqa: E402
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+
+
+class GenerationPipelineTest(unittest.TestCase):
+
+    def test_resume_with_counter_streams_matches_gen_map(self) -> None:
+        config = main.get_dungeon_config()
+        config.layers[2] = DunGEN.AssignDifficultiesLayer(
+            2 / 3, 0.05, 0.1, stream=1)
+        config.layers[3] = DunGEN.AssignRoomTypes(config.roomTypes,
+                                                  stream=2)
+        config.layers[4] = DunGEN.TeamEnemiesLayer(
+            config.enemyTypes, BasicDungeonDesign.get_enemy_teams(),
+            stream=3)
+
+        def describe(dungeon: DunGEN.Dungeon) -> dict:
+            return DungeonIO.to_dict(dungeon, config.roomTypes,
+                                     config.enemyTypes)
+
+        expected = describe(DunGEN.gen_map(config, 1))
+
+        pipeline = DunGEN.GenerationPipeline(config)
+        self.assertEqual(describe(pipeline.run(seed=1)), expected)
+
+        for start in range(1, len(config.layers) + 1):
+            dungeon = pipeline.run(start)
+            self.assertEqual(dungeon.seed, 1)
+            self.assertEqual(describe(dungeon), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
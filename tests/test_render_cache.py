@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import main  # noqa: E402
+from RenderCache import RenderCache, describe_object  # noqa: E402
+
+try:
+    import DungeonPainter
+except ImportError:
+    DungeonPainter = None
+
+
+@unittest.skipIf(DungeonPainter is None, 'Pillow is not installed')
+class RenderCacheTest(unittest.TestCase):
+
+    def test_repeated_render_hits_cache(self) -> None:
+        dungeon = DunGEN.gen_map(main.get_dungeon_config(), 1)
+
+        config = DungeonPainter.PainterConfig()
+        config.imageName = ''
+        config.cache = RenderCache()
+        config.layers = [
+            DungeonPainter.FillLayer(main.BACKGROUND_COLOR),
+            DungeonPainter.RegionLayer(),
+            DungeonPainter.DifficultyLayer(),
+            DungeonPainter.WallsLayer(32, main.WALL_COLOR,
+                                      main.LOCKED_DOOR_COLOR),
+        ]
+
+        first = DungeonPainter.create_image(dungeon, config)
+        second = DungeonPainter.create_image(dungeon, config)
+        third = DungeonPainter.create_image(dungeon, config)
+
+        self.assertEqual(config.cache.misses, 1)
+        self.assertEqual(config.cache.hits, 2)
+        self.assertEqual(first, second)
+        self.assertEqual(first, third)
+
+    def test_unknown_settings_skip_cache(self) -> None:
+        dungeon = DunGEN.gen_map(main.get_dungeon_config(), 1)
+
+        layer = DungeonPainter.FillLayer(main.BACKGROUND_COLOR)
+        layer.extra = object()
+
+        config = DungeonPainter.PainterConfig()
+        config.imageName = ''
+        config.cache = RenderCache()
+        config.layers = [layer]
+
+        self.assertIsNone(DungeonPainter.render_cache_key(dungeon, config))
+        self.assertIsNotNone(DungeonPainter.create_image(dungeon, config))
+        self.assertEqual(config.cache.hits + config.cache.misses, 0)
+
+
+class Setting:
+
+    def __init__(self, value: object) -> None:
+        self.value = value
+
+
+class DescribeObjectTest(unittest.TestCase):
+
+    def test_containers_are_described_by_contents(self) -> None:
+        self.assertNotEqual(describe_object(Setting({1: (255, 0, 0)})),
+                            describe_object(Setting({1: (0, 0, 255)})))
+        self.assertNotEqual(describe_object(Setting({1, 2})),
+                            describe_object(Setting({1, 3})))
+
+        self.assertEqual(describe_object(Setting({'a': 1, 'b': {2, 3}})),
+                         describe_object(Setting({'b': {3, 2}, 'a': 1})))
+
+    def test_unknown_values_are_rejected(self) -> None:
+        with self.assertRaises(TypeError):
+            describe_object(Setting(Setting(1)))
+
+
+class RenderCacheThreadTest(unittest.TestCase):
+
+    def test_shared_between_threads(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = RenderCache(directory.name, memoryLimit=4000,
+                            diskLimit=8000)
+
+        def work(worker: int) -> None:
+            for i in range(200):
+                key = str((worker + i) % 50)
+                if cache.get(key) is None:
+                    cache.put(key, key.encode() * 100)
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(work, range(8)))
+
+        self.assertEqual(cache.hits + cache.misses, 8 * 200)
+        self.assertEqual(cache.memorySize,
+                         sum(len(data) for data in cache.memory.values()))
+        self.assertLessEqual(cache.memorySize, cache.memoryLimit)
+
+        index = cache.disk_index()
+        self.assertEqual(cache.diskSize, sum(index.values()))
+        self.assertLessEqual(cache.diskSize, cache.diskLimit)
+        self.assertEqual(sorted(name[:-4]
+                                for name in os.listdir(directory.name)),
+                         sorted(index))
+
+        for key in list(index):
+            self.assertEqual(cache.get(key), key.encode() * 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import BasicDungeonDesign  # noqa: E402
+import DunGEN  # noqa: E402
+
+
+class RandomRoomTest(unittest.TestCase):
+
+    def test_matches_weighted_list(self) -> None:
+        roomTypes = BasicDungeonDesign.get_room_types()
+        layer = DunGEN.AssignRoomTypes(roomTypes)
+        compiled = layer.compile(DunGEN.CompiledConfig(
+            DunGEN.GeneratorConfig()))
+
+        searches = [
+            lambda x: x.isExit,
+            lambda x: not x.isEntrance and x.difficulty <= 0.12,
+            lambda x: x.requiresEnemy,
+        ]
+
+        for search in searches:
+            weighted = [x for x in filter(search, roomTypes)
+                        for _ in range(x.priority)]
+
+            random.seed(4)
+            expected = [weighted[random.randrange(len(weighted))].name
+                        for _ in range(50)]
+
+            for assign in (layer, compiled):
+                random.seed(4)
+                actual = [assign.random_room(search).name
+                          for _ in range(50)]
+                self.assertEqual(actual, expected)
+
+        with self.assertRaises(DunGEN.GeneratorError):
+            layer.random_room(lambda x: x.difficulty > 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+from base64 import b64decode
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+from DungeonServer import GenerationServer  # noqa: E402
+
+
+class GenerationServerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.config = main.get_dungeon_config().compile()
+
+    def expected(self, seed: int) -> Dict[str, Any]:
+        dungeon = DunGEN.gen_map(self.config, seed)
+        return DungeonIO.to_dict(dungeon, self.config.roomTypes,
+                                 self.config.enemyTypes)
+
+    def serve(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # The painter factory is left out, so renders must fail without
+        # ever importing the painter.
+        registry = {'basic': (main.get_dungeon_config, None)}
+
+        async def run() -> List[Dict[str, Any]]:
+            server = GenerationServer(registry, workers=1, batchSize=4)
+            await server.start()
+
+            try:
+                await server.listen_tcp('127.0.0.1', 0)
+                port = server.servers[0].sockets[0].getsockname()[1]
+
+                reader, writer = await asyncio.open_connection('127.0.0.1',
+                                                               port)
+                for request in requests:
+                    writer.write(json.dumps(request).encode() + b'\n')
+                await writer.drain()
+
+                responses = []
+                for _ in requests:
+                    line = await asyncio.wait_for(reader.readline(), 60)
+                    responses.append(json.loads(line))
+
+                writer.close()
+                return responses
+
+            finally:
+                await server.close()
+
+        responses = asyncio.run(run())
+        return sorted(responses, key=lambda x: x['id'])
+
+    def test_requests(self) -> None:
+        responses = self.serve([
+            {'id': 0, 'seed': 1},
+            {'id': 1, 'seed': 2, 'format': 'binary'},
+            {'id': 2, 'seed': 1, 'render': True},
+            {'id': 3, 'seed': 1, 'config': 'missing'},
+            {'id': 4},
+        ])
+
+        self.assertEqual(responses[0], {'id': 0, 'ok': True, 'seed': 1,
+                                        'dungeon': self.expected(1)})
+
+        self.assertTrue(responses[1]['ok'])
+        dungeon = DungeonIO.unpack(b64decode(responses[1]['dungeon']),
+                                   self.config.roomTypes,
+                                   self.config.enemyTypes)
+        self.assertEqual(DungeonIO.to_dict(dungeon, self.config.roomTypes,
+                                           self.config.enemyTypes),
+                         self.expected(2))
+
+        self.assertFalse(responses[2]['ok'])
+        self.assertEqual(responses[2]['error'],
+                         'GeneratorError: Config cannot render: basic')
+        self.assertNotIn('image', responses[2])
+
+        self.assertFalse(responses[3]['ok'])
+        self.assertIn('Unknown config: missing', responses[3]['error'])
+
+        self.assertFalse(responses[4]['ok'])
+        self.assertTrue(responses[4]['error'].startswith('Bad request'))
+
+
+if __name__ == '__main__':
+    unittest.main()
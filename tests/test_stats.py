@@ -0,0 +1,113 @@
+import os
+import random
+import sys
+import unittest
+from statistics import mean, variance
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import main  # noqa: E402
+from DungeonStats import (DungeonStats, QuantileDigest,  # noqa: E402
+                          RunningStats)
+
+
+class RunningStatsTest(unittest.TestCase):
+
+    def test_merge_matches_a_single_stream(self) -> None:
+        rng = random.Random(5)
+        values = [rng.gauss(10, 3) for _ in range(1000)]
+
+        parts = [RunningStats() for _ in range(3)]
+        for part, chunk in zip(parts, (values[:10], values[10:300],
+                                       values[300:])):
+            for value in chunk:
+                part.add(value)
+
+        merged = RunningStats()
+        merged.merge(RunningStats())
+        for part in parts:
+            merged.merge(part)
+
+        self.assertEqual(merged.count, len(values))
+        self.assertAlmostEqual(merged.mean, mean(values))
+        self.assertAlmostEqual(merged.variance(), variance(values))
+        self.assertEqual(merged.low, min(values))
+        self.assertEqual(merged.high, max(values))
+
+    def test_small_counts(self) -> None:
+        stats = RunningStats()
+        self.assertEqual(stats.variance(), 0.0)
+
+        stats.add(4.0)
+        self.assertEqual(stats.std(), 0.0)
+        self.assertEqual(stats.mean, 4.0)
+
+
+class QuantileDigestTest(unittest.TestCase):
+
+    def test_quantiles_of_merged_digests(self) -> None:
+        rng = random.Random(7)
+        values = [rng.random() for _ in range(20000)]
+
+        digests = [QuantileDigest() for _ in range(4)]
+        for i, value in enumerate(values):
+            digests[i % 4].add(value)
+
+        merged = QuantileDigest()
+        for digest in digests:
+            merged.merge(digest)
+
+        self.assertEqual(merged.total, len(values))
+        self.assertLessEqual(len(merged.means), merged.compression)
+        self.assertEqual(merged.quantile(0.0), min(values))
+        self.assertEqual(merged.quantile(1.0), max(values))
+
+        values.sort()
+        for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+            self.assertAlmostEqual(merged.quantile(q),
+                                   values[int(q * len(values))], delta=0.01)
+
+    def test_empty_and_invalid_digests(self) -> None:
+        self.assertNotEqual(QuantileDigest().quantile(0.5),
+                            QuantileDigest().quantile(0.5))
+
+        with self.assertRaises(DunGEN.GeneratorError):
+            QuantileDigest(5)
+
+
+class DungeonStatsTest(unittest.TestCase):
+
+    def test_merge_matches_a_single_stream(self) -> None:
+        config = main.get_dungeon_config().compile()
+        dungeons = [DunGEN.gen_map(config, seed) for seed in (1, 2, 3, 4)]
+
+        whole = DungeonStats()
+        first = DungeonStats()
+        second = DungeonStats()
+
+        for i, dungeon in enumerate(dungeons):
+            whole.add(dungeon)
+            (first if i < 2 else second).add(dungeon)
+
+        first.merge(second)
+        merged = first.report()
+        expected = whole.report()
+
+        self.assertEqual(merged['dungeons'], 4)
+        self.assertEqual(merged['histograms'], expected['histograms'])
+        self.assertEqual(merged['roomTypes'], expected['roomTypes'])
+        self.assertEqual(merged['enemyTypes'], expected['enemyTypes'])
+
+        for name, summary in expected['metrics'].items():
+            self.assertEqual(merged['metrics'][name].keys(), summary.keys())
+
+            for key, value in summary.items():
+                self.assertAlmostEqual(merged['metrics'][name][key], value)
+
+        self.assertAlmostEqual(first.metrics['rooms'].stats.mean,
+                               mean(len(d.rooms) for d in dungeons))
+
+
+if __name__ == '__main__':
+    unittest.main()
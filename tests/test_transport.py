@@ -0,0 +1,92 @@
+import os
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import DungeonIO  # noqa: E402
+import main  # noqa: E402
+from DungeonTransport import (SharedBatch, share_dungeons,  # noqa: E402
+                              share_records, share_tracker)
+
+
+def share_seeds(seeds: List[int]) -> SharedBatch:
+    config = main.get_dungeon_config().compile()
+    return share_dungeons([DunGEN.gen_map(config, seed) if seed >= 0
+                           else None for seed in seeds],
+                          config.roomTypes, config.enemyTypes)
+
+
+def block_exists(batch: SharedBatch) -> bool:
+    return os.path.exists(os.path.join('/dev/shm', batch.name))
+
+
+@unittest.skipIf(not os.path.isdir('/dev/shm'),
+                 'POSIX shared memory is not available')
+class SharedBatchTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        share_tracker()
+
+    def test_records_round_trip(self) -> None:
+        records = [b'abc', None, b'', b'12345678x', bytearray(range(20))]
+        batch = share_records(records)
+        self.assertEqual(batch.count, len(records))
+
+        with batch.open() as reader:
+            self.assertEqual(len(reader), len(records))
+            self.assertEqual([bytes(reader[i]) for i in range(len(reader))],
+                             [bytes(record or b'') for record in records])
+            self.assertIsNone(reader.dungeon(1))
+
+            with self.assertRaises(IndexError):
+                reader[len(records)]
+
+        self.assertFalse(block_exists(batch))
+
+        with self.assertRaises(FileNotFoundError):
+            batch.open()
+
+    def test_empty_batch(self) -> None:
+        batch = share_records([])
+
+        with batch.open() as reader:
+            self.assertEqual(len(reader), 0)
+
+        self.assertFalse(block_exists(batch))
+
+    def test_dungeons_from_a_worker(self) -> None:
+        seeds = [1, -1, 2]
+
+        with ProcessPoolExecutor(1) as pool:
+            batch = pool.submit(share_seeds, seeds).result()
+
+        config = main.get_dungeon_config().compile()
+
+        with batch.open() as reader:
+            for i, seed in enumerate(seeds):
+                packed = reader.dungeon(i)
+                if seed < 0:
+                    self.assertIsNone(packed)
+                    continue
+
+                assert packed is not None
+                dungeon = packed.to_dungeon(config.roomTypes,
+                                            config.enemyTypes)
+                expected = DunGEN.gen_map(config, seed)
+
+                self.assertEqual(
+                    DungeonIO.to_dict(dungeon, config.roomTypes,
+                                      config.enemyTypes),
+                    DungeonIO.to_dict(expected, config.roomTypes,
+                                      config.enemyTypes))
+                del packed
+
+        self.assertFalse(block_exists(batch))
+
+
+if __name__ == '__main__':
+    unittest.main()
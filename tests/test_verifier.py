@@ -0,0 +1,111 @@
+import os
+import sys
+import unittest
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import DunGEN  # noqa: E402
+import main  # noqa: E402
+
+WEST, NORTH, EAST, SOUTH = range(4)
+
+
+def build_dungeon(positions: List[Tuple[int, int]],
+                  doors: List[Tuple[int, int, int]],
+                  keys: List[Tuple[int, int, int]],
+                  mainPath: List[int]) -> DunGEN.Dungeon:
+    """
+    Builds a small dungeon by hand. Doors are given as a room index, a
+    direction and the neighbouring room index, and are opened from both
+    sides. Keys are given as the key room, the lock room and the locked
+    door direction.
+    """
+
+    dungeon = DunGEN.Dungeon()
+
+    for x, y in positions:
+        room = DunGEN.DungeonRoom()
+        room.x = x
+        room.y = y
+        dungeon.add_room(room)
+
+    for index, door, other in doors:
+        for room, side in ((index, door), (other, (door + 2) % 4)):
+            opened = list(dungeon.rooms[room].doors)
+            opened[side] = True
+            dungeon.rooms[room].doors = tuple(opened)  # type: ignore
+
+    for keyRoom, lockRoom, door in keys:
+        dungeon.keys.append(DunGEN.DungeonKey(
+            dungeon.rooms[keyRoom], dungeon.rooms[lockRoom], door))
+
+    for index in mainPath:
+        dungeon.mainPath.add_room(dungeon.rooms[index])
+
+    return dungeon
+
+
+# A corridor of four rooms from west to east, with a side room to the
+# north of the second room.
+POSITIONS = [(0, 0), (1, 0), (2, 0), (3, 0), (1, -1)]
+DOORS = [(0, EAST, 1), (1, EAST, 2), (2, EAST, 3), (1, NORTH, 4)]
+MAIN_PATH = [0, 1, 2, 3]
+
+
+class VerifyDungeonTest(unittest.TestCase):
+
+    def test_key_before_its_door_is_solvable(self) -> None:
+        dungeon = build_dungeon(POSITIONS, DOORS, [(4, 2, EAST)], MAIN_PATH)
+        report = DunGEN.verify_dungeon(dungeon)
+
+        self.assertTrue(report.solvable)
+        self.assertEqual(report.unreachableKeys, [])
+        self.assertEqual(report.softLocks, [])
+        self.assertEqual(report.reachableRooms, 5)
+
+        # 0, 1, 4 for the key, back through 1, then 2 and 3.
+        self.assertEqual(report.minVisits, 6)
+
+    def test_key_behind_its_own_door_is_a_soft_lock(self) -> None:
+        dungeon = build_dungeon(POSITIONS, DOORS, [(4, 1, NORTH)], MAIN_PATH)
+        report = DunGEN.verify_dungeon(dungeon)
+
+        self.assertFalse(report.solvable)
+        self.assertEqual(report.unreachableKeys, [0])
+        self.assertEqual(report.softLocks, [0])
+        self.assertEqual(report.reachableRooms, 4)
+
+    def test_key_behind_another_lock_is_unreachable(self) -> None:
+        # Both keys are in the last room. The door of the second key is
+        # never reached, so only the first key is a soft lock.
+        dungeon = build_dungeon(POSITIONS, DOORS,
+                                [(3, 1, EAST), (3, 2, EAST)], MAIN_PATH)
+        report = DunGEN.verify_dungeon(dungeon, visits=False)
+
+        self.assertFalse(report.solvable)
+        self.assertEqual(report.unreachableKeys, [0, 1])
+        self.assertEqual(report.softLocks, [0])
+        self.assertEqual(report.reachableRooms, 3)
+        self.assertEqual(report.minVisits, -1)
+
+    def test_layer_rejects_unsolvable_dungeons(self) -> None:
+        layer = DunGEN.VerifySolvableLayer()
+        layer.process_dungeon(build_dungeon(POSITIONS, DOORS,
+                                            [(4, 2, EAST)], MAIN_PATH))
+
+        with self.assertRaises(DunGEN.DungeonRejected):
+            layer.process_dungeon(build_dungeon(POSITIONS, DOORS,
+                                                [(4, 1, NORTH)], MAIN_PATH))
+
+    def test_generated_dungeons_are_solvable(self) -> None:
+        config = main.get_dungeon_config().compile()
+
+        for seed in (1, 2):
+            report = DunGEN.verify_dungeon(DunGEN.gen_map(config, seed))
+            self.assertTrue(report.solvable)
+            self.assertGreaterEqual(report.minVisits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()